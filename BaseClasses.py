@@ -1,16 +1,19 @@
 from __future__ import annotations
 
 import collections
+import concurrent.futures
 import functools
 import logging
+import multiprocessing
 import random
 import secrets
 import warnings
 from argparse import Namespace
+from array import array
 from collections import Counter, deque, defaultdict
 from collections.abc import Callable, Collection, Iterable, Iterator, Mapping, MutableSequence, Set as AbstractSet
 from enum import IntEnum, IntFlag
-from typing import (Any, ClassVar, Dict, List, Literal, NamedTuple,
+from typing import (Any, ClassVar, Deque, Dict, List, Literal, NamedTuple,
                     Optional, Protocol, Set, Tuple, Union, TYPE_CHECKING, overload)
 import dataclasses
 
@@ -102,6 +105,15 @@ class MultiWorld():
     random: random.Random
     per_slot_randoms: Utils.DeprecateDict[int, random.Random]
     """Deprecated. Please use `self.random` instead."""
+    sweep_threads: int = 0
+    """Number of threads to check the locations of different players with in parallel while sweeping,
+    also used to test the progression balancing candidates of different players in parallel.
+    Only speeds these up on free-threaded Python builds, see `settings.GeneratorOptions.SweepThreads`."""
+    spoiler_processes: int = 0
+    """Number of processes to check which locations are required for the playthrough with in parallel,
+    see `settings.GeneratorOptions.SpoilerProcesses`."""
+    sphere_index: Optional[SphereIndex] = None
+    """Spheres of the final placements, set before output. Used instead of computing the spheres again if present."""
 
     class AttributeProxy():
         def __init__(self, rule):
@@ -590,24 +602,26 @@ class MultiWorld():
         locations is followed by an empty set, and then a set of all of the
         unreachable locations.
         """
-        state = CollectionState(self)
-        locations = set(self.get_filled_locations())
+        if self.sphere_index:
+            yield from (set(sphere) for sphere in self.sphere_index.spheres)
+            if self.sphere_index.unreachable_locations:
+                yield set()
+                yield set(self.sphere_index.unreachable_locations)
+            return
 
-        while locations:
-            sphere: Set[Location] = set()
+        state = CollectionState(self)
+        frontier = SphereFrontier(self, self.get_filled_locations())
 
-            for location in locations:
-                if location.can_reach(state):
-                    sphere.add(location)
+        while frontier.remaining:
+            sphere = frontier.pop_reachable(state)
             yield sphere
             if not sphere:
-                if locations:
-                    yield locations  # unreachable locations
+                yield frontier.remaining  # unreachable locations
                 break
 
             for location in sphere:
                 state.collect(location.item, True, location)
-            locations -= sphere
+            frontier.collected(location.item for location in sphere)
 
     def get_sendable_spheres(self) -> Iterator[Set[Location]]:
         """
@@ -625,37 +639,45 @@ class MultiWorld():
             else:
                 events.add(location)
 
-        while locations:
-            sphere: Set[Location] = set()
+        # The state of each iteration has at least collected the items of as many of the index's spheres, so anything
+        # the index found reachable by then doesn't have to be checked again.
+        location_spheres = self.sphere_index.location_spheres if self.sphere_index else {}
+        depth = 0
 
+        def can_reach(location: Location) -> bool:
+            return location_spheres.get(location, depth + 1) <= depth or location.can_reach(state)
+
+        location_frontier = SphereFrontier(self, locations)
+        event_frontier = SphereFrontier(self, events)
+        while location_frontier.remaining:
             # cull events out
-            done_events: Set[Union[Location, None]] = {None}
+            done_events = event_frontier.pop_reachable(state, can_reach)
             while done_events:
-                done_events = set()
-                for event in events:
-                    if event.can_reach(state):
-                        state.collect(event.item, True, event)
-                        done_events.add(event)
-                events -= done_events
-
-            for location in locations:
-                if location.can_reach(state):
-                    sphere.add(location)
-
+                for event in done_events:
+                    state.collect(event.item, True, event)
+                event_items = [event.item for event in done_events]
+                event_frontier.collected(event_items)
+                location_frontier.collected(event_items)
+                done_events = event_frontier.pop_reachable(state, can_reach)
+
+            sphere = location_frontier.pop_reachable(state, can_reach)
             yield sphere
             if not sphere:
-                if locations:
-                    yield locations  # unreachable locations
+                yield location_frontier.remaining  # unreachable locations
                 break
 
             for location in sphere:
                 state.collect(location.item, True, location)
-            locations -= sphere
+            sphere_items = [location.item for location in sphere]
+            event_frontier.collected(sphere_items)
+            location_frontier.collected(sphere_items)
+            depth += 1
 
     def fulfills_accessibility(self, state: Optional[CollectionState] = None):
         """Check if accessibility rules are fulfilled with current or supplied state."""
+        sphere_index = None if state else self.sphere_index
         if not state:
-            state = CollectionState(self)
+            state = sphere_index.get_final_state() if sphere_index else CollectionState(self)
         players: Dict[str, Set[int]] = {
             "minimal": set(),
             "items": set(),
@@ -685,6 +707,14 @@ class MultiWorld():
 
         locations = [location for location in self.get_locations() if location_relevant(location)]
 
+        if sphere_index and locations:
+            # everything reachable is already collected, so only the final state has to be checked
+            locations = [location for location in locations
+                         if location not in sphere_index.location_spheres and not location.can_reach(state)]
+            beatable_fulfilled = self.has_beaten_game(state)
+            if all_done():
+                return True
+
         while locations:
             sphere: List[Location] = []
             for n in range(len(locations) - 1, -1, -1):
@@ -719,6 +749,94 @@ class MultiWorld():
 PathValue = Tuple[str, Optional["PathValue"]]
 
 
+_sweep_executors: Dict[int, concurrent.futures.Executor] = {}
+
+
+def _get_sweep_executor(threads: int) -> concurrent.futures.Executor:
+    """Returns the thread pool shared by all parallel sweeps with this number of threads."""
+    executor = _sweep_executors.get(threads)
+    if executor is None:
+        executor = _sweep_executors[threads] = Utils.DaemonThreadPoolExecutor(threads, thread_name_prefix="Sweep")
+    return executor
+
+
+def shutdown_sweep_executors() -> None:
+    """Stops the threads of the parallel sweeps, so that processes can be forked without them.
+    Later parallel sweeps start new threads."""
+    while _sweep_executors:
+        _sweep_executors.popitem()[1].shutdown()
+
+
+class ItemCounts(Utils.CopyOnWriteCounter):
+    """
+    Counter of item names that also keeps the counts of a fixed set of item names in an integer array.
+    Used as the prog_items of worlds with `World.indexed_prog_items`, see `World.get_item_index`.
+    """
+    item_index: Mapping[str, int]
+    """Index into indexed_counts for each indexed item name, shared between all counters of a world."""
+    indexed_counts: array[int]
+    """Counts of the indexed item names, always in sync with the counter."""
+
+    def __init__(self, item_index: Mapping[str, int], iterable: Any = None, /, **kwds: int) -> None:
+        self.item_index = item_index
+        self.indexed_counts = array("q", bytes(8 * len(item_index)))
+        super().__init__(iterable, **kwds)
+
+    def __setitem__(self, key: str, value: int) -> None:
+        super().__setitem__(key, value)
+        index = self.item_index.get(key)
+        if index is not None:
+            self.indexed_counts[index] = value
+
+    def __delitem__(self, key: str) -> None:
+        super().__delitem__(key)
+        index = self.item_index.get(key)
+        if index is not None:
+            self.indexed_counts[index] = 0
+
+    def __reduce__(self):
+        return self.__class__, (self.item_index, dict(self))
+
+    def copy(self) -> ItemCounts:
+        ret = self.__class__(self.item_index)
+        dict.update(ret, self)
+        ret.indexed_counts = self.indexed_counts[:]
+        return ret
+
+    def update(self, iterable: Any = None, /, **kwds: int) -> None:
+        # Counter.update writes directly into an empty dict, bypassing __setitem__
+        bypassed = not self and isinstance(iterable, Mapping)
+        super().update(iterable, **kwds)
+        if bypassed:
+            for key, value in self.items():
+                index = self.item_index.get(key)
+                if index is not None:
+                    self.indexed_counts[index] = value
+
+    def pop(self, key: str, *default: Any) -> Any:
+        value = super().pop(key, *default)
+        index = self.item_index.get(key)
+        if index is not None:
+            self.indexed_counts[index] = 0
+        return value
+
+    def popitem(self) -> Tuple[str, int]:
+        key, value = super().popitem()
+        index = self.item_index.get(key)
+        if index is not None:
+            self.indexed_counts[index] = 0
+        return key, value
+
+    def setdefault(self, key: str, default: int = 0) -> int:
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def clear(self) -> None:
+        super().clear()
+        self.indexed_counts = array("q", bytes(8 * len(self.item_index)))
+
+
 class CollectionState():
     prog_items: Dict[int, Counter[str]]
     multiworld: MultiWorld
@@ -728,20 +846,33 @@ class CollectionState():
     path: Dict[Union[Region, Entrance], PathValue]
     locations_checked: Set[Location]
     """Internal cache for Advancement Locations already checked by this CollectionState. Not for use in logic."""
+    changed_items: Dict[int, Set[str]]
+    """Names of the items collected for each player since that player's reachable regions were last updated."""
     stale: Dict[int, bool]
     allow_partial_entrances: bool
+    shared_attributes: ClassVar[Tuple[str, ...]] = ("advancements", "path", "locations_checked")
+    """Attributes holding containers that are shared with copies of this state until they are accessed."""
+    _shared_containers: Utils.CopyOnAccessDict
     additional_init_functions: List[Callable[[CollectionState, MultiWorld], None]] = []
     additional_copy_functions: List[Callable[[CollectionState, CollectionState], CollectionState]] = []
 
     def __init__(self, parent: MultiWorld, allow_partial_entrances: bool = False):
         assert parent.worlds, "CollectionState created without worlds initialized in parent"
-        self.prog_items = {player: Counter() for player in parent.get_all_ids()}
+        self.prog_items = Utils.CopyOnAccessDict(
+            (player, ItemCounts(parent.worlds[player].get_item_index())
+             if parent.worlds[player].indexed_prog_items else Utils.CopyOnWriteCounter())
+            for player in parent.get_all_ids()
+        )
         self.multiworld = parent
-        self.reachable_regions = {player: set() for player in parent.get_all_ids()}
-        self.blocked_connections = {player: set() for player in parent.get_all_ids()}
-        self.advancements = set()
-        self.path = {}
-        self.locations_checked = set()
+        self.reachable_regions = Utils.CopyOnAccessDict(
+            (player, Utils.CopyOnWriteSet()) for player in parent.get_all_ids())
+        self.blocked_connections = Utils.CopyOnAccessDict(
+            (player, Utils.CopyOnWriteSet()) for player in parent.get_all_ids())
+        self._shared_containers = Utils.CopyOnAccessDict()
+        self.advancements = Utils.CopyOnWriteSet()
+        self.path = Utils.CopyOnWriteDict()
+        self.locations_checked = Utils.CopyOnWriteSet()
+        self.changed_items = Utils.CopyOnAccessDict((player, Utils.CopyOnWriteSet()) for player in parent.get_all_ids())
         self.stale = {player: True for player in parent.get_all_ids()}
         self.allow_partial_entrances = allow_partial_entrances
         for function in self.additional_init_functions:
@@ -750,20 +881,39 @@ class CollectionState():
             for item in items:
                 self.collect(item, True)
 
+    def __getattr__(self, name: str) -> Any:
+        # only called for attributes that aren't set, which includes the shared containers not accessed since copy()
+        shared_containers = self.__dict__.get("_shared_containers")
+        if shared_containers is None or name not in shared_containers:
+            raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'")
+        value = shared_containers.pop(name)
+        setattr(self, name, value)
+        return value
+
     def update_reachable_regions(self, player: int):
         self.stale[player] = False
         world: AutoWorld.World = self.multiworld.worlds[player]
         reachable_regions = self.reachable_regions[player]
-        queue = deque(self.blocked_connections[player])
+        changed_items = self.changed_items[player]
         start: Region = world.get_region(world.origin_region_name)
 
         # init on first call - this can't be done on construction since the regions don't exist yet
         if start not in reachable_regions:
+            queue = deque(self.blocked_connections[player])
             reachable_regions.add(start)
             self.blocked_connections[player].update(start.exits)
             queue.extend(start.exits)
+        elif world.incremental_reachability:
+            # only the blocked connections that depend on the newly collected items could have become reachable
+            queue = deque(world.get_entrance_dependencies().get_affected(self.blocked_connections[player],
+                                                                         changed_items))
+        else:
+            queue = deque(self.blocked_connections[player])
+        changed_items.clear()
 
-        if world.explicit_indirect_conditions:
+        if world.incremental_reachability:
+            self._update_reachable_regions_incremental(player, queue)
+        elif world.explicit_indirect_conditions:
             self._update_reachable_regions_explicit_indirect_conditions(player, queue)
         else:
             self._update_reachable_regions_auto_indirect_conditions(player, queue)
@@ -821,16 +971,54 @@ class CollectionState():
             # sweep for indirect connections, mostly Entrance.can_reach(unrelated_Region)
             queue.extend(blocked_connections)
 
+    def _update_reachable_regions_incremental(self, player: int, queue: deque[Entrance]):
+        reachable_regions = self.reachable_regions[player]
+        blocked_connections = self.blocked_connections[player]
+        world: AutoWorld.World = self.multiworld.worlds[player]
+        dependencies = world.get_entrance_dependencies()
+        new_connection: bool = True
+        # run BFS on the affected connections, and keep track of those blocked by missing items
+        while new_connection:
+            new_connection = False
+            while queue:
+                connection = queue.popleft()
+                if connection not in blocked_connections:
+                    # already passed through by an earlier entry of the same connection in the queue
+                    continue
+                new_region = connection.connected_region
+                if new_region in reachable_regions:
+                    blocked_connections.remove(connection)
+                elif connection.can_reach(self):
+                    if self.allow_partial_entrances and not new_region:
+                        continue
+                    assert new_region, f"tried to search through an Entrance \"{connection}\" with no connected Region"
+                    reachable_regions.add(new_region)
+                    blocked_connections.remove(connection)
+                    blocked_connections.update(new_region.exits)
+                    queue.extend(new_region.exits)
+                    self.path[new_region] = (new_region.name, self.path.get(connection, None))
+                    new_connection = True
+                    world.reached_region(self, new_region)
+
+                    # Retry connections whose rules depend on the new region
+                    queue.extend(dependencies.region_entrances.get(new_region, ()))
+                    queue.extend(self.multiworld.indirect_connections.get(new_region, ()))
+            if not world.explicit_indirect_conditions:
+                # connections with unknown dependencies may depend on any region, so they get swept like before
+                queue.extend(dependencies.opaque_entrances.intersection(blocked_connections))
+
     def copy(self) -> CollectionState:
         ret = CollectionState(self.multiworld)
-        ret.prog_items = {player: counter.copy() for player, counter in self.prog_items.items()}
-        ret.reachable_regions = {player: region_set.copy() for player, region_set in
-                                 self.reachable_regions.items()}
-        ret.blocked_connections = {player: entrance_set.copy() for player, entrance_set in
-                                   self.blocked_connections.items()}
-        ret.advancements = self.advancements.copy()
-        ret.path = self.path.copy()
-        ret.locations_checked = self.locations_checked.copy()
+        # containers are shared with the copy until it accesses them or this state modifies them
+        ret.prog_items = self.prog_items.share()
+        ret.reachable_regions = self.reachable_regions.share()
+        ret.blocked_connections = self.blocked_connections.share()
+        ret.changed_items = self.changed_items.share()
+        ret._shared_containers = self._shared_containers.share()
+        for name in self.shared_attributes:
+            if name in self.__dict__:
+                ret._shared_containers.share_item(name, self.__dict__[name])
+            del ret.__dict__[name]
         ret.allow_partial_entrances = self.allow_partial_entrances
         for function in self.additional_copy_functions:
             ret = function(self, ret)
@@ -879,40 +1067,55 @@ class CollectionState():
         # under this assumption, an extra sweep iteration is performed that checks every player, to confirm that the
         # sweep is finished.
         checking_if_finished = False
+        sweep_threads = self.multiworld.sweep_threads
         while players_to_check:
             next_advancements_per_player: List[Tuple[int, List[Location]]] = []
             next_players_to_check = set()
 
+            checked_in_parallel: Dict[int, Tuple[List[Location], List[Location]]] = {}
+            if sweep_threads > 1 and len(players_to_check) > 1:
+                checked_in_parallel = self._check_locations_in_parallel(
+                    [(player, locations) for player, locations in advancements_per_player
+                     if player in players_to_check], sweep_threads)
+
             for player, locations in advancements_per_player:
                 if player not in players_to_check:
                     next_advancements_per_player.append((player, locations))
                     continue
 
-                # Accessibility of each location is checked first because a player's region accessibility cache becomes
-                # stale whenever one of their own items is collected into the state.
-                reachable_locations: List[Location] = []
-                unreachable_locations: List[Location] = []
-                for location in locations:
-                    if location.can_reach(self):
-                        # Locations containing items that do not belong to `player` could be collected immediately
-                        # because they won't stale `player`'s region accessibility cache, but, for simplicity, all the
-                        # items at reachable locations are collected in a single loop.
-                        reachable_locations.append(location)
-                    else:
-                        unreachable_locations.append(location)
+                reachable_locations: List[Location]
+                unreachable_locations: List[Location]
+                if checked_in_parallel:
+                    # The locations were checked before any items were collected in this iteration, so `player` has to
+                    # be checked again if one of their items gets collected, and cannot be discarded below.
+                    reachable_locations, unreachable_locations = checked_in_parallel[player]
+                else:
+                    # Accessibility of each location is checked first because a player's region accessibility cache
+                    # becomes stale whenever one of their own items is collected into the state.
+                    reachable_locations = []
+                    unreachable_locations = []
+                    for location in locations:
+                        if location.can_reach(self):
+                            # Locations containing items that do not belong to `player` could be collected immediately
+                            # because they won't stale `player`'s region accessibility cache, but, for simplicity, all
+                            # the items at reachable locations are collected in a single loop.
+                            reachable_locations.append(location)
+                        else:
+                            unreachable_locations.append(location)
                 if unreachable_locations:
                     next_advancements_per_player.append((player, unreachable_locations))
 
-                # A previous player's locations processed in the current `while players_to_check` iteration could have
-                # collected items belonging to `player`, but now that all of `player`'s reachable locations have been
-                # found, it can be assumed that `player` will not gain any more reachable locations until another one of
-                # their items is collected.
-                # It would be clearer to not add players to `next_players_to_check` in the first place if they have yet
-                # to be processed in the current `while players_to_check` iteration, but checking if a player should be
-                # added to `next_players_to_check` would need to be run once for every item that is collected, so it is
-                # more performant to instead discard `player` from `next_players_to_check` once their locations have
-                # been processed.
-                next_players_to_check.discard(player)
+                if not checked_in_parallel:
+                    # A previous player's locations processed in the current `while players_to_check` iteration could
+                    # have collected items belonging to `player`, but now that all of `player`'s reachable locations
+                    # have been found, it can be assumed that `player` will not gain any more reachable locations until
+                    # another one of their items is collected.
+                    # It would be clearer to not add players to `next_players_to_check` in the first place if they have
+                    # yet to be processed in the current `while players_to_check` iteration, but checking if a player
+                    # should be added to `next_players_to_check` would need to be run once for every item that is
+                    # collected, so it is more performant to instead discard `player` from `next_players_to_check` once
+                    # their locations have been processed.
+                    next_players_to_check.discard(player)
 
                 # Collect the items from the reachable locations.
                 for advancement in reachable_locations:
@@ -939,6 +1142,37 @@ class CollectionState():
             if yield_each_sweep:
                 yield
 
+    def _check_locations_in_parallel(self, advancements_per_player: List[Tuple[int, List[Location]]],
+                                     threads: int) -> Dict[int, Tuple[List[Location], List[Location]]]:
+        """
+        Checks the accessibility of each player's locations in a thread pool, each on its own copy of this state.
+        Returns the reachable and unreachable locations of each player.
+        The copies share the containers of this state until they access them, see `Utils.CopyOnAccessDict`, which is
+        safe across threads. This state is not modified before all copies are done.
+        """
+        # Regions are updated up front, so that the copies don't each have to find the same regions again.
+        for player, _ in advancements_per_player:
+            if self.stale[player]:
+                self.update_reachable_regions(player)
+
+        def check_locations(state: CollectionState, locations: List[Location]) -> Tuple[List[Location], List[Location]]:
+            reachable_locations: List[Location] = []
+            unreachable_locations: List[Location] = []
+            for location in locations:
+                if location.can_reach(state):
+                    reachable_locations.append(location)
+                else:
+                    unreachable_locations.append(location)
+            return reachable_locations, unreachable_locations
+
+        executor = _get_sweep_executor(threads)
+        futures: Dict[int, concurrent.futures.Future[Tuple[List[Location], List[Location]]]] = {}
+        for player, locations in advancements_per_player:
+            state = self.copy()
+            state.stale = self.stale.copy()
+            futures[player] = executor.submit(check_locations, state, locations)
+        return {player: future.result() for player, future in futures.items()}
+
     @overload
     def sweep_for_advancements(self, locations: Optional[Iterable[Location]] = None, *,
                                yield_each_sweep: Literal[True],
@@ -1130,6 +1364,8 @@ class CollectionState():
         changed = self.multiworld.worlds[item.player].collect(self, item)
 
         self.stale[item.player] = True
+        if changed:
+            self.changed_items[item.player].add(item.name)
 
         if changed and not prevent_sweep:
             self.sweep_for_advancements()
@@ -1146,13 +1382,14 @@ class CollectionState():
         """
         assert count > 0
         self.prog_items[player][item] += count
+        self.changed_items[player].add(item)
 
     def remove(self, item: Item):
         changed = self.multiworld.worlds[item.player].remove(self, item)
         if changed:
             # invalidate caches, nothing can be trusted anymore now
-            self.reachable_regions[item.player] = set()
-            self.blocked_connections[item.player] = set()
+            self.reachable_regions[item.player] = Utils.CopyOnWriteSet()
+            self.blocked_connections[item.player] = Utils.CopyOnWriteSet()
             self.stale[item.player] = True
 
     def remove_item(self, item: str, player: int, count: int = 1) -> None:
@@ -1181,12 +1418,145 @@ class CollectionState():
             del (self.prog_items[player][item])
         else:
             self.prog_items[player][item] = count
+            self.changed_items[player].add(item)
 
 
 CollectionRule = Callable[[CollectionState], bool]
 DEFAULT_COLLECTION_RULE: CollectionRule = staticmethod(lambda state: True)
 
 
+class SphereFrontier:
+    """
+    The not yet reached locations of a sphere by sphere walk, grouped by what they are waiting on, so each sphere only
+    has to check the locations that could have become reachable since they were last checked.
+    Locations wait until their parent region is reachable. Locations of worlds with `incremental_reachability` also
+    wait on the items and regions their rule builder access rule depends on, other locations get checked every time.
+    """
+    remaining: Set[Location]
+    """All locations that were not reachable yet. Locations removed from it by the caller won't be checked anymore."""
+
+    def __init__(self, multiworld: MultiWorld, locations: Iterable[Location]) -> None:
+        self.multiworld = multiworld
+        self.remaining = set(locations)
+        self._to_check: Set[Location] = set(self.remaining)
+        self._always_check: Set[Location] = set()
+        self._region_waiting: Dict[Region, Set[Location]] = {}
+        self._item_waiting: Dict[Tuple[int, str], Set[Location]] = {}
+        self._dependencies: Dict[Location, Optional[Tuple[Set[str], List[Region]]]] = {}
+
+    def pop_reachable(self, state: CollectionState,
+                      can_reach: Optional[Callable[[Location], bool]] = None) -> Set[Location]:
+        """
+        Removes and returns all remaining locations that are reachable with the state.
+
+        :param state: The state to check the locations with. Has to have collected the items of `collected` calls.
+        :param can_reach: Replaces `location.can_reach(state)`, for callers that can skip some of these checks.
+        """
+        if can_reach is None:
+            def can_reach(location: Location) -> bool:
+                return location.can_reach(state)
+
+        for region in [region for region in self._region_waiting if region.can_reach(state)]:
+            self._to_check |= self._region_waiting.pop(region)
+
+        # locations may have been removed from remaining by the caller
+        self._always_check &= self.remaining
+        reachable = set(filter(can_reach, self._always_check))
+        self._always_check -= reachable
+        self.remaining -= reachable
+        to_check = self._to_check & self.remaining
+        to_check -= self._always_check
+        self._to_check = set()
+        for location in to_check:
+            if can_reach(location):
+                reachable.add(location)
+            else:
+                self._wait(location, state)
+        self.remaining -= reachable
+        return reachable
+
+    def collected(self, items: Iterable[Item]) -> None:
+        """Wakes up the locations depending on these newly collected items."""
+        worlds = self.multiworld.worlds
+        for item in items:
+            item_mapping: Mapping[str, str] = getattr(worlds[item.player], "item_mapping", {})
+            for item_name in (item.name, item_mapping.get(item.name)):
+                locations = self._item_waiting.pop((item.player, item_name), None)
+                if locations:
+                    self._to_check |= locations
+
+    def _wait(self, location: Location, state: CollectionState) -> None:
+        from rule_builder.reachability import get_dependencies
+
+        # custom reachability, like regions that depend on more than the collected items, can't be tracked
+        if (type(location).can_reach is not Location.can_reach
+                or type(location.parent_region).can_reach is not Region.can_reach):
+            self._always_check.add(location)
+            return
+        if not location.parent_region.can_reach(state):
+            self._region_waiting.setdefault(location.parent_region, set()).add(location)
+            return
+        if location in self._dependencies:
+            dependencies = self._dependencies[location]
+        else:
+            world = self.multiworld.worlds[location.player]
+            dependencies = get_dependencies(world, location) if world.incremental_reachability else None
+            self._dependencies[location] = dependencies
+        if dependencies is None:
+            self._always_check.add(location)
+            return
+        item_names, regions = dependencies
+        if any(type(region).can_reach is not Region.can_reach for region in regions):
+            self._always_check.add(location)
+            return
+        for item_name in item_names:
+            self._item_waiting.setdefault((location.player, item_name), set()).add(location)
+        for region in regions:
+            if not region.can_reach(state):
+                self._region_waiting.setdefault(region, set()).add(location)
+
+
+class SphereIndex:
+    """
+    The logical spheres of all filled locations, computed in a single pass once the placements are final, so the
+    output steps (accessibility check, multidata spheres and playthrough) don't each have to compute them again.
+    Has to be recreated if any placements change afterwards.
+    """
+    spheres: List[Set[Location]]
+    """Reachable locations of each sphere, in the order they can be collected in."""
+    unreachable_locations: Set[Location]
+    location_spheres: Dict[Location, int]
+    """Index into `spheres` for each reachable location."""
+    states: List[CollectionState]
+    """`states[n]` has collected the items of `spheres[:n]`, so the last state has collected every reachable item.
+    Shared between all users of the index, so only use copies of them."""
+
+    def __init__(self, multiworld: MultiWorld) -> None:
+        self.spheres = []
+        self.location_spheres = {}
+        state = CollectionState(multiworld)
+        self.states = [state.copy()]
+        frontier = SphereFrontier(multiworld, multiworld.get_filled_locations())
+
+        while frontier.remaining:
+            sphere = frontier.pop_reachable(state)
+            if not sphere:
+                break
+
+            for location in sphere:
+                state.collect(location.item, True, location)
+                self.location_spheres[location] = len(self.spheres)
+            frontier.collected(location.item for location in sphere)
+            self.spheres.append(sphere)
+            self.states.append(state.copy())
+
+        self.unreachable_locations = frontier.remaining
+
+    def get_final_state(self) -> CollectionState:
+        """Returns a copy of the state that has collected every reachable item."""
+        return self.states[-1].copy()
+
+
 class EntranceType(IntEnum):
     ONE_WAY = 1
     TWO_WAY = 2
@@ -1502,16 +1872,29 @@ class Location:
         self.address = address
         self.parent_region = parent
 
-    def can_fill(self, state: CollectionState, item: Item, check_access: bool = True) -> bool:
+    def can_fill(self, state: CollectionState, item: Item, check_access: bool = True,
+                 reachable: Optional[Dict[Location, bool]] = None) -> bool:
+        """
+        Returns whether the item can be placed here with the state.
+        If given, whether this location can be reached is looked up in and added to `reachable`,
+        which must only be shared between calls using the same unchanged state.
+        """
         return ((
             self.always_allow(state, item)
             and item.name not in state.multiworld.worlds[item.player].options.non_local_items
         ) or (
             (self.progress_type != LocationProgressType.EXCLUDED or not (item.advancement or item.useful))
             and self.item_rule(item)
-            and (not check_access or self.can_reach(state))
+            and (not check_access or (self.can_reach(state) if reachable is None
+                                      else self._can_reach_cached(state, reachable)))
         ))
 
+    def _can_reach_cached(self, state: CollectionState, reachable: Dict[Location, bool]) -> bool:
+        can_reach = reachable.get(self)
+        if can_reach is None:
+            can_reach = reachable[self] = self.can_reach(state)
+        return can_reach
+
     def can_reach(self, state: CollectionState) -> bool:
         # Region.can_reach is just a cache lookup, so placing it first for faster abort on average
         assert self.parent_region, f"called can_reach on a Location \"{self}\" with no parent_region"
@@ -1683,6 +2066,228 @@ class EntranceInfo(TypedDict, total=False):
     direction: str
 
 
+_culling_context: Optional[Tuple[MultiWorld, List[Location], List[Optional[CollectionState]], List[Set[Location]]]] \
+    = None
+"""The multiworld, locations, sphere states and spheres used by `Spoiler.cull_spheres`, set in its processes by
+`_init_culling_process`."""
+
+
+def _init_culling_process(context: Tuple[MultiWorld, List[Location], List[Optional[CollectionState]],
+                                         List[Set[Location]]]) -> None:
+    global _culling_context
+    _culling_context = context
+
+
+def _can_beat_game_from(multiworld: MultiWorld, state: CollectionState, sphere: Iterable[Location],
+                        locations: Set[Location]) -> bool:
+    """
+    Checks if the game can be beaten by sweeping the locations from the state, which gets modified.
+    The locations of `sphere` have to be reachable with the state, so they can be collected without sweeping for them.
+    """
+    for location in sphere:
+        if location in locations and location not in state.locations_checked:
+            state.collect(location.item, True, location)
+    if multiworld.has_beaten_game(state):
+        return True
+    for _ in state.sweep_for_advancements(locations, yield_each_sweep=True, checked_locations=state.locations_checked):
+        if multiworld.has_beaten_game(state):
+            return True
+    return False
+
+
+def _can_beat_game_in_process(num: int, location_indices: List[int]) -> bool:
+    """Checks if the game can be beaten from the start of sphere `num` with only the given locations,
+    in a process forked by `Spoiler.cull_spheres`."""
+    assert _culling_context, "Culling processes have to be initialized with _init_culling_process."
+    multiworld, locations, state_cache, collection_spheres = _culling_context
+    starting_state = state_cache[num]
+    state = starting_state.copy() if starting_state else CollectionState(multiworld)
+    return _can_beat_game_from(multiworld, state, collection_spheres[num],
+                               {locations[index] for index in location_indices})
+
+
+class _SphereCuller:
+    """Removes the locations that are not required to beat the game from the playthrough spheres,
+    see `Spoiler.cull_spheres`."""
+    multiworld: MultiWorld
+    collection_spheres: List[Set[Location]]
+    state_cache: List[Optional[CollectionState]]
+    required_locations: Set[Location]
+    relevant_items: Optional[Dict[int, Set[str]]]
+    pool: Optional[concurrent.futures.ProcessPoolExecutor] = None
+    """Checks locations in parallel if `MultiWorld.spoiler_processes` is set."""
+    location_indices: Dict[Location, int]
+    """Index of each location in the list the culling processes got, so the locations can be sent as indices."""
+    unbeatable_sweeps: Deque[Tuple[CollectionState, Set[Location]]]
+    """The swept states of the latest checks that could not beat the game in the current sphere, together with the
+    locations they swept, later checks that still have all of these locations can continue sweeping from them."""
+
+    # the sphere that is being culled
+    num: int
+    candidates: List[Location]
+    to_delete: Set[Location]
+    required_items: Set[Tuple[int, str, ItemClassification]]
+    group_size: int
+    checks: Dict[Location, concurrent.futures.Future[bool]]
+    """checks running in other processes, see `speculate`"""
+    assumed_unrequired: Set[Location]
+    speculation_holds: bool
+
+    def __init__(self, multiworld: MultiWorld, collection_spheres: List[Set[Location]],
+                 state_cache: List[Optional[CollectionState]]) -> None:
+        from rule_builder.reachability import get_relevant_items
+        self.multiworld = multiworld
+        self.collection_spheres = collection_spheres
+        self.state_cache = state_cache
+        self.required_locations = {location for sphere in collection_spheres for location in sphere}
+        self.relevant_items = get_relevant_items(multiworld)
+        self.location_indices = {}
+        self.unbeatable_sweeps = deque(maxlen=8)
+
+    def cull(self) -> Set[Location]:
+        """Culls all spheres, starting from the last one. Returns the remaining locations."""
+        multiworld = self.multiworld
+        if multiworld.spoiler_processes > 1:
+            self.location_indices = {location: index for index, location in enumerate(self.required_locations)}
+            context = (multiworld, list(self.location_indices), self.state_cache, self.collection_spheres)
+            self.pool = concurrent.futures.ProcessPoolExecutor(multiworld.spoiler_processes,
+                                                               multiprocessing.get_context("fork"),
+                                                               initializer=_init_culling_process, initargs=(context,))
+        try:
+            for num, sphere in reversed(tuple(enumerate(self.collection_spheres))):
+                self.cull_sphere(num, sphere)
+        finally:
+            if self.pool:
+                self.pool.shutdown(cancel_futures=True)
+        return self.required_locations
+
+    def cull_sphere(self, num: int, sphere: Set[Location]) -> None:
+        self.num = num
+        self.candidates = list(sphere)
+        self.to_delete = set()
+        self.required_items = set()
+        self.group_size = 1
+        self.checks = {}
+        self.assumed_unrequired = set()
+        self.speculation_holds = True
+        self.unbeatable_sweeps.clear()
+        for position, location in enumerate(self.candidates):
+            if location in self.to_delete:
+                # was part of a group that is not required
+                continue
+            item = location.item
+            assert item
+            logging.debug('Checking if %s (Player %d) is required to beat the game.', item.name, item.player)
+            if self.is_irrelevant(item):
+                required = False
+            elif self.item_key(item) in self.required_items:
+                required = True
+            elif self.pool:
+                required = self.is_required_in_parallel(position, location)
+            else:
+                required = self.is_required_with_group(position, location)
+
+            if required:
+                # still required, got to keep it around
+                self.required_items.add(self.item_key(item))
+                if location in self.assumed_unrequired:
+                    self.speculation_holds = False
+            else:
+                self.required_locations.remove(location)
+                self.to_delete.add(location)
+
+        for check in self.checks.values():
+            check.cancel()
+        # cull entries in spheres for spoiler walkthrough at end
+        sphere -= self.to_delete
+
+    def is_irrelevant(self, item: Item) -> bool:
+        return self.relevant_items is not None and item.name not in self.relevant_items[item.player]
+
+    @staticmethod
+    def item_key(item: Item) -> Tuple[int, str, ItemClassification]:
+        return item.player, item.name, item.classification
+
+    def is_required_with_group(self, position: int, location: Location) -> bool:
+        """
+        Checks if the location is required by checking it together with a group of the next locations,
+        which are not required either if the game can be beaten without the group.
+        """
+        group = [location]
+        while True:
+            for other in self.candidates[position + 1:]:
+                if len(group) >= self.group_size:
+                    break
+                if other not in self.to_delete and not self.is_irrelevant(other.item) \
+                        and self.item_key(other.item) not in self.required_items:
+                    group.append(other)
+            if self.can_beat_game_without(set(group)):
+                for other in group[1:]:
+                    self.required_locations.remove(other)
+                    self.to_delete.add(other)
+                self.group_size *= 2
+                return False
+            if len(group) == 1:
+                return True
+            self.group_size = len(group) // 2
+            group = [location]
+
+    def can_beat_game_without(self, group: Set[Location]) -> bool:
+        """Checks if the game can be beaten from the start of the current sphere without the locations in `group`"""
+        locations = self.required_locations - group
+        for swept_state, swept_locations in reversed(self.unbeatable_sweeps):
+            if swept_locations <= locations:
+                state = swept_state.copy()
+                break
+        else:
+            starting_state = self.state_cache[self.num]
+            state = starting_state.copy() if starting_state else CollectionState(self.multiworld)
+        if _can_beat_game_from(self.multiworld, state, self.candidates, locations):
+            return True
+        self.unbeatable_sweeps.append((state, locations))
+        return False
+
+    def is_required_in_parallel(self, position: int, location: Location) -> bool:
+        """Checks if the location is required, using the checks that were started by `speculate` if they still hold."""
+        required: Optional[bool] = None
+        check = self.checks.pop(location, None)
+        if check:
+            required = not check.result()
+            if required and not self.speculation_holds:
+                # only known to be required with fewer locations than are required now
+                required = None
+        if required is None:
+            for check in self.checks.values():
+                check.cancel()
+            self.checks, self.assumed_unrequired = self.speculate(self.candidates[position:])
+            self.speculation_holds = True
+            required = not self.checks.pop(location).result()
+        return required
+
+    def speculate(self, upcoming: List[Location]) -> Tuple[Dict[Location, concurrent.futures.Future[bool]],
+                                                           Set[Location]]:
+        """
+        Starts checking the next locations in the pool, each assuming that all the checked locations before it
+        will not be required. Returns the checks and the locations that are assumed to not be required.
+        """
+        assert self.pool
+        remaining_locations = set(self.required_locations)
+        checks: Dict[Location, concurrent.futures.Future[bool]] = {}
+        assumed_unrequired: Set[Location] = set()
+        for location in upcoming:
+            if len(checks) >= 2 * self.multiworld.spoiler_processes:
+                break
+            if self.item_key(location.item) in self.required_items:
+                continue
+            remaining_locations.remove(location)
+            assumed_unrequired.add(location)
+            if not self.is_irrelevant(location.item):
+                checks[location] = self.pool.submit(_can_beat_game_in_process, self.num,
+                                                    [self.location_indices[location]
+                                                     for location in remaining_locations])
+        return checks, assumed_unrequired
+
+
 class Spoiler:
     multiworld: MultiWorld
     hashes: Dict[int, str]
@@ -1715,8 +2320,26 @@ class Spoiler:
         prog_locations = {location for location in multiworld.get_filled_locations() if location.item.advancement}
         state_cache: List[Optional[CollectionState]] = [None]
         collection_spheres: List[Set[Location]] = []
+        sphere_index = multiworld.sphere_index
         state = CollectionState(multiworld)
-        sphere_candidates = set(prog_locations)
+        if sphere_index:
+            # other items than progress items don't change logic, so the index's spheres only need to be filtered.
+            # The index's states also collected the other items, so the states culling starts from are collected again
+            # with only the progress items, like below, but without having to check which locations are reachable.
+            for index_sphere in sphere_index.spheres:
+                sphere = {location for location in index_sphere if location.item.advancement}
+                if not sphere:
+                    break
+                for location in sphere:
+                    state.collect(location.item, True, location)
+                # so the checks of culling don't each have to find the reachable regions again
+                for player in [player for player, stale in state.stale.items() if stale]:
+                    state.update_reachable_regions(player)
+                collection_spheres.append(sphere)
+                state_cache.append(state.copy())
+            sphere_candidates = prog_locations.difference(*collection_spheres)
+        else:
+            sphere_candidates = set(prog_locations)
         logging.debug('Building up collection spheres.')
         while sphere_candidates:
 
@@ -1749,22 +2372,7 @@ class Spoiler:
 
         # in the second phase, we cull each sphere such that the game is still beatable,
         # reducing each range of influence to the bare minimum required inside it
-        required_locations = {location for sphere in collection_spheres for location in sphere}
-        for num, sphere in reversed(tuple(enumerate(collection_spheres))):
-            to_delete: Set[Location] = set()
-            for location in sphere:
-                # we remove the location from required_locations to sweep from, and check if the game is still beatable
-                logging.debug('Checking if %s (Player %d) is required to beat the game.', location.item.name,
-                              location.item.player)
-                required_locations.remove(location)
-                if multiworld.can_beat_game(state_cache[num], required_locations):
-                    to_delete.add(location)
-                else:
-                    # still required, got to keep it around
-                    required_locations.add(location)
-
-            # cull entries in spheres for spoiler walkthrough at end
-            sphere -= to_delete
+        required_locations = self.cull_spheres(collection_spheres, state_cache)
 
         # second phase, sphere 0
         removed_precollected: List[Item] = []
@@ -1823,6 +2431,24 @@ class Spoiler:
         for item in removed_precollected:
             multiworld.push_precollected(item)
 
+    def cull_spheres(self, collection_spheres: List[Set[Location]],
+                     state_cache: List[Optional[CollectionState]]) -> Set[Location]:
+        """
+        Removes the locations that are not required to beat the game from `collection_spheres`, checking the locations
+        of each sphere one at a time, starting from the last sphere. `state_cache[num]` has to be the state before
+        collecting sphere `num`. Returns the remaining locations.
+
+        Gives the same result as checking each location with `MultiWorld.can_beat_game`, but skips the checks whose
+        result is known, as logic is monotonic and does not care which location an item came from:
+        items that no access rule or completion condition depends on are never required,
+        an item is required if an equal item in the same sphere was required,
+        and if the game can be beaten without a group of the next locations, none of them are required.
+        The groups grow while they are not required and shrink when they are. Checks continue from the sweep of an
+        earlier check that could not beat the game when possible, or start from a state that already collected the rest
+        of the sphere. With `MultiWorld.spoiler_processes`, the next locations are checked in parallel instead.
+        """
+        return _SphereCuller(self.multiworld, collection_spheres, state_cache).cull()
+
     def create_paths(self, state: CollectionState, collection_spheres: List[Set[Location]]) -> None:
         from itertools import zip_longest
         multiworld = self.multiworld
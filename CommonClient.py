@@ -23,7 +23,8 @@ if __name__ == "__main__":
 
 from MultiServer import CommandProcessor, mark_raw
 from NetUtils import (Endpoint, decode, NetworkItem, encode, JSONtoTextParser, ClientStatus, Permission, NetworkSlot,
-                      RawJSONtoTextParser, add_json_text, add_json_location, add_json_item, JSONTypes, HintStatus, SlotType)
+                      RawJSONtoTextParser, add_json_text, add_json_location, add_json_item, JSONTypes, HintStatus, SlotType,
+                      binary_encoding_tag, decode_binary)
 from Utils import gui_enabled, Version, stream_input, async_start
 from worlds import network_data_package, AutoWorldRegister
 import os
@@ -234,6 +235,9 @@ class CommonContext:
     game: typing.Optional[str] = None
     items_handling: typing.Optional[int] = None
     want_slot_data: bool = True  # should slot_data be retrieved via Connect
+    # should the server send MessagePack instead of JSON, if it supports it. Unlike JSON, dict keys keep their type,
+    # so only enable this if the client (and its slot_data handling) doesn't expect int keys to arrive as str
+    want_binary_encoding: bool = False
 
     class NameLookupDict:
         """A specialized dict, with helper methods, for id -> name item/location data package lookups by game."""
@@ -880,7 +884,7 @@ async def server_loop(ctx: CommonContext, address: typing.Optional[str] = None)
         ctx.current_reconnect_delay = ctx.starting_reconnect_delay
         ctx.disconnected_intentionally = False
         async for data in ctx.server.socket:
-            for msg in decode(data):
+            for msg in (decode_binary(data) if isinstance(data, bytes) else decode(data)):
                 await process_server_cmd(ctx, msg)
         logger.warning(f"Disconnected from multiworld server{reconnect_hint()}")
     except websockets.InvalidMessage:
@@ -952,6 +956,10 @@ async def process_server_cmd(ctx: CommonContext, args: dict):
                 f" for each location checked. Use !hint for more information.")
             ctx.hint_cost = int(args['hint_cost'])
             ctx.check_points = int(args['location_check_points'])
+            if ctx.want_binary_encoding and binary_encoding_tag in args["tags"]:
+                ctx.tags = ctx.tags | {binary_encoding_tag}
+            else:
+                ctx.tags = ctx.tags - {binary_encoding_tag}
 
             if "players" in args:  # TODO remove when servers sending this are outdated
                 players = args.get("players", [])
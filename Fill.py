@@ -1,10 +1,12 @@
 from collections import Counter, defaultdict, deque
 from collections.abc import Iterable, Sequence
+import concurrent.futures
 import itertools
 import logging
 from typing import Callable, Literal
 
-from BaseClasses import CollectionState, Item, Location, LocationProgressType, MultiWorld, PlandoItemBlock
+from BaseClasses import CollectionState, Item, Location, LocationProgressType, MultiWorld, PlandoItemBlock, Region, \
+    SphereFrontier
 from Options import Accessibility
 
 from worlds.AutoWorld import call_all
@@ -35,6 +37,23 @@ def sweep_from_pool(base_state: CollectionState,
     return new_state
 
 
+def _can_fill_cached(location: Location, state: CollectionState, item: Item, check_access: bool,
+                     reachable: dict[Location, bool]) -> bool:
+    """
+    `location.can_fill`, with whether the location can be reached looked up in, and added to, `reachable`, which must
+    only be shared between calls using the same unchanged `state`.
+    Locations that override `can_fill` or `can_reach` are checked without it.
+    """
+    location_type = type(location)
+    if location_type.can_fill is not Location.can_fill or location_type.can_reach is not Location.can_reach \
+            or type(location.parent_region).can_reach is not Region.can_reach:
+        return location.can_fill(state, item, check_access)
+    if check_access and location.always_allow is Location.always_allow and reachable.get(location) is False:
+        # cannot be filled no matter the item, so skip the item rule
+        return False
+    return location.can_fill(state, item, check_access, reachable)
+
+
 def fill_restrictive(multiworld: MultiWorld, base_state: CollectionState, locations: list[Location],
                      item_pool: list[Item], single_player_placement: bool = False, lock: bool = False,
                      swap: bool = True, on_place: Callable[[Location], None] | None = None,
@@ -60,6 +79,10 @@ def fill_restrictive(multiworld: MultiWorld, base_state: CollectionState, locati
     reachable_items: dict[int, deque[Item]] = {}
     for item in item_pool:
         reachable_items.setdefault(item.player, deque()).append(item)
+    # A state that has swept after collecting only the items that will be collected by the next few sweeps, so each
+    # iteration only has to collect the rest of the pool on top of it, instead of sweeping from `base_state` each time.
+    partial_sweep_state: CollectionState | None = None
+    partial_sweep_items: set[int] = set()
 
     # for progress logging
     total = min(len(item_pool), len(locations))
@@ -85,11 +108,27 @@ def fill_restrictive(multiworld: MultiWorld, base_state: CollectionState, locati
                     del item_pool[-p]
                     break
 
+        sweep_locations = multiworld.get_filled_locations(item.player) if single_player_placement else None
+        if not partial_sweep_items.isdisjoint(map(id, items_to_place)):
+            partial_sweep_state = None
+        if partial_sweep_state is None:
+            # Items are taken from the end of each player's items, so the first half of them stays in the pool the
+            # longest. Items that could not be placed are collected by every remaining sweep.
+            partial_sweep_pool = [*unplaced_items, *(item for items in reachable_items.values()
+                                                     for item in itertools.islice(items, len(items) // 2))]
+            partial_sweep_items = {id(item) for item in partial_sweep_pool}
+            partial_sweep_state = sweep_from_pool(base_state, partial_sweep_pool, sweep_locations)
+        # Sweeping is assumed to be monotonic, so this reaches the same locations as sweeping from `base_state`.
         maximum_exploration_state = sweep_from_pool(
-            base_state, item_pool + unplaced_items, multiworld.get_filled_locations(item.player)
-            if single_player_placement else None)
+            partial_sweep_state,
+            [item for item in itertools.chain(item_pool, unplaced_items) if id(item) not in partial_sweep_items],
+            sweep_locations)
 
         has_beaten_game = multiworld.has_beaten_game(maximum_exploration_state)
+        # Every item of this batch is tested against `maximum_exploration_state`, so each location only has to have
+        # its access rule checked once, and locations that turn out to be unreachable are quickly skipped by the rest
+        # of the batch.
+        reachable_locations: dict[Location, bool] = {}
 
         while items_to_place:
             # if we have run out of locations to fill,break out of this loop
@@ -112,7 +151,8 @@ def fill_restrictive(multiworld: MultiWorld, base_state: CollectionState, locati
 
             for i, location in enumerate(locations):
                 if (not single_player_placement or location.player == item_to_place.player) \
-                        and location.can_fill(maximum_exploration_state, item_to_place, perform_access_check):
+                        and _can_fill_cached(location, maximum_exploration_state, item_to_place,
+                                             perform_access_check, reachable_locations):
                     # popping by index is faster than removing by content,
                     spot_to_fill = locations.pop(i)
                     # skipping a scan for the element
@@ -185,6 +225,8 @@ def fill_restrictive(multiworld: MultiWorld, base_state: CollectionState, locati
                             reachable_items[placed_item.player].appendleft(
                                 placed_item)
                             item_pool.append(placed_item)
+                            # the partial sweep may have collected the swapped item from its previous location
+                            partial_sweep_state = None
 
                             # cleanup at the end to hopefully get better errors
                             cleanup_required = True
@@ -746,6 +788,41 @@ def flood_items(multiworld: MultiWorld) -> None:
                 break
 
 
+def _get_items_to_replace(multiworld: MultiWorld, base_state: CollectionState, items_to_test: list[Location],
+                          locations_to_test: set[Location], balancing_state_beaten: bool, reachable_count: int,
+                          total_count: int, threshold_percentage: float) -> list[Location]:
+    """
+    Returns the progression balancing candidates of a player that have to be moved to earlier spheres, testing them
+    from the last one. A candidate has to be moved if, without it, the player's reachable locations stay below the
+    threshold, or the game can't be beaten anymore if it could be with all candidates.
+    """
+    items_to_replace: list[Location] = []
+    # Each candidate is tested with all candidates that are still untested and all candidates that will be replaced
+    # collected. The untested ones are always a prefix of items_to_test, so those states are built once.
+    untested_states = [base_state]
+    for location in items_to_test[:-1]:
+        untested_state = untested_states[-1].copy()
+        untested_state.collect(location.item, True, location)
+        untested_states.append(untested_state)
+
+    while items_to_test:
+        testing = items_to_test.pop()
+        reducing_state = untested_states.pop().copy()
+        for location in items_to_replace:
+            reducing_state.collect(location.item, True, location)
+
+        reducing_state.sweep_for_advancements(locations=locations_to_test)
+
+        if balancing_state_beaten:
+            if not multiworld.has_beaten_game(reducing_state):
+                items_to_replace.append(testing)
+        else:
+            reduced_sphere = {loc for loc in locations_to_test if reducing_state.can_reach(loc)}
+            if (reachable_count + len(reduced_sphere)) / total_count < threshold_percentage:
+                items_to_replace.append(testing)
+    return items_to_replace
+
+
 def balance_multiworld_progression(multiworld: MultiWorld) -> None:
     # A system to reduce situations where players have no checks remaining, popularly known as "BK mode."
     # Overall progression balancing algorithm:
@@ -765,7 +842,8 @@ def balance_multiworld_progression(multiworld: MultiWorld) -> None:
         logging.debug(balanceable_players)
         state: CollectionState = CollectionState(multiworld)
         checked_locations: set[Location] = set()
-        unchecked_locations: set[Location] = set(multiworld.get_locations())
+        frontier = SphereFrontier(multiworld, multiworld.get_locations())
+        unchecked_locations: set[Location] = frontier.remaining
 
         total_locations_count: Counter[int] = Counter(
             location.player
@@ -800,9 +878,8 @@ def balance_multiworld_progression(multiworld: MultiWorld) -> None:
             # Gather non-locked locations.
             # This ensures that only shuffled locations get counted for progression balancing,
             #   i.e. the items the players will be checking.
-            sphere_locations = get_sphere_locations(state, unchecked_locations)
+            sphere_locations = frontier.pop_reachable(state)
             for location in sphere_locations:
-                unchecked_locations.remove(location)
                 if not location.locked:
                     reachable_locations_count[location.player] += 1
 
@@ -831,7 +908,8 @@ def balance_multiworld_progression(multiworld: MultiWorld) -> None:
                 }
                 if balancing_players:
                     balancing_state = state.copy()
-                    balancing_unchecked_locations = unchecked_locations.copy()
+                    balancing_frontier = SphereFrontier(multiworld, unchecked_locations)
+                    balancing_unchecked_locations = balancing_frontier.remaining
                     balancing_reachables = reachable_locations_count.copy()
                     balancing_sphere = sphere_locations.copy()
                     candidate_items: dict[int, set[Location]] = defaultdict(set)
@@ -840,6 +918,7 @@ def balance_multiworld_progression(multiworld: MultiWorld) -> None:
                         for location in balancing_sphere:
                             if location.advancement:
                                 balancing_state.collect(location.item, True, location)
+                                balancing_frontier.collected((location.item,))
                                 player = location.item.player
                                 # only replace items that end up in another player's world
                                 if (not location.locked and not location.item.skip_in_prog_balancing and
@@ -848,9 +927,8 @@ def balance_multiworld_progression(multiworld: MultiWorld) -> None:
                                         location.progress_type != LocationProgressType.PRIORITY):
                                     candidate_items[player].add(location)
                                     logging.debug(f"Candidate item: {location.name}, {location.item.name}")
-                        balancing_sphere = get_sphere_locations(balancing_state, balancing_unchecked_locations)
+                        balancing_sphere = balancing_frontier.pop_reachable(balancing_state)
                         for location in balancing_sphere:
-                            balancing_unchecked_locations.remove(location)
                             if not location.locked:
                                 balancing_reachables[location.player] += 1
                         if multiworld.has_beaten_game(balancing_state) or all(
@@ -865,31 +943,27 @@ def balance_multiworld_progression(multiworld: MultiWorld) -> None:
                     for l in unchecked_locations:
                         if l not in balancing_unchecked_locations:
                             unlocked_locations[l.player].add(l)
-                    items_to_replace: list[Location] = []
+                    balancing_state_beaten = multiworld.has_beaten_game(balancing_state)
+                    # the candidates of each player are tested independently of the other players' candidates,
+                    # so only their order has to be determined in sequence
+                    player_tests = []
                     for player in balancing_players:
-                        locations_to_test = unlocked_locations[player]
                         items_to_test = list(candidate_items[player])
                         items_to_test.sort()
                         multiworld.random.shuffle(items_to_test)
-                        while items_to_test:
-                            testing = items_to_test.pop()
-                            reducing_state = state.copy()
-                            for location in itertools.chain((
-                                    l for l in items_to_replace
-                                    if l.item.player == player
-                            ), items_to_test):
-                                reducing_state.collect(location.item, True, location)
-
-                            reducing_state.sweep_for_advancements(locations=locations_to_test)
-
-                            if multiworld.has_beaten_game(balancing_state):
-                                if not multiworld.has_beaten_game(reducing_state):
-                                    items_to_replace.append(testing)
-                            else:
-                                reduced_sphere = get_sphere_locations(reducing_state, locations_to_test)
-                                p = item_percentage(player, reachable_locations_count[player] + len(reduced_sphere))
-                                if p < threshold_percentages[player]:
-                                    items_to_replace.append(testing)
+                        player_tests.append((multiworld, state.copy(), items_to_test, unlocked_locations[player],
+                                             balancing_state_beaten, reachable_locations_count[player],
+                                             total_locations_count[player], threshold_percentages[player]))
+                    items_to_replace: list[Location] = []
+                    if multiworld.sweep_threads > 1 and len(player_tests) > 1:
+                        with concurrent.futures.ThreadPoolExecutor(multiworld.sweep_threads,
+                                                                   thread_name_prefix="Balancing") as pool:
+                            for player_items_to_replace in pool.map(lambda test: _get_items_to_replace(*test),
+                                                                    player_tests):
+                                items_to_replace += player_items_to_replace
+                    else:
+                        for test in player_tests:
+                            items_to_replace += _get_items_to_replace(*test)
 
                     old_moved_item_count = moved_item_count
 
@@ -912,6 +986,7 @@ def balance_multiworld_progression(multiworld: MultiWorld) -> None:
                                               f"displacing {old_location.item} into {old_location}")
                                 moved_item_count += 1
                                 state.collect(new_location.item, True, new_location)
+                                frontier.collected((new_location.item,))
                                 break
                         else:
                             logging.warning(f"Could not Progression Balance {old_location.item}")
@@ -928,6 +1003,7 @@ def balance_multiworld_progression(multiworld: MultiWorld) -> None:
             for location in sphere_locations:
                 if location.advancement:
                     state.collect(location.item, True, location)
+                    frontier.collected((location.item,))
             checked_locations |= sphere_locations
 
             if multiworld.has_beaten_game(state):
@@ -1,29 +1,182 @@
 import collections
-from collections.abc import Mapping
+from collections.abc import Iterable, Mapping
 import concurrent.futures
+import contextlib
+import functools
 import logging
+import multiprocessing
 import os
+import shutil
+import sys
 import tempfile
+import threading
 import time
 from typing import Any
 import zipfile
 import zlib
 
 import worlds
-from BaseClasses import CollectionState, Item, Location, LocationProgressType, MultiWorld
+from BaseClasses import CollectionState, Item, Location, LocationProgressType, MultiWorld, SphereIndex, \
+    shutdown_sweep_executors
 from Fill import FillError, balance_multiworld_progression, distribute_items_restrictive, flood_items, \
     parse_planned_blocks, distribute_planned_blocks, resolve_early_locations_for_planned
 from NetUtils import convert_to_base_types
 from Options import StartInventoryPool
-from Utils import __version__, output_path, restricted_dumps, version_tuple
+from Utils import __version__, output_path, version_tuple
 from settings import get_settings
 from worlds import AutoWorld
 from worlds.generic.Rules import exclusion_rules, locality_rules
 
 __all__ = ["main"]
 
+_output_multiworld: MultiWorld | None = None
+"""The multiworld to generate output for, inherited by the processes forked in `main`."""
+
+
+def _generate_output_in_process(player: int, output_directory: str) -> None:
+    """Generates the output of a player whose world sets `World.generate_output_in_process`, in a forked process."""
+    assert _output_multiworld, "Output processes have to be forked after setting the output multiworld."
+    AutoWorld.call_single(_output_multiworld, "generate_output", player, output_directory)
+
+
+def _append_deflated_member(zip_file: zipfile.ZipFile, zinfo: zipfile.ZipInfo, data: bytes, crc: int,
+                            file_size: int) -> None:
+    """Appends a member whose raw deflate stream was compressed beforehand to a ZipFile opened for writing.
+    Does what ZipFile.writestr does, which can not take compressed data, with the sizes known up front."""
+    zinfo.compress_type = zipfile.ZIP_DEFLATED
+    zinfo.CRC = crc
+    zinfo.file_size = file_size
+    zinfo.compress_size = len(data)
+    zip64 = file_size > zipfile.ZIP64_LIMIT or len(data) > zipfile.ZIP64_LIMIT
+    with zip_file._lock:  # type: ignore[attr-defined]
+        fp = zip_file.fp
+        assert fp, "the ZipFile has to be open"
+        fp.seek(zip_file.start_dir)
+        zinfo.header_offset = fp.tell()
+        zip_file._writecheck(zinfo)  # type: ignore[attr-defined]
+        zip_file._didModify = True  # type: ignore[attr-defined]
+        fp.write(zinfo.FileHeader(zip64))
+        fp.write(data)
+        zip_file.start_dir = fp.tell()
+        zip_file.filelist.append(zinfo)
+        zip_file.NameToInfo[zinfo.filename] = zinfo
+
+
+class OutputArchive:
+    """The zip archive of the output files of a generation.
+
+    Members are compressed on a thread pool as they are added, which runs in parallel as zlib releases the GIL, and
+    appended to the archive as soon as they are done. Members that are already compressed, like patch containers and
+    the multidata, are stored as they are. The archive is written to `temp_dir` and only moved to `path` once it is
+    complete.
+    """
+    compress_level = 9
+    sample_size = 64 * 1024
+    compressible_ratio = 0.9
+    """members are only deflated if their first `sample_size` bytes compress to less than this ratio"""
+
+    def __init__(self, path: str, temp_dir: str) -> None:
+        self.path = path
+        self.temp_path = os.path.join(temp_dir, os.path.basename(path))
+        self.zip_file = zipfile.ZipFile(self.temp_path, mode="w")
+        self.executor = self._create_executor()
+        self.lock = threading.Lock()
+        """held while appending a member, as a ZipFile can only be written by one thread at a time"""
+        self.futures: list[concurrent.futures.Future[None]] = []
+        self.names: set[str] = set()
+
+    def __enter__(self) -> "OutputArchive":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        if exc_type:
+            self.executor.shutdown(cancel_futures=True)
+            self.zip_file.close()
+        else:
+            self.close()
+
+    def add_data(self, arcname: str, data: bytes) -> None:
+        self.names.add(arcname)
+        zinfo = zipfile.ZipInfo(arcname, time.localtime(time.time())[:6])
+        zinfo.external_attr = 0o600 << 16
+        self.futures.append(self.executor.submit(self._write, zinfo, data))
+
+    def add_file(self, path: str, arcname: str) -> None:
+        self.names.add(arcname)
+        self.futures.append(self.executor.submit(self._write_file, path, arcname))
+
+    def add_files(self, directory: str, prefix: str = "") -> None:
+        """Adds the files in directory whose names start with prefix that were not added yet."""
+        for entry in sorted(os.scandir(directory), key=lambda entry: entry.name):
+            if entry.name.startswith(prefix) and entry.name not in self.names and entry.path != self.temp_path:
+                self.add_file(entry.path, entry.name)
+
+    def wait(self) -> None:
+        """Waits for the members added so far to be written. No threads of the archive run until more are added,
+        so processes can be forked safely."""
+        self.executor.shutdown()
+        for future in self.futures:
+            future.result()
+        self.executor = self._create_executor()
+
+    def close(self) -> None:
+        """Waits for all members to be written, then finishes the archive and moves it to its path."""
+        self.executor.shutdown()
+        try:
+            for future in self.futures:
+                future.result()
+            # members are appended in whichever order they finish in, but are listed in order of their names
+            self.zip_file.filelist.sort(key=lambda zinfo: zinfo.filename)
+        finally:
+            self.zip_file.close()
+        shutil.move(self.temp_path, self.path)
+
+    @staticmethod
+    def _create_executor() -> concurrent.futures.ThreadPoolExecutor:
+        return concurrent.futures.ThreadPoolExecutor(thread_name_prefix="OutputArchive")
+
+    def _is_compressible(self, sample: bytes) -> bool:
+        return len(zlib.compress(sample, 1)) < len(sample) * self.compressible_ratio
+
+    def _write_file(self, path: str, arcname: str) -> None:
+        zinfo = zipfile.ZipInfo.from_file(path, arcname)
+        if zinfo.is_dir():
+            self._write(zinfo, b"")
+            return
+        with open(path, "rb") as f:
+            compressible = self._is_compressible(f.read(self.sample_size))
+            f.seek(0)
+            if compressible:
+                self._write_deflated(zinfo, iter(functools.partial(f.read, self.sample_size), b""))
+            else:
+                zinfo.compress_type = zipfile.ZIP_STORED
+                with self.lock, self.zip_file.open(zinfo, "w") as member:
+                    shutil.copyfileobj(f, member)
+
+    def _write(self, zinfo: zipfile.ZipInfo, data: bytes) -> None:
+        if self._is_compressible(data[:self.sample_size]):
+            self._write_deflated(zinfo, (data,))
+        else:
+            zinfo.compress_type = zipfile.ZIP_STORED
+            with self.lock:
+                self.zip_file.writestr(zinfo, data)
+
+    def _write_deflated(self, zinfo: zipfile.ZipInfo, chunks: Iterable[bytes]) -> None:
+        """Deflates the chunks on the calling thread, then appends them as the member described by zinfo."""
+        compressor = zlib.compressobj(self.compress_level, zlib.DEFLATED, -zlib.MAX_WBITS)
+        compressed: list[bytes] = []
+        crc = file_size = 0
+        for chunk in chunks:
+            crc = zlib.crc32(chunk, crc)
+            file_size += len(chunk)
+            compressed.append(compressor.compress(chunk))
+        compressed.append(compressor.flush())
+        with self.lock:
+            _append_deflated_member(self.zip_file, zinfo, b"".join(compressed), crc, file_size)
+
 
 def main(args, seed=None, baked_server_options: dict[str, object] | None = None):
+    global _output_multiworld
     if not baked_server_options:
         baked_server_options = get_settings().server_options.as_dict()
     assert isinstance(baked_server_options, dict)
@@ -48,6 +201,22 @@ def main(args, seed=None, baked_server_options: dict[str, object] | None = None)
         from Options import dump_player_options
         dump_player_options(multiworld)
     multiworld.set_item_links()
+    sweep_threads = get_settings().generator.sweep_threads
+    if sweep_threads > 1:
+        if getattr(sys, "_is_gil_enabled", lambda: True)():
+            logger.warning("Ignoring sweep_threads, parallel sweeps require a free-threaded Python build.")
+        else:
+            multiworld.sweep_threads = sweep_threads
+    spoiler_processes = get_settings().generator.spoiler_processes
+    if spoiler_processes > 1:
+        if "fork" not in multiprocessing.get_all_start_methods():
+            logger.warning("Ignoring spoiler_processes, parallel playthrough checks require forking processes.")
+        else:
+            multiworld.spoiler_processes = spoiler_processes
+    output_processes = get_settings().generator.output_processes
+    if output_processes > 1 and "fork" not in multiprocessing.get_all_start_methods():
+        logger.warning("Ignoring output_processes, generating output in parallel requires forking processes.")
+        output_processes = 0
     multiworld.state = CollectionState(multiworld)
     logger.info('Archipelago Version %s  -  Seed: %s\n', __version__, multiworld.seed)
 
@@ -222,6 +391,13 @@ def main(args, seed=None, baked_server_options: dict[str, object] | None = None)
     logger.info(f'Beginning output...')
     outfilebase = 'AP_' + multiworld.seed_name
 
+    if not args.spoiler_only or args.spoiler > 1:
+        logger.info('Calculating spheres.')
+        multiworld.sphere_index = SphereIndex(multiworld)
+
+    # the idle threads of parallel sweeps would be alive in the output and playthrough processes forked below
+    shutdown_sweep_executors()
+
     if args.spoiler_only:
         if args.spoiler > 1:
             logger.info('Calculating playthrough.')
@@ -232,17 +408,40 @@ def main(args, seed=None, baked_server_options: dict[str, object] | None = None)
         return multiworld
 
     output = tempfile.TemporaryDirectory()
-    with output as temp_dir:
+    zipfilename = output_path(f"AP_{multiworld.seed_name}.zip")
+    with output as temp_dir, OutputArchive(zipfilename, temp_dir) as archive:
         output_players = [player for player in multiworld.player_ids if AutoWorld.World.generate_output.__code__
                           is not multiworld.worlds[player].generate_output.__code__]
-        with concurrent.futures.ThreadPoolExecutor(len(output_players) + 2) as pool:
+        process_output_players = [player for player in output_players
+                                  if multiworld.worlds[player].generate_output_in_process] \
+            if output_processes > 1 else []
+        process_pool: concurrent.futures.ProcessPoolExecutor | None = None
+        if process_output_players:
+            _output_multiworld = multiworld
+            process_pool = concurrent.futures.ProcessPoolExecutor(min(output_processes, len(process_output_players)),
+                                                                  multiprocessing.get_context("fork"))
+        with process_pool or contextlib.nullcontext(), concurrent.futures.ThreadPoolExecutor(
+                len(output_players) - len(process_output_players) + 2) as pool:
+            output_file_futures: list[concurrent.futures.Future[Any]] = []
+            player_output_futures: dict[concurrent.futures.Future[Any], int] = {}
+            # submitted first, as forking while other threads run can copy locks they hold into the new processes
+            for player in process_output_players:
+                assert process_pool
+                future = process_pool.submit(_generate_output_in_process, player, temp_dir)
+                output_file_futures.append(future)
+                player_output_futures[future] = player
+
             check_accessibility_task = pool.submit(multiworld.fulfills_accessibility)
 
-            output_file_futures = [pool.submit(AutoWorld.call_stage, multiworld, "generate_output", temp_dir)]
+            stage_output_future = pool.submit(AutoWorld.call_stage, multiworld, "generate_output", temp_dir)
+            output_file_futures.append(stage_output_future)
             for player in output_players:
+                if player in process_output_players:
+                    continue
                 # skip starting a thread for methods that say "pass".
-                output_file_futures.append(
-                    pool.submit(AutoWorld.call_single, multiworld, "generate_output", player, temp_dir))
+                future = pool.submit(AutoWorld.call_single, multiworld, "generate_output", player, temp_dir)
+                output_file_futures.append(future)
+                player_output_futures[future] = player
 
             # collect ER hint info
             er_hint_data: dict[int, dict[int, str]] = {}
@@ -355,13 +554,10 @@ def main(args, seed=None, baked_server_options: dict[str, object] | None = None)
                 for key in ("slot_data", "er_hint_data"):
                     multidata[key] = convert_to_base_types(multidata[key])
 
-                serialized_multidata = zlib.compress(restricted_dumps(multidata), 9)
+                return NetUtils.dump_multidata(multidata)
 
-                with open(os.path.join(temp_dir, f'{outfilebase}.archipelago'), 'wb') as f:
-                    f.write(bytes([3]))  # version of format
-                    f.write(serialized_multidata)
-
-            output_file_futures.append(pool.submit(write_multidata))
+            multidata_future = pool.submit(write_multidata)
+            output_file_futures.append(multidata_future)
             if not check_accessibility_task.result():
                 if not multiworld.can_beat_game():
                     raise FillError("Game appears as unbeatable. Aborting.", multiworld=multiworld)
@@ -369,24 +565,36 @@ def main(args, seed=None, baked_server_options: dict[str, object] | None = None)
                     logger.warning("Location Accessibility requirements not fulfilled.")
 
             # retrieve exceptions via .result() if they occurred.
+            # the finished output is added to the archive right away, the output files of a world are named after its
+            # player, see MultiWorld.get_out_file_name_base, but stage_generate_output could write some of them as well
+            finished_players: list[int] = []
             for i, future in enumerate(concurrent.futures.as_completed(output_file_futures), start=1):
                 if i % 10 == 0 or i == len(output_file_futures):
                     logger.info(f'Generating output files ({i}/{len(output_file_futures)}).')
-                future.result()
+                result = future.result()
+                if future is multidata_future:
+                    archive.add_data(f"{outfilebase}.archipelago", result)
+                elif future in player_output_futures:
+                    finished_players.append(player_output_futures[future])
+                if stage_output_future.done():
+                    for player in finished_players:
+                        archive.add_files(temp_dir, multiworld.get_out_file_name_base(player))
+                    finished_players.clear()
+        _output_multiworld = None
 
         if args.spoiler > 1:
+            if multiworld.spoiler_processes > 1:
+                # the playthrough is checked in forked processes, which must not be forked while other threads run
+                archive.wait()
+                shutdown_sweep_executors()
             logger.info('Calculating playthrough.')
             multiworld.spoiler.create_playthrough(create_paths=args.spoiler > 2)
 
         if args.spoiler:
             multiworld.spoiler.to_file(os.path.join(temp_dir, '%s_Spoiler.txt' % outfilebase))
 
-        zipfilename = output_path(f"AP_{multiworld.seed_name}.zip")
         logger.info(f"Creating final archive at {zipfilename}")
-        with zipfile.ZipFile(zipfilename, mode="w", compression=zipfile.ZIP_DEFLATED,
-                             compresslevel=9) as zf:
-            for file in os.scandir(temp_dir):
-                zf.write(file.path, arcname=file.name)
+        archive.add_files(temp_dir)
 
     logger.info('Done. Enjoy. Total Time: %s', time.perf_counter() - start)
     return multiworld
@@ -12,10 +12,12 @@ import inspect
 import itertools
 import logging
 import math
+import mmap
 import operator
 import pickle
 import random
 import shlex
+import struct
 import threading
 import time
 import typing
@@ -32,6 +34,7 @@ if typing.TYPE_CHECKING:
     from NetUtils import ServerConnection
 
 import colorama
+import msgpack
 import websockets
 from websockets.extensions.permessage_deflate import PerMessageDeflate, ServerPerMessageDeflateFactory
 try:
@@ -44,7 +47,8 @@ import NetUtils
 import Utils
 from Utils import version_tuple, restricted_loads, Version, async_start, get_intended_text
 from NetUtils import Endpoint, ClientStatus, NetworkItem, decode, encode, NetworkPlayer, Permission, NetworkSlot, \
-    SlotType, LocationStore, MultiData, Hint, HintStatus
+    SlotType, LocationStore, MultiData, Hint, HintStatus, binary_encoding_tag, decode_binary, encode_binary, \
+    join_encoded
 from BaseClasses import ItemClassification
 
 
@@ -61,6 +65,13 @@ server_per_message_deflate_factory = ServerPerMessageDeflateFactory(
 )
 
 
+def add_to_container(container, value):
+    if isinstance(container, list) and isinstance(value, list):
+        container.extend(value)  # in place, instead of copying the whole list
+        return container
+    return container + value
+
+
 def remove_from_list(container, value):
     try:
         container.remove(value)
@@ -113,7 +124,8 @@ modify_functions = {
     "replace": lambda old, new: new,
     "default": lambda old, new: old,
     # numeric:
-    "add": operator.add,  # add together two objects, using python's "+" operator (works on strings and lists as append)
+    # add together two objects, using python's "+" operator (works on strings and lists as append)
+    "add": add_to_container,
     "mul": operator.mul,
     "pow": operator.pow,
     "mod": operator.mod,
@@ -156,6 +168,11 @@ class Client(Endpoint):
         "no_items",
         "no_locations",
         "no_text",
+        "binary_encoding",
+        "outbound",
+        "outbound_size",
+        "outbound_room_update",
+        "outbound_sender",
     )
 
     version: Version
@@ -171,6 +188,14 @@ class Client(Endpoint):
     no_items: bool
     no_locations: bool
     no_text: bool
+    binary_encoding: bool
+    """ client asked for MessagePack instead of JSON, by connecting with binary_encoding_tag """
+    outbound: list[tuple[str | bytes | dict[str, typing.Any], bool]]
+    """ queued (encoded message list or pending RoomUpdate, is text) entries, sent as one frame by outbound_sender """
+    outbound_size: int
+    outbound_room_update: int | None
+    """ index of the pending RoomUpdate in outbound, later RoomUpdates get merged into it in place """
+    outbound_sender: asyncio.Task[None] | None
 
     def __init__(self, socket: "ServerConnection", ctx: Context) -> None:
         super().__init__(socket)
@@ -187,6 +212,11 @@ class Client(Endpoint):
         self.no_items = False
         self.no_locations = False
         self.no_text = False
+        self.binary_encoding = False
+        self.outbound = []
+        self.outbound_size = 0
+        self.outbound_room_update = None
+        self.outbound_sender = None
 
     @property
     def items_handling(self):
@@ -213,9 +243,151 @@ class Client(Endpoint):
 team_slot = typing.Tuple[int, int]
 
 
+class SaveJournal:
+    """
+    Encodes savegames incrementally. The first record is a full snapshot as returned by Context.get_save,
+    every following record only holds what changed since the record before it, so it can be appended to the save.
+    Once the appended records outgrow the snapshot, a new snapshot is written in their place.
+    """
+    magic = b"APSJ"
+    record_header = struct.Struct(">I")
+    # keys of the save that are journaled per entry, everything else is written whole in every record
+    journaled_keys = frozenset(("version", "connect_names", "received_items", "location_checks", "hints",
+                                "stored_data"))
+
+    snapshot_size: int
+    records_size: int
+    received_items: typing.Dict[typing.Tuple[int, int, bool], int]
+    """ number of received items written per key """
+    changed_received_items: typing.Set[typing.Tuple[int, int, bool]]
+    changed_location_checks: typing.Set[team_slot]
+    changed_hints: typing.Set[team_slot]
+    changed_stored_data: typing.Set[str]
+    random_state: typing.Any
+    """ last written random_state, which only changes when the server rolls something """
+    stored_data_sizes: typing.Dict[str, int]
+    """ pickled size of the stored_data keys measured by get_stored_data_size, until they are marked as changed """
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        """Forget everything written so far, so the next record is a new snapshot."""
+        self.snapshot_size = 0
+        self.records_size = 0
+        self.received_items = {}
+        self.changed_received_items = set()
+        self.changed_location_checks = set()
+        self.changed_hints = set()
+        self.changed_stored_data = set()
+        self.random_state = None
+        self.stored_data_sizes = {}
+
+    # the journaled keys of the save are only written in a record if they were marked as changed since the last one
+    def mark_received_items(self, key: typing.Tuple[int, int, bool]) -> None:
+        self.changed_received_items.add(key)
+
+    def mark_location_checks(self, key: team_slot) -> None:
+        self.changed_location_checks.add(key)
+
+    def mark_hints(self, key: team_slot) -> None:
+        self.changed_hints.add(key)
+
+    def mark_stored_data(self, key: str) -> None:
+        self.changed_stored_data.add(key)
+        self.stored_data_sizes.pop(key, None)
+
+    def write(self, save: typing.Dict[str, typing.Any]) -> typing.Tuple[bool, bytes]:
+        """Encodes save. Returns whether the data is a new snapshot, which replaces all previously written data,
+        and the data, which otherwise is to be appended to the previously written data."""
+        snapshot = not self.snapshot_size
+        if not snapshot:
+            data = self._encode(self._get_changes(save))
+            snapshot = self.records_size + len(data) > self.snapshot_size
+        if snapshot:
+            data = self.magic + self._encode(save)
+            self.snapshot_size = len(data)
+            self.records_size = 0
+            self.received_items = {key: len(items) for key, items in save["received_items"].items()}
+        else:
+            self.records_size += len(data)
+            for key in self.changed_received_items:
+                self.received_items[key] = len(save["received_items"][key])
+        self.changed_received_items.clear()
+        self.changed_location_checks.clear()
+        self.changed_hints.clear()
+        self.changed_stored_data.clear()
+        self.random_state = save["random_state"]
+        return snapshot, data
+
+    def get_stored_data_size(self, key: str, value: typing.Any) -> int:
+        """Pickled size of value, the value of the stored_data key, which is only measured again once key changed."""
+        size = self.stored_data_sizes.get(key, None)
+        if size is None:
+            size = self.stored_data_sizes[key] = len(pickle.dumps(value))
+        return size
+
+    def _get_changes(self, save: typing.Dict[str, typing.Any]) -> typing.Dict[str, typing.Any]:
+        changes = {key: value for key, value in save.items() if key not in self.journaled_keys}
+        if changes["random_state"] == self.random_state:
+            del changes["random_state"]  # by far the largest of the other keys
+        # received items are only ever appended to
+        received_items = save["received_items"]
+        changes["received_items"] = {key: received_items[key][self.received_items.get(key, 0):]
+                                     for key in self.changed_received_items}
+        location_checks = save["location_checks"]
+        changes["location_checks"] = {key: location_checks[key] for key in self.changed_location_checks}
+        hints = save["hints"]
+        changes["hints"] = {key: hints[key] for key in self.changed_hints}
+        stored_data = save["stored_data"]
+        changes["stored_data"] = {key: stored_data[key] for key in self.changed_stored_data if key in stored_data}
+        return changes
+
+    @classmethod
+    def _encode(cls, record: dict) -> bytes:
+        # Does not use Utils.restricted_dumps because we'd rather make a save than not make one
+        encoded = zlib.compress(pickle.dumps(record))
+        return cls.record_header.pack(len(encoded)) + encoded
+
+    @classmethod
+    def load(cls, data: bytes) -> typing.Dict[str, typing.Any]:
+        """Decodes a savegame written by SaveJournal, or a single pickle as written before it."""
+        if not data.startswith(cls.magic):
+            if data[:1] == b"\x80":  # uncompressed pickle, as written by WebHost
+                return restricted_loads(data)
+            return restricted_loads(zlib.decompress(data))
+        view = memoryview(data)
+        position = len(cls.magic)
+        save: typing.Optional[typing.Dict[str, typing.Any]] = None
+        while position + cls.record_header.size <= len(data):
+            size, = cls.record_header.unpack_from(data, position)
+            position += cls.record_header.size
+            if position + size > len(data):
+                break  # incomplete record, the write of it was interrupted
+            record = restricted_loads(zlib.decompress(view[position:position + size]))
+            position += size
+            if save is None:
+                save = record
+                continue
+            for key, value in record.items():
+                if key == "received_items":
+                    for items_key, items in value.items():
+                        save[key].setdefault(items_key, []).extend(items)
+                elif key in cls.journaled_keys:
+                    save[key].update(value)
+                else:
+                    save[key] = value
+        if save is None:
+            raise ValueError("Save journal does not contain a snapshot.")
+        return save
+
+
 class Context:
     dumper = staticmethod(encode)
     loader = staticmethod(decode)
+    binary_dumper = staticmethod(encode_binary)
+    binary_loader = staticmethod(functools.partial(decode_binary, untrusted=True))
 
     simple_options = {"hint_cost": int,
                       "location_check_points": int,
@@ -229,18 +401,38 @@ class Context:
                       "compatibility": int}
     # team -> slot id -> list of clients authenticated to slot.
     clients: typing.Dict[int, typing.Dict[int, typing.List[Client]]]
+    # team -> tag -> clients authenticated with that tag, used for Bounce
+    clients_by_tag: typing.Dict[int, typing.Dict[str, typing.Set[Client]]]
+    slots_by_game: typing.Dict[str, typing.Set[int]]
     endpoints: list[Client]
     locations: LocationStore  # typing.Dict[int, typing.Dict[int, typing.Tuple[int, int, int]]]
     location_checks: typing.Dict[typing.Tuple[int, int], typing.Set[int]]
+    received_items: typing.Dict[typing.Tuple[int, int, bool], typing.List[NetworkItem]]
+    new_received_items: typing.Set[typing.Tuple[int, int, bool]]
+    """ keys of received_items that grew since the last send_new_items """
     hints_used: typing.Dict[typing.Tuple[int, int], int]
+    hint_index: typing.Dict[typing.Tuple[int, int, int], Hint]
+    """ hints as stored for their finding player, keyed by (team, finding_player, location) """
     groups: typing.Dict[int, typing.Set[int]]
+    outbound_queue_limit: int = 64 * 1024 * 1024
+    """ characters of queued messages per client, past which its queued text is dropped """
+    outbound_frame_size: int = 1024 * 1024
+    """ characters of queued messages past which a new frame is started, well below the max_size of clients """
     save_version = 2
+    save_filename: typing.Optional[str]
+    save_journal: SaveJournal
     stored_data: typing.Dict[str, object]
     read_data: typing.Dict[str, object]
     stored_data_notification_clients: typing.Dict[str, typing.Set[Client]]
+    stored_data_delta_clients: typing.Dict[str, typing.Set[Client]]
+    """ clients that registered for SetReply of a key with "delta", a subset of stored_data_notification_clients """
     slot_info: typing.Dict[int, NetworkSlot]
     generator_version = Version(0, 0, 0)
     checksums: typing.Dict[str, str]
+    encoded_game_packages: typing.Dict[str, str]
+    """ encoded data package of each game, keyed by checksum, see get_data_package_msg """
+    binary_encoded_game_packages: typing.Dict[str, bytes]
+    """ as encoded_game_packages, encoded with binary_dumper """
     item_names: typing.Dict[str, typing.Dict[int, str]]
     item_name_groups: typing.Dict[str, typing.Dict[str, typing.Set[str]]]
     location_names: typing.Dict[str, typing.Dict[int, str]]
@@ -248,8 +440,6 @@ class Context:
     all_item_and_group_names: typing.Dict[str, typing.Set[str]]
     all_location_and_group_names: typing.Dict[str, typing.Set[str]]
     non_hintable_names: typing.Dict[str, typing.AbstractSet[str]]
-    spheres: typing.List[typing.Dict[int, typing.Set[int]]]
-    """ each sphere is { player: { location_id, ... } } """
     logger: logging.Logger
 
     def __init__(self, host: str, port: int, server_password: str, password: str, location_check_points: int,
@@ -262,6 +452,8 @@ class Context:
         self.log_network = log_network
         self.endpoints = []
         self.clients = {}
+        self.clients_by_tag = {}
+        self.slots_by_game = {}
         self.compatibility: int = compatibility
         self.shutdown_task = None
         self.data_filename = None
@@ -278,6 +470,7 @@ class Context:
         self.server = None
         self.countdown_timer = 0
         self.received_items = {}
+        self.new_received_items = set()
         self.start_inventory = {}
         self.name_aliases: typing.Dict[team_slot, str] = {}
         self.location_checks = collections.defaultdict(set)
@@ -285,6 +478,7 @@ class Context:
         self.location_check_points = location_check_points
         self.hints_used = collections.defaultdict(int)
         self.hints: typing.Dict[team_slot, typing.Set[Hint]] = collections.defaultdict(set)
+        self.hint_index = {}
         self.release_mode: str = release_mode
         self.remaining_mode: str = remaining_mode
         self.collect_mode: str = collect_mode
@@ -304,7 +498,8 @@ class Context:
         self.auto_save_interval = 60  # in seconds
         self.auto_saver_thread: typing.Optional[threading.Thread] = None
         self.save_dirty = False
-        self.tags = ['AP']
+        self.save_journal = SaveJournal()
+        self.tags = ['AP', binary_encoding_tag]
         self.games: typing.Dict[int, str] = {}
         self.minimum_client_versions: typing.Dict[int, Version] = {}
         self.seed_name = ""
@@ -313,12 +508,14 @@ class Context:
         self.random = random.Random()
         self.stored_data = {}
         self.stored_data_notification_clients = collections.defaultdict(weakref.WeakSet)
+        self.stored_data_delta_clients = collections.defaultdict(weakref.WeakSet)
         self.read_data = {}
-        self.spheres = []
 
         # init empty to satisfy linter, I suppose
         self.gamespackage = {}
         self.checksums = {}
+        self.encoded_game_packages = {}
+        self.binary_encoded_game_packages = {}
         self.item_name_groups = {}
         self.location_name_groups = {}
         self.all_item_and_group_names = {}
@@ -345,8 +542,8 @@ class Context:
 
         for game_package in self.gamespackage.values():
             # remove groups from data sent to clients
-            del game_package["item_name_groups"]
-            del game_package["location_name_groups"]
+            game_package.pop("item_name_groups", None)
+            game_package.pop("location_name_groups", None)
 
     def _init_game_data(self):
         for game_name, game_package in self.gamespackage.items():
@@ -374,60 +571,148 @@ class Context:
     def location_names_for_game(self, game: str) -> typing.Optional[typing.Dict[str, int]]:
         return self.gamespackage[game]["location_name_to_id"] if game in self.gamespackage else None
 
+    def get_data_package_msg(self, games: typing.Iterable[str], binary: bool = False) -> str | bytes:
+        """Encoded DataPackage message for the given games, encoded with binary_dumper if binary.
+        The data package of each game only gets encoded once per encoding."""
+        dumper = self.binary_dumper if binary else self.dumper
+        cache = self.binary_encoded_game_packages if binary else self.encoded_game_packages
+        encoded_games = []
+        for game in games:
+            game_package = self.gamespackage[game]
+            checksum = game_package.get("checksum")
+            encoded_game_package = cache.get(checksum) if checksum else None
+            if encoded_game_package is None:
+                encoded_game_package = dumper(game_package)
+                if checksum:
+                    cache[checksum] = encoded_game_package
+            encoded_games.append((dumper(game), encoded_game_package))
+        if binary:
+            packer = msgpack.Packer()
+            header = (packer.pack_array_header(1) + packer.pack_map_header(2) + packer.pack("cmd")
+                      + packer.pack("DataPackage") + packer.pack("data") + packer.pack_map_header(1)
+                      + packer.pack("games") + packer.pack_map_header(len(encoded_games)))
+            return header + b"".join(game + package for game, package in encoded_games)
+        return ('[{"cmd":"DataPackage","data":{"games":{'
+                + ",".join(f"{game}:{package}" for game, package in encoded_games) + "}}}]")
+
     # General networking
-    async def send_msgs(self, endpoint: Endpoint, msgs: typing.Iterable[dict]) -> bool:
+    async def send_msgs(self, endpoint: Endpoint, msgs: typing.Sequence[typing.Dict[str, typing.Any]]) -> bool:
+        return self.queue_msgs(endpoint, msgs)
+
+    async def send_encoded_msgs(self, endpoint: Endpoint, msg: str | bytes) -> bool:
+        return self.queue_encoded_msgs(endpoint, msg)
+
+    async def broadcast_send_encoded_msgs(self, endpoints: typing.Iterable[Endpoint], msg: str) -> bool:
+        for endpoint in endpoints:
+            self.queue_encoded_msgs(endpoint, msg)
+        return True
+
+    def queue_msgs(self, endpoint: Client, msgs: typing.Sequence[typing.Dict[str, typing.Any]]) -> bool:
+        """Queues msgs for endpoint, to be sent in one frame with everything else queued for it in this tick."""
         if not endpoint.socket or not endpoint.socket.open:
             return False
-        msg = self.dumper(msgs)
-        try:
-            await endpoint.socket.send(msg)
-        except websockets.ConnectionClosed:
-            self.logger.exception(f"Exception during send_msgs, could not send {msg}")
-            await self.disconnect(endpoint)
-            return False
-        else:
-            if self.log_network:
-                self.logger.info(f"Outgoing message: {msg}")
-            return True
+        data = self.binary_dumper(msgs) if endpoint.binary_encoding else self.dumper(msgs)
+        return self.queue_encoded_msgs(endpoint, data, all(msg["cmd"] == "PrintJSON" for msg in msgs))
 
-    async def send_encoded_msgs(self, endpoint: Endpoint, msg: str) -> bool:
+    def queue_encoded_msgs(self, endpoint: Client, msg: str | bytes, is_text: bool = False) -> bool:
+        """Queues an encoded message list for endpoint, see queue_msgs."""
         if not endpoint.socket or not endpoint.socket.open:
             return False
-        try:
-            await endpoint.socket.send(msg)
-        except websockets.ConnectionClosed:
-            self.logger.exception("Exception during send_encoded_msgs")
-            await self.disconnect(endpoint)
+        endpoint.outbound.append((msg, is_text))
+        endpoint.outbound_size += len(msg)
+        if endpoint.outbound_size > self.outbound_queue_limit:
+            self.shed_outbound(endpoint)
+        self.start_outbound_sender(endpoint)
+        return True
+
+    def queue_room_update(self, endpoint: Client, update: dict) -> bool:
+        """Queues a RoomUpdate for endpoint, merging it into a RoomUpdate that is still waiting to be sent."""
+        if not endpoint.socket or not endpoint.socket.open:
             return False
+        if endpoint.outbound_room_update is not None:
+            previous: dict = endpoint.outbound[endpoint.outbound_room_update][0]
+            merged = {**previous, **update}
+            if "checked_locations" in previous and "checked_locations" in update:
+                # checked_locations may only contain the new checks, so keep the ones of both
+                merged["checked_locations"] = sorted(set(previous["checked_locations"])
+                                                     .union(update["checked_locations"]))
+            endpoint.outbound[endpoint.outbound_room_update] = (merged, False)
         else:
-            if self.log_network:
-                self.logger.info(f"Outgoing message: {msg}")
-            return True
+            endpoint.outbound_room_update = len(endpoint.outbound)
+            endpoint.outbound.append((update, False))
+        self.start_outbound_sender(endpoint)
+        return True
 
-    async def broadcast_send_encoded_msgs(self, endpoints: typing.Iterable[Endpoint], msg: str) -> bool:
-        sockets = []
-        for endpoint in endpoints:
-            if endpoint.socket and endpoint.socket.open:
-                sockets.append(endpoint.socket)
+    def shed_outbound(self, endpoint: Client):
+        """Drops text queued for an endpoint that doesn't keep up, closing the connection if that isn't enough."""
+        endpoint.outbound = [entry for entry in endpoint.outbound if not entry[1]]
+        endpoint.outbound_size = 0
+        endpoint.outbound_room_update = None
+        for index, (payload, _) in enumerate(endpoint.outbound):
+            if isinstance(payload, dict):
+                endpoint.outbound_room_update = index
+            else:
+                endpoint.outbound_size += len(payload)
+        if endpoint.outbound_size > self.outbound_queue_limit and len(endpoint.outbound) > 1:
+            self.logger.warning(f"Closing connection of {endpoint.name}, "
+                                f"it fell {endpoint.outbound_size} bytes behind on outgoing messages.")
+            endpoint.outbound.clear()
+            endpoint.outbound_size = 0
+            endpoint.outbound_room_update = None
+            async_start(endpoint.socket.close(1013, "too far behind on outgoing messages"))
+
+    def start_outbound_sender(self, endpoint: Client):
+        if endpoint.outbound_sender is None:
+            endpoint.outbound_sender = asyncio.create_task(self.send_outbound(endpoint))
+
+    def pop_outbound_frames(self, endpoint: Client) -> list[str | bytes]:
+        """Joins the queued messages of endpoint into as few message lists of up to outbound_frame_size as possible
+        and empties the queue. JSON passed to send_encoded_msgs is still sent as text to binary_encoding clients."""
+        frames: list[str | bytes] = []
+        parts: list[str | bytes] = []
+        size = 0
+        for payload, _ in endpoint.outbound:
+            if isinstance(payload, dict):
+                payload = self.binary_dumper([payload]) if endpoint.binary_encoding else self.dumper([payload])
+            elif payload == "[]" or payload == b"\x90":
+                continue
+            if parts and (type(parts[0]) is not type(payload) or size + len(payload) > self.outbound_frame_size):
+                frames.append(join_encoded(parts))
+                parts = []
+                size = 0
+            parts.append(payload)
+            size += len(payload)
+        if parts:
+            frames.append(join_encoded(parts))
+        endpoint.outbound.clear()
+        endpoint.outbound_size = 0
+        endpoint.outbound_room_update = None
+        return frames
+
+    async def send_outbound(self, endpoint: Client):
+        """Sends the queue of endpoint until it is empty, waiting for the connection to drain in between.
+        Messages queued while it waits are coalesced into the next frame."""
         try:
-            websockets.broadcast(sockets, msg)
-        except RuntimeError:
-            self.logger.exception("Exception during broadcast_send_encoded_msgs")
-            return False
-        else:
-            if self.log_network:
-                self.logger.info(f"Outgoing broadcast: {msg}")
-            return True
+            while endpoint.outbound:
+                for msg in self.pop_outbound_frames(endpoint):
+                    await endpoint.socket.send(msg)
+                    if self.log_network:
+                        self.logger.info(f"Outgoing message: {msg}")
+        except websockets.ConnectionClosed:
+            self.logger.exception("Exception during send_outbound")
+            endpoint.outbound.clear()
+            await self.disconnect(endpoint)
+        finally:
+            endpoint.outbound_sender = None
 
     def broadcast_all(self, msgs: typing.List[dict]):
         msg_is_text = all(msg["cmd"] == "PrintJSON" for msg in msgs)
-        data = self.dumper(msgs)
         endpoints = (
             endpoint
             for endpoint in self.endpoints
             if endpoint.auth and not (msg_is_text and endpoint.no_text)
         )
-        async_start(self.broadcast_send_encoded_msgs(endpoints, data))
+        self.broadcast(endpoints, msgs)
 
     def broadcast_text_all(self, text: str, additional_arguments: dict = {}):
         self.logger.info("Notice (all): %s" % text)
@@ -435,37 +720,80 @@ class Context:
 
     def broadcast_team(self, team: int, msgs: typing.List[dict]):
         msg_is_text = all(msg["cmd"] == "PrintJSON" for msg in msgs)
-        data = self.dumper(msgs)
         endpoints = (
             endpoint
             for endpoint in itertools.chain.from_iterable(self.clients[team].values())
             if not (msg_is_text and endpoint.no_text)
         )
-        async_start(self.broadcast_send_encoded_msgs(endpoints, data))
+        self.broadcast(endpoints, msgs)
 
-    def broadcast(self, endpoints: typing.Iterable[Client], msgs: typing.List[dict]):
-        msgs = self.dumper(msgs)
-        async_start(self.broadcast_send_encoded_msgs(endpoints, msgs))
+    def broadcast(self, endpoints: typing.Iterable[Client], msgs: typing.List[typing.Dict[str, typing.Any]]):
+        if len(msgs) == 1 and msgs[0]["cmd"] == "RoomUpdate":
+            for endpoint in endpoints:
+                self.queue_room_update(endpoint, msgs[0])
+        else:
+            msg_is_text = all(msg["cmd"] == "PrintJSON" for msg in msgs)
+            data: str | None = None
+            binary_data: bytes | None = None
+            for endpoint in endpoints:
+                if endpoint.binary_encoding:
+                    if binary_data is None:
+                        binary_data = self.binary_dumper(msgs)
+                    self.queue_encoded_msgs(endpoint, binary_data, msg_is_text)
+                else:
+                    if data is None:
+                        data = self.dumper(msgs)
+                    self.queue_encoded_msgs(endpoint, data, msg_is_text)
 
     async def disconnect(self, endpoint: Client):
+        endpoint.outbound.clear()
         if endpoint in self.endpoints:
             self.endpoints.remove(endpoint)
         if endpoint.slot and endpoint in self.clients[endpoint.team][endpoint.slot]:
             self.clients[endpoint.team][endpoint.slot].remove(endpoint)
+        if endpoint.team is not None:
+            self.remove_client_tags(endpoint, endpoint.tags)
         await on_client_disconnected(self, endpoint)
 
+    def add_client_tags(self, client: Client) -> None:
+        """Adds an authenticated client to the tag index of its team."""
+        clients_by_tag = self.clients_by_tag.setdefault(client.team, {})
+        for tag in client.tags:
+            clients_by_tag.setdefault(tag, set()).add(client)
+
+    def remove_client_tags(self, client: Client, tags: typing.Iterable[str]) -> None:
+        """Removes a client from the tag index of its team, for the tags it was added with."""
+        clients_by_tag = self.clients_by_tag.get(client.team, {})
+        for tag in tags:
+            tagged = clients_by_tag.get(tag, None)
+            if tagged is not None:
+                tagged.discard(client)
+                if not tagged:
+                    del clients_by_tag[tag]
+
+    def get_bounce_targets(self, team: int, games: typing.Iterable[str], tags: typing.Iterable[str],
+                           slots: typing.Iterable[int]) -> typing.Set[Client]:
+        """Returns the authenticated clients of team that play one of games, have one of tags or are one of slots."""
+        team_clients = self.clients.get(team, {})
+        clients_by_tag = self.clients_by_tag.get(team, {})
+        targets: typing.Set[Client] = set()
+        for slot in itertools.chain(slots, *(self.slots_by_game.get(game, ()) for game in games)):
+            targets.update(team_clients.get(slot, ()))
+        for tag in tags:
+            targets.update(clients_by_tag.get(tag, ()))
+        return targets
+
     def notify_client(self, client: Client, text: str, additional_arguments: dict = {}):
         if not client.auth or client.no_text:
             return
         self.logger.info("Notice (Player %s in team %d): %s" % (client.name, client.team + 1, text))
-        async_start(self.send_msgs(client, [{"cmd": "PrintJSON", "data": [{ "text": text }], **additional_arguments}]))
+        self.queue_msgs(client, [{"cmd": "PrintJSON", "data": [{ "text": text }], **additional_arguments}])
 
     def notify_client_multiple(self, client: Client, texts: typing.List[str], additional_arguments: dict = {}):
         if not client.auth or client.no_text:
             return
-        async_start(self.send_msgs(client,
-                                   [{"cmd": "PrintJSON", "data": [{ "text": text }], **additional_arguments}
-                                    for text in texts]))
+        self.queue_msgs(client, [{"cmd": "PrintJSON", "data": [{ "text": text }], **additional_arguments}
+                                 for text in texts])
 
     # loading
     def load(self, multidatapath: str, use_embedded_server_options: bool = False):
@@ -480,7 +808,12 @@ class Context:
                     raise Exception("No .archipelago found in archive.")
         else:
             with open(multidatapath, 'rb') as f:
-                data = f.read()
+                if f.read(1)[0] >= 4:
+                    # the columnar format is used directly from the mapped file
+                    data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                else:
+                    f.seek(0)
+                    data = f.read()
 
         self._load(self.decompress(data), {}, use_embedded_server_options)
         self.data_filename = multidatapath
@@ -488,8 +821,10 @@ class Context:
     @staticmethod
     def decompress(data: bytes) -> dict:
         format_version = data[0]
-        if format_version > 3:
+        if format_version > NetUtils.multidata_format_version:
             raise Utils.VersionException("Incompatible multidata.")
+        if format_version >= 4:
+            return NetUtils.load_multidata(data)
         return restricted_loads(zlib.decompress(data[1:]))
 
     def _load(self, decoded_obj: MultiData, game_data_packages: typing.Dict[str, typing.Any],
@@ -515,6 +850,9 @@ class Context:
 
         self.slot_info = decoded_obj["slot_info"]
         self.games = {slot: slot_info.game for slot, slot_info in self.slot_info.items()}
+        self.slots_by_game = {}
+        for slot, game in self.games.items():
+            self.slots_by_game.setdefault(game, set()).add(slot)
         self.groups = {slot: set(slot_info.group_members) for slot, slot_info in self.slot_info.items()
                        if slot_info.type == SlotType.group}
 
@@ -535,10 +873,14 @@ class Context:
         self.seed_name = decoded_obj["seed_name"]
         self.random.seed(self.seed_name)
         self.connect_names = decoded_obj['connect_names']
-        self.locations = LocationStore(decoded_obj.pop("locations"))  # pre-emptively free memory
+        locations = decoded_obj.pop("locations")  # pre-emptively free memory
+        if not isinstance(locations, LocationStore):
+            locations = LocationStore(locations, decoded_obj.pop("spheres", None))
+        self.locations = locations
         self.slot_data = decoded_obj['slot_data']
-        for slot, data in self.slot_data.items():
-            self.read_data[f"slot_data_{slot}"] = lambda data=data: data
+        for slot in self.slot_data:
+            # slot data may be decoded lazily, so only look it up when it is requested
+            self.read_data[f"slot_data_{slot}"] = lambda slot=slot: self.slot_data[slot]
         self.er_hint_data = {int(player): {int(address): name for address, name in loc_data.items()}
                              for player, loc_data in decoded_obj["er_hint_data"].items()}
 
@@ -548,6 +890,8 @@ class Context:
 
         for slot, hints in decoded_obj["precollected_hints"].items():
             self.hints[0, slot].update(hints)
+            self.index_hints(0, slot)
+            self.save_journal.mark_hints((0, slot))
 
         # declare slots that aren't players as done
         for slot, slot_info in self.slot_info.items():
@@ -576,9 +920,6 @@ class Context:
         for game_name, data in self.location_name_groups.items():
             self.read_data[f"location_name_groups_{game_name}"] = lambda lgame=game_name: self.location_name_groups[lgame]
 
-        # sorted access spheres
-        self.spheres = decoded_obj.get("spheres", [])
-
     # saving
 
     def save(self, now=False) -> bool:
@@ -593,16 +934,17 @@ class Context:
         return False
 
     def _save(self, exit_save: bool = False) -> bool:
-        try:
-            # Does not use Utils.restricted_dumps because we'd rather make a save than not make one
-            encoded_save = pickle.dumps(self.get_save())
-            with open(self.save_filename, "wb") as f:
-                f.write(zlib.compress(encoded_save))
-        except Exception as e:
-            self.logger.exception(e)
-            return False
-        else:
-            return True
+        with self.save_journal.lock:
+            try:
+                snapshot, data = self.save_journal.write(self.get_save())
+                with open(self.save_filename, "wb" if snapshot else "ab") as f:
+                    f.write(data)
+            except Exception as e:
+                self.save_journal.reset()  # the file may be incomplete now, so rewrite it whole next time
+                self.logger.exception(e)
+                return False
+            else:
+                return True
 
     def init_save(self, enabled: bool = True):
         self.saving = enabled
@@ -614,7 +956,7 @@ class Context:
                     else self.data_filename + '_' + 'apsave'
             try:
                 with open(self.save_filename, 'rb') as f:
-                    save_data = restricted_loads(zlib.decompress(f.read()))
+                    save_data = SaveJournal.load(f.read())
                     self.set_save(save_data)
             except FileNotFoundError:
                 self.logger.error('No save data found, starting a new game')
@@ -653,7 +995,7 @@ class Context:
                 import atexit
                 atexit.register(self._save, True)  # make sure we save on exit too
 
-    def get_save(self) -> dict:
+    def get_save(self) -> typing.Dict[str, typing.Any]:
         self.recheck_hints()
         d = {
             "version": self.save_version,
@@ -690,6 +1032,9 @@ class Context:
         self.received_items = savedata["received_items"]
         self.hints_used.update(savedata["hints_used"])
         self.hints.update(savedata["hints"])
+        self.hint_index.clear()
+        for team, slot in self.hints:
+            self.index_hints(team, slot)
 
         self.name_aliases.update(savedata["name_aliases"])
         self.client_game_state.update(savedata["client_game_state"])
@@ -719,6 +1064,7 @@ class Context:
 
         if "stored_data" in savedata:
             self.stored_data = savedata["stored_data"]
+        self.save_journal.reset()
         # count items and slots from lists for items_handling = remote
         self.logger.info(
             f'Loaded save file with {sum([len(v) for k, v in self.received_items.items() if k[2]])} received items '
@@ -748,12 +1094,38 @@ class Context:
                 new_hints.add(new_hint)
                 if hint == new_hint:
                     continue
+                self.save_journal.mark_hints((hint_team, hint_slot))
                 for player in self.slot_set(hint.receiving_player) | {hint.finding_player}:
                     if changed is not None:
                         changed.add((hint_team,player))
                     if slot is not None and slot != player:
                         self.replace_hint(hint_team, player, hint, new_hint)
             self.hints[hint_team, hint_slot] = new_hints
+            self.index_hints(hint_team, hint_slot)
+
+    def recheck_location_hints(self, team: int, slot: int, locations: typing.Iterable[int],
+                               changed: typing.Optional[typing.Set[team_slot]] = None) -> None:
+        """Refreshes only the hints for the specified locations of team/slot, such as after they got checked.
+        If a set is passed for 'changed', each (team,slot) pair that has at least one hint modified
+        will be added to the set.
+        """
+        for location in locations:
+            hint = self.hint_index.get((team, slot, location), None)
+            if hint is None:
+                continue
+            new_hint = hint.re_check(self, team)
+            if hint == new_hint:
+                continue
+            for player in self.slot_set(hint.receiving_player) | {slot}:
+                if changed is not None:
+                    changed.add((team, player))
+                self.replace_hint(team, player, hint, new_hint)
+
+    def index_hints(self, team: int, slot: int) -> None:
+        """Adds the hints found by team/slot to the hint index, to be called after replacing its hints."""
+        for hint in self.hints[team, slot]:
+            if hint.finding_player == slot:
+                self.hint_index[team, slot, hint.location] = hint
 
     def get_rechecked_hints(self, team: int, slot: int):
         self.recheck_hints(team, slot)
@@ -761,12 +1133,15 @@ class Context:
 
     def get_sphere(self, player: int, location_id: int) -> int:
         """Get sphere of a location, -1 if spheres are not available."""
-        if self.spheres:
-            for i, sphere in enumerate(self.spheres):
-                if location_id in sphere.get(player, set()):
-                    return i
-            raise KeyError(f"No Sphere found for location ID {location_id} belonging to player {player}. "
-                           f"Location or player may not exist.")
+        if self.locations.sphere_count:
+            try:
+                sphere = self.locations.get_sphere(player, location_id)
+            except KeyError:
+                sphere = -1
+            if sphere < 0:
+                raise KeyError(f"No Sphere found for location ID {location_id} belonging to player {player}. "
+                               f"Location or player may not exist.")
+            return sphere
         return -1
 
     def get_players_package(self):
@@ -825,9 +1200,12 @@ class Context:
                 # we can check once if hint already exists
                 if hint not in self.hints[team, hint.finding_player]:
                     self.hints[team, hint.finding_player].add(hint)
+                    self.hint_index[team, hint.finding_player, hint.location] = hint
+                    self.save_journal.mark_hints((team, hint.finding_player))
                     new_hint_events.add(hint.finding_player)
                     for player in self.slot_set(hint.receiving_player):
                         self.hints[team, player].add(hint)
+                        self.save_journal.mark_hints((team, player))
                         new_hint_events.add(player)
 
             self.logger.info("Notice (Team #%d): %s" % (team + 1, format_hint(self, team, hint)))
@@ -840,18 +1218,18 @@ class Context:
                     continue
                 client_hints = [datum[1] for datum in sorted(hint_data, key=lambda x: x[0].finding_player != slot)]
                 for client in clients:
-                    async_start(self.send_msgs(client, client_hints))
+                    self.queue_msgs(client, client_hints)
 
     def get_hint(self, team: int, finding_player: int, seeked_location: int) -> typing.Optional[Hint]:
-        for hint in self.hints[team, finding_player]:
-            if hint.location == seeked_location and hint.finding_player == finding_player:
-                return hint
-        return None
+        return self.hint_index.get((team, finding_player, seeked_location), None)
     
     def replace_hint(self, team: int, slot: int, old_hint: Hint, new_hint: Hint) -> None:
         if old_hint in self.hints[team, slot]:
             self.hints[team, slot].remove(old_hint)
             self.hints[team, slot].add(new_hint)
+            self.save_journal.mark_hints((team, slot))
+            if slot == new_hint.finding_player:
+                self.hint_index[team, slot, new_hint.location] = new_hint
     
     # "events"
 
@@ -886,12 +1264,8 @@ class Context:
 
 
 def update_aliases(ctx: Context, team: int):
-    cmd = ctx.dumper([{"cmd": "RoomUpdate",
-                       "players": ctx.get_players_package()}])
-
-    for clients in ctx.clients[team].values():
-        for client in clients:
-            async_start(ctx.send_encoded_msgs(client, cmd))
+    ctx.broadcast(itertools.chain.from_iterable(ctx.clients[team].values()),
+                  [{"cmd": "RoomUpdate", "players": ctx.get_players_package()}])
 
 
 async def server(websocket: "ServerConnection", path: str = "/", ctx: Context = None) -> None:
@@ -907,7 +1281,7 @@ async def server(websocket: "ServerConnection", path: str = "/", ctx: Context =
         async for data in websocket:
             if ctx.log_network:
                 ctx.logger.info(f"Incoming message: {data}")
-            for msg in decode(data):
+            for msg in (ctx.binary_loader(data) if isinstance(data, bytes) else ctx.loader(data)):
                 await process_client_cmd(ctx, client, msg)
     except Exception as e:
         if not isinstance(e, websockets.WebSocketException):
@@ -1068,20 +1442,20 @@ def get_start_inventory(ctx: Context, player: int, remote_start_inventory: bool)
 
 
 def send_new_items(ctx: Context):
-    for team, clients in ctx.clients.items():
-        for slot, clients in clients.items():
-            for client in clients:
-                if client.no_items:
-                    continue
-                start_inventory = get_start_inventory(ctx, slot, client.remote_start_inventory)
-                items = get_received_items(ctx, team, slot, client.remote_items)
-                if len(start_inventory) + len(items) > client.send_index:
-                    first_new_item = max(0, client.send_index - len(start_inventory))
-                    async_start(ctx.send_msgs(client, [{
-                        "cmd": "ReceivedItems",
-                        "index": client.send_index,
-                        "items": start_inventory[client.send_index:] + items[first_new_item:]}]))
-                    client.send_index = len(start_inventory) + len(items)
+    for team, slot, remote_items in ctx.new_received_items:
+        for client in ctx.clients.get(team, {}).get(slot, ()):
+            if client.no_items or client.remote_items != remote_items:
+                continue
+            start_inventory = get_start_inventory(ctx, slot, client.remote_start_inventory)
+            items = get_received_items(ctx, team, slot, remote_items)
+            if len(start_inventory) + len(items) > client.send_index:
+                first_new_item = max(0, client.send_index - len(start_inventory))
+                ctx.queue_msgs(client, [{
+                    "cmd": "ReceivedItems",
+                    "index": client.send_index,
+                    "items": start_inventory[client.send_index:] + items[first_new_item:]}])
+                client.send_index = len(start_inventory) + len(items)
+    ctx.new_received_items.clear()
 
 
 def update_checked_locations(ctx: Context, team: int, slot: int):
@@ -1128,7 +1502,12 @@ def send_items_to(ctx: Context, team: int, target_slot: int, *items: NetworkItem
         for item in items:
             if item.player != target_slot:
                 get_received_items(ctx, team, target, False).append(item)
+                ctx.new_received_items.add((team, target, False))
+                ctx.save_journal.mark_received_items((team, target, False))
             get_received_items(ctx, team, target, True).append(item)
+        if items:
+            ctx.new_received_items.add((team, target, True))
+            ctx.save_journal.mark_received_items((team, target, True))
 
 
 def register_location_checks(ctx: Context, team: int, slot: int, locations: typing.Iterable[int],
@@ -1166,6 +1545,7 @@ def register_location_checks(ctx: Context, team: int, slot: int, locations: typi
         del sortable
 
         ctx.location_checks[team, slot] |= new_locations
+        ctx.save_journal.mark_location_checks((team, slot))
         send_new_items(ctx)
         ctx.broadcast(ctx.clients[team][slot], [{
             "cmd": "RoomUpdate",
@@ -1173,7 +1553,7 @@ def register_location_checks(ctx: Context, team: int, slot: int, locations: typi
             "checked_locations": new_locations,  # send back new checks only
         }])
         updated_slots: typing.Set[tuple[int, int]] = set()
-        ctx.recheck_hints(team, slot, updated_slots)
+        ctx.recheck_location_hints(team, slot, new_locations, updated_slots)
         for hint_team, hint_slot in updated_slots:
             ctx.on_changed_hints(hint_team, hint_slot)
         ctx.save()
@@ -1675,6 +2055,10 @@ class ClientMessageProcessor(CommonCommandProcessor):
                 new_item = NetworkItem(names[item_name], -1, self.client.slot)
                 get_received_items(self.ctx, self.client.team, self.client.slot, False).append(new_item)
                 get_received_items(self.ctx, self.client.team, self.client.slot, True).append(new_item)
+                self.ctx.new_received_items.add((self.client.team, self.client.slot, False))
+                self.ctx.new_received_items.add((self.client.team, self.client.slot, True))
+                self.ctx.save_journal.mark_received_items((self.client.team, self.client.slot, False))
+                self.ctx.save_journal.mark_received_items((self.client.team, self.client.slot, True))
                 self.ctx.broadcast_text_all(
                     'Cheat console: sending "' + item_name + '" to ' + self.ctx.get_aliased_name(self.client.team,
                                                                                                  self.client.slot),
@@ -1695,6 +2079,8 @@ class ClientMessageProcessor(CommonCommandProcessor):
             hints = {hint.re_check(self.ctx, self.client.team) for hint in
                      self.ctx.hints[self.client.team, self.client.slot]}
             self.ctx.hints[self.client.team, self.client.slot] = hints
+            self.ctx.save_journal.mark_hints((self.client.team, self.client.slot))
+            self.ctx.index_hints(self.client.team, self.client.slot)
             self.ctx.notify_hints(self.client.team, list(hints), recipients=(self.client.slot,))
             self.output(f"A hint costs {self.ctx.get_hint_cost(self.client.slot)} points. "
                         f"You have {points_available} points.")
@@ -1852,7 +2238,7 @@ def get_slot_points(ctx: Context, team: int, slot: int) -> int:
             ctx.get_hint_cost(slot) * ctx.hints_used[team, slot])
 
 
-async def process_client_cmd(ctx: Context, client: Client, args: dict):
+async def process_client_cmd(ctx: Context, client: Client, args: typing.Dict[str, typing.Any]):
     try:
         cmd: str = args["cmd"]
     except:
@@ -1903,6 +2289,8 @@ async def process_client_cmd(ctx: Context, client: Client, args: dict):
             await ctx.send_msgs(client, [{"cmd": "ConnectionRefused", "errors": list(errors)}])
         else:
             team, slot = ctx.connect_names[args['name']]
+            if client.team is not None:
+                ctx.remove_client_tags(client, client.tags)
             if client.auth and client.team is not None and client.slot in ctx.clients[client.team]:
                 ctx.clients[team][slot].remove(client)  # re-auth, remove old entry
                 if client.team != team or client.slot != slot:
@@ -1914,9 +2302,11 @@ async def process_client_cmd(ctx: Context, client: Client, args: dict):
             ctx.clients[team][slot].append(client)
             client.version = args['version']
             client.tags = args['tags']
+            ctx.add_client_tags(client)
             client.no_locations = bool(client.tags & _non_game_messages.keys())
             # set NoText for old PopTracker clients that predate the tag to save traffic
             client.no_text = "NoText" in client.tags or ("PopTracker" in client.tags and client.version < (0, 5, 1))
+            client.binary_encoding = binary_encoding_tag in client.tags
             connected_packet = {
                 "cmd": "Connected",
                 "team": client.team, "slot": client.slot,
@@ -1932,33 +2322,26 @@ async def process_client_cmd(ctx: Context, client: Client, args: dict):
             if (start_inventory or items) and not client.no_items:
                 reply.append({"cmd": 'ReceivedItems', "index": 0, "items": start_inventory + items})
                 client.send_index = len(start_inventory) + len(items)
-            if not client.auth:  # if this was a Re-Connect, don't print to console
-                client.auth = True
-                await on_client_joined(ctx, client)
             if args.get("slot_data", True):
                 connected_packet["slot_data"] = ctx.slot_data[client.slot]
+            # queued before the messages of on_client_joined, as the queue keeps the order messages are sent in
             await ctx.send_msgs(client, reply)
+            if not client.auth:  # if this was a Re-Connect, don't print to console
+                client.auth = True
+                await on_client_joined(ctx, client)
 
     elif cmd == "GetDataPackage":
         exclusions = args.get("exclusions", [])
         if "games" in args:
-            games = {name: game_data for name, game_data in ctx.gamespackage.items()
-                     if name in set(args.get("games", []))}
-            await ctx.send_msgs(client, [{"cmd": "DataPackage",
-                                          "data": {"games": games}}])
+            requested_games = set(args.get("games", []))
+            games = [name for name in ctx.gamespackage if name in requested_games]
         # TODO: remove exclusions behaviour around 0.5.0
         elif exclusions:
             exclusions = set(exclusions)
-            games = {name: game_data for name, game_data in ctx.gamespackage.items()
-                     if name not in exclusions}
-
-            package = {"games": games}
-            await ctx.send_msgs(client, [{"cmd": "DataPackage",
-                                          "data": package}])
-
+            games = [name for name in ctx.gamespackage if name not in exclusions]
         else:
-            await ctx.send_msgs(client, [{"cmd": "DataPackage",
-                                          "data": {"games": ctx.gamespackage}}])
+            games = list(ctx.gamespackage)
+        await ctx.send_encoded_msgs(client, ctx.get_data_package_msg(games, client.binary_encoding))
 
     elif client.auth:
         if cmd == "ConnectUpdate":
@@ -1987,11 +2370,14 @@ async def process_client_cmd(ctx: Context, client: Client, args: dict):
             if "tags" in args:
                 old_tags = client.tags
                 client.tags = args["tags"]
+                ctx.remove_client_tags(client, old_tags)
+                ctx.add_client_tags(client)
                 if set(old_tags) != set(client.tags):
                     client.no_locations = bool(client.tags & _non_game_messages.keys())
                     client.no_text = "NoText" in client.tags or (
                         "PopTracker" in client.tags and client.version < (0, 5, 1)
                     )
+                    client.binary_encoding = binary_encoding_tag in client.tags
                     ctx.broadcast_text_all(
                         f"{ctx.get_aliased_name(client.team, client.slot)} (Team #{client.team + 1}) has changed tags "
                         f"from {old_tags} to {client.tags}.",
@@ -2147,17 +2533,11 @@ async def process_client_cmd(ctx: Context, client: Client, args: dict):
             client.messageprocessor(args["text"])
 
         elif cmd == "Bounce":
-            games = set(args.get("games", []))
-            tags = set(args.get("tags", []))
-            slots = set(args.get("slots", []))
-            args["cmd"] = "Bounced"
-            msg = ctx.dumper([args])
-
-            for bounceclient in ctx.endpoints:
-                if client.team == bounceclient.team and (ctx.games[bounceclient.slot] in games or
-                                                         set(bounceclient.tags) & tags or
-                                                         bounceclient.slot in slots):
-                    await ctx.send_encoded_msgs(bounceclient, msg)
+            targets = ctx.get_bounce_targets(client.team, set(args.get("games", [])), set(args.get("tags", [])),
+                                             set(args.get("slots", [])))
+            if targets:
+                args["cmd"] = "Bounced"
+                ctx.broadcast(targets, [args])
 
         elif cmd == "Get":
             if "keys" not in args or type(args["keys"]) != list:
@@ -2180,18 +2560,35 @@ async def process_client_cmd(ctx: Context, client: Client, args: dict):
                                               "text": 'Set', "original_cmd": cmd}])
                 return
             args["cmd"] = "SetReply"
-            value = ctx.stored_data.get(args["key"], args.get("default", 0))
-            args["original_value"] = copy.copy(value)
+            key = args["key"]
+            targets = set(ctx.stored_data_notification_clients[key])
+            if args.get("want_reply", False):
+                targets.add(client)
+            delta_clients = ctx.stored_data_delta_clients.get(key, ())
+            delta_targets = {target for target in targets if target in delta_clients}
+            targets -= delta_targets
+            new_key = key not in ctx.stored_data
+            value = args.get("default", 0) if new_key else ctx.stored_data[key]
+            if targets:
+                args["original_value"] = value
             args["slot"] = client.slot
+            # operations such as update modify the value in place, so they are applied to a copy,
+            # which only gets stored once all of them succeeded
+            value = copy.copy(value)
             for operation in args["operations"]:
                 func = modify_functions[operation["operation"]]
                 value = func(value, operation["value"])
-            ctx.stored_data[args["key"]] = args["value"] = value
-            targets = set(ctx.stored_data_notification_clients[args["key"]])
-            if args.get("want_reply", False):
-                targets.add(client)
+            ctx.stored_data[key] = value
+            ctx.save_journal.mark_stored_data(key)
             if targets:
+                args["value"] = value
                 ctx.broadcast(targets, [args])
+            if delta_targets:
+                delta = {name: argument for name, argument in args.items() if name not in ("value", "original_value")}
+                delta["delta"] = True
+                if new_key:
+                    delta["value"] = value
+                ctx.broadcast(delta_targets, [delta])
             ctx.save()
 
         elif cmd == "SetNotify":
@@ -2201,6 +2598,10 @@ async def process_client_cmd(ctx: Context, client: Client, args: dict):
                 return
             for key in args["keys"]:
                 ctx.stored_data_notification_clients[key].add(client)
+                if args.get("delta", False):
+                    ctx.stored_data_delta_clients[key].add(client)
+                elif key in ctx.stored_data_delta_clients:
+                    ctx.stored_data_delta_clients[key].discard(client)
 
 
 def update_client_status(ctx: Context, client: Client, new_status: ClientStatus):
@@ -2549,7 +2950,7 @@ class ServerCommandProcessor(CommonCommandProcessor):
         total: int = 0
         texts = []
         for key, value in self.ctx.stored_data.items():
-            size = len(pickle.dumps(value))
+            size = self.ctx.save_journal.get_stored_data_size(key, value)
             total += size
             texts.append(f"Key: {key} | Size: {size}B")
         texts.insert(0, f"Found {len(self.ctx.stored_data)} keys, "
@@ -3,13 +3,18 @@ from __future__ import annotations
 from collections.abc import Mapping, Sequence
 import typing
 import enum
+import struct
 import warnings
+import zlib
 from json import JSONEncoder, JSONDecoder
 
+import msgpack
+
 if typing.TYPE_CHECKING:
+    import mmap
     from websockets import WebSocketServerProtocol as ServerConnection
 
-from Utils import ByValue, Version
+from Utils import ByValue, Version, restricted_dumps, restricted_loads
 
 
 class HintStatus(ByValue, enum.IntEnum):
@@ -173,6 +178,119 @@ def _object_hook(o: typing.Any) -> typing.Any:
 decode = JSONDecoder(object_hook=_object_hook).decode
 
 
+binary_encoding_tag = "MessagePack"
+""" Connect tag requesting MessagePack encoded binary frames instead of JSON text frames from the server. """
+
+binary_ext_types: dict[int, type[tuple]] = {
+    1: NetworkItem,
+    2: NetworkPlayer,
+    3: NetworkSlot,
+    4: Version,
+}
+""" MessagePack ext type code of the tuples that are sent tagged,
+their data being a MessagePack array of their fields """
+_binary_ext_codes = {cls: code for code, cls in binary_ext_types.items()}
+
+
+def _binary_default(obj: typing.Any) -> typing.Any:
+    code = _binary_ext_codes.get(type(obj), None)
+    if code is not None:
+        # fields are plain values, so they can skip strict_types
+        return msgpack.ExtType(code, msgpack.packb(obj, default=_binary_default))
+    if isinstance(obj, tuple) and hasattr(obj, "_fields"):
+        # same as the JSON encoding, for tuples without ext type
+        data = obj._asdict()
+        data["class"] = obj.__class__.__name__
+        return data
+    if isinstance(obj, (tuple, set, frozenset)):
+        return list(obj)
+    # subclasses such as IntEnum and StrEnum
+    if isinstance(obj, int):
+        return int(obj)
+    if isinstance(obj, str):
+        return str(obj)
+    if isinstance(obj, float):
+        return float(obj)
+    if isinstance(obj, dict):
+        return dict(obj)
+    raise TypeError(f"Cannot encode {type(obj)}")
+
+
+def _binary_ext_hook(code: int, data: bytes) -> typing.Any:
+    cls = binary_ext_types.get(code, None)
+    if cls:
+        return cls(*decode_binary(data))
+    return msgpack.ExtType(code, data)
+
+
+def _check_untrusted_value(value: typing.Any) -> None:
+    if isinstance(value, bytes):
+        raise ValueError("MessagePack bin data is not accepted")
+
+
+def _untrusted_ext_hook(code: int, data: bytes) -> typing.Any:
+    cls = binary_ext_types.get(code, None)
+    if cls is None:
+        raise ValueError(f"Unknown MessagePack ext type {code}")
+    return cls(*decode_binary(data, untrusted=True))
+
+
+def _untrusted_list_hook(items: typing.List[typing.Any]) -> typing.List[typing.Any]:
+    for item in items:
+        _check_untrusted_value(item)
+    return items
+
+
+def _untrusted_object_hook(obj: typing.Dict[typing.Any, typing.Any]) -> typing.Any:
+    for key, value in obj.items():
+        if type(key) is not str:
+            raise ValueError(f"MessagePack map keys have to be str, not {type(key).__name__}")
+        _check_untrusted_value(value)
+    return _object_hook(obj)
+
+
+def encode_binary(obj: typing.Any) -> bytes:
+    """Binary counterpart of encode, sends NamedTuples of binary_ext_types as ext types instead of objects.
+    Unlike JSON, keys of dicts keep their type."""
+    return msgpack.packb(obj, default=_binary_default, strict_types=True)
+
+
+def decode_binary(data: bytes, untrusted: bool = False) -> typing.Any:
+    """Decodes data encoded with encode_binary. Data received from clients is to be decoded as untrusted, which only
+    accepts what JSON could carry, raising ValueError for bin data, unknown ext types and keys that aren't str."""
+    if untrusted:
+        decoded = msgpack.unpackb(data, ext_hook=_untrusted_ext_hook, object_hook=_untrusted_object_hook,
+                                  list_hook=_untrusted_list_hook)
+        _check_untrusted_value(decoded)
+        return decoded
+    # Version is the only custom hook and has an ext type, but objects with a "class" still go through _object_hook
+    return msgpack.unpackb(data, ext_hook=_binary_ext_hook, object_hook=_object_hook, strict_map_key=False)
+
+
+def join_encoded(packets: typing.Sequence[str | bytes]) -> str | bytes:
+    """Joins packets encoded with encode or with encode_binary, all of the same kind, into a single packet."""
+    if len(packets) == 1:
+        return packets[0]
+    if isinstance(packets[0], str):
+        return "[" + ",".join(packet[1:-1] for packet in packets if len(packet) > 2) + "]"
+    count = 0
+    bodies = []
+    for packet in packets:
+        view = memoryview(packet)
+        header = view[0]
+        if header < 0xdc:  # fixarray
+            count += header & 0x0f
+            bodies.append(view[1:])
+        elif header == 0xdc:  # array 16
+            count += int.from_bytes(view[1:3], "big")
+            bodies.append(view[3:])
+        else:  # array 32
+            count += int.from_bytes(view[1:5], "big")
+            bodies.append(view[5:])
+    packer = msgpack.Packer()
+    return packer.pack_array_header(count) + b"".join(bodies)
+
+
 class Endpoint:
     __slots__ = ("socket",)
 
@@ -414,9 +532,27 @@ class Hint(typing.NamedTuple):
         return self.receiving_player == self.finding_player
 
 
+# multidata format 4, see dump_multidata: header of the locations section and its entries,
+# which match the LocationEntry struct of _speedups
+location_section_header = struct.Struct("<QQ")  # player count, entry count
+location_entry = struct.Struct("<qIIqIi")  # location, sender, receiver, item, flags, sphere
+
+
 class _LocationStore(dict, typing.MutableMapping[int, typing.Dict[int, typing.Tuple[int, int, int]]]):
-    def __init__(self, values: typing.MutableMapping[int, typing.Dict[int, typing.Tuple[int, int, int]]]):
+    sphere_count: int
+    _spheres: typing.Dict[int, typing.Dict[int, int]]
+    """ player -> location id -> sphere """
+
+    def __init__(self, values: typing.MutableMapping[int, typing.Dict[int, typing.Tuple[int, int, int]]],
+                 spheres: typing.Optional[typing.Sequence[typing.Dict[int, typing.Set[int]]]] = None):
         super().__init__(values)
+        self.sphere_count = len(spheres) if spheres else 0
+        self._spheres = {}
+        for sphere_index, sphere in enumerate(spheres or ()):
+            for player, locations in sphere.items():
+                player_spheres = self._spheres.setdefault(player, {})
+                for location_id in locations:
+                    player_spheres[location_id] = sphere_index
 
         if not self:
             raise ValueError(f"Rejecting game with 0 players")
@@ -427,6 +563,23 @@ class _LocationStore(dict, typing.MutableMapping[int, typing.Dict[int, typing.Tu
         if len(self.get(0, {})):
             raise ValueError("Invalid player id 0 for location")
 
+    @classmethod
+    def from_buffer(cls, buffer: typing.Union[bytes, memoryview]) -> _LocationStore:
+        """Loads the locations section of multidata format 4."""
+        player_count, count = location_section_header.unpack_from(buffer)
+        entries = memoryview(buffer)[location_section_header.size:]
+        entries = entries[:count * location_entry.size]
+        values: typing.Dict[int, typing.Dict[int, typing.Tuple[int, int, int]]] = \
+            {player: {} for player in range(1, player_count + 1)}
+        spheres: typing.List[typing.Dict[int, typing.Set[int]]] = []
+        for location_id, sender, receiver, item_id, flags, sphere in location_entry.iter_unpack(entries):
+            values[sender][location_id] = item_id, receiver, flags
+            if sphere >= 0:
+                while len(spheres) <= sphere:
+                    spheres.append({})
+                spheres[sphere].setdefault(sender, set()).add(location_id)
+        return cls(values, spheres)
+
     def find_item(self, slots: typing.Set[int], seeked_item_id: int
                   ) -> typing.Generator[typing.Tuple[int, int, int, int, int], None, None]:
         for finding_player, check_data in self.items():
@@ -443,6 +596,20 @@ class _LocationStore(dict, typing.MutableMapping[int, typing.Dict[int, typing.Tu
                     all_locations[source_slot].add(location_id)
         return all_locations
 
+    def get_sphere(self, slot: int, location_id: int) -> int:
+        """Returns the sphere of a location, -1 if it is not in any sphere."""
+        if location_id not in self[slot]:
+            raise KeyError(f"No location {location_id} for player {slot}")
+        return self._spheres.get(slot, {}).get(location_id, -1)
+
+    def get_spheres(self) -> typing.List[typing.Dict[int, typing.Set[int]]]:
+        """Returns the spheres as stored in multidata, each sphere is { player: { location_id, ... } }."""
+        spheres: typing.List[typing.Dict[int, typing.Set[int]]] = [{} for _ in range(self.sphere_count)]
+        for player, player_spheres in self._spheres.items():
+            for location_id, sphere in player_spheres.items():
+                spheres[sphere].setdefault(player, set()).add(location_id)
+        return spheres
+
     def get_checked(self, state: typing.Dict[typing.Tuple[int, int], typing.Set[int]], team: int, slot: int
                     ) -> typing.List[int]:
         checked = state[team, slot]
@@ -536,3 +703,129 @@ else:
             warnings.warn("_speedups not available. Falling back to pure python LocationStore. "
                           "Install a matching C++ compiler for your platform to compile _speedups.")
             LocationStore = _LocationStore
+
+
+multidata_format_version = 4
+# format 4 starts with the version byte, padded to 8 bytes, followed by offset and size of each section:
+# meta, locations, precollected items and slot data.
+multidata_header = struct.Struct("<8x8Q")
+precollected_items_header = struct.Struct("<II")  # player, item count; followed by the items as "<q"
+slot_data_header = struct.Struct("<IQQ")  # slot, offset, size
+
+
+class _SlotDataBlobs(Mapping):
+    """Slot data of multidata format 4, each slot's data is decoded when first accessed."""
+    _buffer: memoryview
+    _index: typing.Dict[int, typing.Tuple[int, int]]
+    _decoded: typing.Dict[int, typing.Any]
+
+    def __init__(self, buffer: memoryview) -> None:
+        self._buffer = buffer
+        count, = struct.unpack_from("<Q", buffer)
+        self._index = {slot: (offset, size) for slot, offset, size
+                       in slot_data_header.iter_unpack(buffer[8:8 + count * slot_data_header.size])}
+        self._decoded = {}
+
+    def __getitem__(self, slot: int) -> typing.Any:
+        try:
+            return self._decoded[slot]
+        except KeyError:
+            offset, size = self._index[slot]
+            data = self._decoded[slot] = restricted_loads(zlib.decompress(self._buffer[offset:offset + size]))
+            return data
+
+    def __iter__(self) -> typing.Iterator[int]:
+        return iter(self._index)
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+
+def _align(data: bytearray) -> None:
+    data.extend(bytes(-len(data) % 8))
+
+
+def dump_multidata(multidata: MultiData) -> bytes:
+    """Encodes multidata in format 4, including the version byte.
+    Locations, their spheres and precollected items are stored as fixed-width little-endian arrays,
+    which LocationStore can use without decoding them, and slot data is stored compressed per slot."""
+    locations = multidata["locations"]
+    spheres = multidata.get("spheres", None)
+    if spheres is None and hasattr(locations, "get_sphere"):
+        get_sphere = locations.get_sphere  # re-encoding a decoded multidata
+    else:
+        sphere_lookup = {(player, location_id): sphere_index for sphere_index, sphere in enumerate(spheres or ())
+                         for player, location_ids in sphere.items() for location_id in location_ids}
+
+        def get_sphere(player: int, location_id: int) -> int:
+            return sphere_lookup.get((player, location_id), -1)
+
+    meta = {key: value for key, value in multidata.items()
+            if key not in {"locations", "spheres", "precollected_items", "slot_data"}}
+    data = bytearray(multidata_header.size)
+    data[0] = multidata_format_version
+    sections: typing.List[int] = []
+
+    data.extend(zlib.compress(restricted_dumps(meta), 9))
+    sections += [multidata_header.size, len(data) - multidata_header.size]
+
+    _align(data)
+    start = len(data)
+    entries = sorted((sender, location_id, item_id, receiver, flags)
+                     for sender, player_locations in locations.items()
+                     for location_id, (item_id, receiver, flags) in player_locations.items())
+    data.extend(location_section_header.pack(len(locations), len(entries)))
+    for sender, location_id, item_id, receiver, flags in entries:
+        data.extend(location_entry.pack(location_id, sender, receiver, item_id, flags,
+                                        get_sphere(sender, location_id)))
+    sections += [start, len(data) - start]
+
+    _align(data)
+    start = len(data)
+    precollected_items = multidata["precollected_items"]
+    data.extend(struct.pack("<Q", len(precollected_items)))
+    for player, items in precollected_items.items():
+        data.extend(precollected_items_header.pack(player, len(items)))
+    for items in precollected_items.values():
+        data.extend(struct.pack(f"<{len(items)}q", *items))
+    sections += [start, len(data) - start]
+
+    _align(data)
+    start = len(data)
+    slot_data = multidata["slot_data"]
+    blobs = [zlib.compress(restricted_dumps(slot_data[slot]), 9) for slot in slot_data]
+    offset = 8 + len(blobs) * slot_data_header.size
+    data.extend(struct.pack("<Q", len(blobs)))
+    for slot, blob in zip(slot_data, blobs):
+        data.extend(slot_data_header.pack(slot, offset, len(blob)))
+        offset += len(blob)
+    for blob in blobs:
+        data.extend(blob)
+    sections += [start, len(data) - start]
+
+    multidata_header.pack_into(data, 0, *sections)
+    data[0] = multidata_format_version
+    return bytes(data)
+
+
+def load_multidata(data: typing.Union[bytes, memoryview, mmap.mmap]) -> MultiData:
+    """Decodes multidata in format 4, as written by dump_multidata. Locations are wrapped by a LocationStore,
+    without copying them where possible, so data has to stay unchanged while the result is in use."""
+    view = memoryview(data)
+    meta_offset, meta_size, locations_offset, locations_size, precollected_offset, precollected_size, \
+        slot_data_offset, slot_data_size = multidata_header.unpack_from(view)
+    multidata = restricted_loads(zlib.decompress(view[meta_offset:meta_offset + meta_size]))
+
+    multidata["locations"] = LocationStore.from_buffer(view[locations_offset:locations_offset + locations_size])
+
+    precollected = view[precollected_offset:precollected_offset + precollected_size]
+    count, = struct.unpack_from("<Q", precollected)
+    item_offset = 8 + count * precollected_items_header.size
+    precollected_items: typing.Dict[int, typing.List[int]] = {}
+    for player, item_count in precollected_items_header.iter_unpack(precollected[8:item_offset]):
+        precollected_items[player] = list(struct.unpack_from(f"<{item_count}q", precollected, item_offset))
+        item_offset += item_count * 8
+    multidata["precollected_items"] = precollected_items
+
+    multidata["slot_data"] = _SlotDataBlobs(view[slot_data_offset:slot_data_offset + slot_data_size])
+    return multidata
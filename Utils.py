@@ -9,6 +9,7 @@ import os
 import itertools
 import subprocess
 import sys
+import threading
 import pickle
 import functools
 import io
@@ -16,6 +17,7 @@ import collections
 import importlib
 import logging
 import warnings
+import weakref
 
 from argparse import Namespace
 from collections.abc import Collection, Iterable
@@ -526,6 +528,229 @@ class KeyedDefaultDict(collections.defaultdict):
         return value
 
 
+_sharing_lock = threading.Lock()
+"""Held while sharing containers or handing out copies of them, so states can be copied and used in other threads."""
+
+
+class CopyOnWrite:
+    """
+    Mixin for containers that can be shared between CopyOnAccessDicts.
+    Before a shared container gets modified, each dict still sharing it gets its own copy, so references to the
+    container that were kept across CopyOnAccessDict.share() can be used to modify it without affecting the copies.
+    """
+    __slots__ = ()
+    _sharing_dicts: typing.Optional[typing.List[typing.Tuple[weakref.ref, Any]]] = None
+    """The dicts and keys this container was shared with, including ones that don't share it anymore."""
+
+    def _share_with(self, shared: CopyOnAccessDict, key: Any) -> None:
+        sharing_dicts = self._sharing_dicts
+        if sharing_dicts is None:
+            sharing_dicts = self._sharing_dicts = []
+        elif len(sharing_dicts) >= 16 and not len(sharing_dicts) & (len(sharing_dicts) - 1):
+            # forget the dicts that don't share this container anymore, checked each time the length doubled
+            sharing_dicts[:] = [(ref, shared_key) for ref, shared_key in sharing_dicts
+                                if (shared_dict := ref()) is not None and shared_dict.is_sharing(shared_key, self)]
+        sharing_dicts.append((weakref.ref(shared), key))
+
+    def _unshare(self) -> None:
+        with _sharing_lock:
+            sharing_dicts, self._sharing_dicts = self._sharing_dicts, None
+            for ref, key in sharing_dicts or ():
+                shared = ref()
+                if shared is not None and shared.is_sharing(key, self):
+                    shared[key] = self.copy()
+
+
+def _unshare_before(method: typing.Callable[..., Any]) -> typing.Callable[..., Any]:
+    @functools.wraps(method)
+    def wrapper(self: CopyOnWrite, *args: Any, **kwargs: Any) -> Any:
+        if self._sharing_dicts:
+            self._unshare()
+        return method(self, *args, **kwargs)
+    return wrapper
+
+
+class CopyOnWriteSet(CopyOnWrite, set):
+    """set that gets copied for the CopyOnAccessDicts sharing it before it is modified."""
+    add = _unshare_before(set.add)
+    discard = _unshare_before(set.discard)
+    remove = _unshare_before(set.remove)
+    pop = _unshare_before(set.pop)
+    clear = _unshare_before(set.clear)
+    update = _unshare_before(set.update)
+    difference_update = _unshare_before(set.difference_update)
+    intersection_update = _unshare_before(set.intersection_update)
+    symmetric_difference_update = _unshare_before(set.symmetric_difference_update)
+    __ior__ = _unshare_before(set.__ior__)
+    __iand__ = _unshare_before(set.__iand__)
+    __isub__ = _unshare_before(set.__isub__)
+    __ixor__ = _unshare_before(set.__ixor__)
+
+    def copy(self) -> CopyOnWriteSet:
+        return self.__class__(self)
+
+    def __reduce__(self):
+        return self.__class__, (list(self),)
+
+
+class CopyOnWriteDict(CopyOnWrite, dict):
+    """dict that gets copied for the CopyOnAccessDicts sharing it before it is modified."""
+    __setitem__ = _unshare_before(dict.__setitem__)
+    __delitem__ = _unshare_before(dict.__delitem__)
+    pop = _unshare_before(dict.pop)
+    popitem = _unshare_before(dict.popitem)
+    setdefault = _unshare_before(dict.setdefault)
+    clear = _unshare_before(dict.clear)
+    update = _unshare_before(dict.update)
+    __ior__ = _unshare_before(dict.__ior__)
+
+    def copy(self) -> CopyOnWriteDict:
+        return self.__class__(self)
+
+    def __reduce__(self):
+        return self.__class__, (dict(self),)
+
+
+class CopyOnWriteCounter(CopyOnWrite, collections.Counter):
+    """Counter that gets copied for the CopyOnAccessDicts sharing it before it is modified."""
+    # the other modifying methods of Counter go through these
+    __setitem__ = _unshare_before(dict.__setitem__)
+    __delitem__ = _unshare_before(dict.__delitem__)
+    pop = _unshare_before(dict.pop)
+    popitem = _unshare_before(dict.popitem)
+    setdefault = _unshare_before(dict.setdefault)
+    clear = _unshare_before(dict.clear)
+    update = _unshare_before(collections.Counter.update)
+
+
+class CopyOnAccessDict(dict):
+    """
+    dict of copyable containers, which can be shared with copies made through share().
+    The copy only gets its own copy of a container the first time it accesses it, or once the container is about to
+    be modified if it is a CopyOnWrite container. Other containers get copied by share() right away.
+    """
+    __slots__ = ("_shared", "__weakref__")
+    _shared: typing.Dict[Any, Any]
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._shared = {}
+
+    def share_item(self, key, value: Any) -> None:
+        """Shares the container with this dict under key until this dict accesses it."""
+        dict.pop(self, key, None)
+        if isinstance(value, CopyOnWrite):
+            with _sharing_lock:
+                value._share_with(self, key)
+                self._shared[key] = value
+        else:
+            # modifications of other containers can't be noticed
+            self._shared.pop(key, None)
+            dict.__setitem__(self, key, value.copy())
+
+    def is_sharing(self, key, container: Any) -> bool:
+        """Returns whether the container is shared with this dict under key and wasn't accessed yet."""
+        return self._shared.get(key) is container
+
+    def __missing__(self, key):
+        with _sharing_lock:
+            if dict.__contains__(self, key):
+                # the container was about to be modified in another thread, which handed out a copy in the meantime
+                return dict.__getitem__(self, key)
+            value = self._shared.pop(key).copy()
+            dict.__setitem__(self, key, value)
+        return value
+
+    def __setitem__(self, key, value) -> None:
+        self._shared.pop(key, None)
+        super().__setitem__(key, value)
+
+    def __delitem__(self, key) -> None:
+        if self._shared.pop(key, None) is None:
+            super().__delitem__(key)
+
+    def __contains__(self, key) -> bool:
+        return super().__contains__(key) or key in self._shared
+
+    def __len__(self) -> int:
+        return super().__len__() + len(self._shared)
+
+    def __iter__(self):
+        self._materialize()
+        return super().__iter__()
+
+    def __eq__(self, other) -> bool:
+        self._materialize()
+        if isinstance(other, CopyOnAccessDict):
+            other._materialize()
+        return super().__eq__(other)
+
+    def __ne__(self, other) -> bool:
+        return not self == other
+
+    def __repr__(self) -> str:
+        self._materialize()
+        return super().__repr__()
+
+    def __reduce__(self):
+        return self.__class__, (dict(self.items()),)
+
+    def _materialize(self) -> None:
+        for key in list(self._shared):
+            self.__missing__(key)
+
+    def share(self) -> CopyOnAccessDict:
+        """Returns a copy that shares all containers with this dict until it accesses them."""
+        ret = self.__class__()
+        for key, value in itertools.chain(dict.items(self), self._shared.items()):
+            ret.share_item(key, value)
+        return ret
+
+    def get(self, key, default=None):
+        if key in self:
+            return self[key]
+        return default
+
+    def pop(self, key, *default):
+        if key in self._shared:
+            self.__missing__(key)
+        return super().pop(key, *default)
+
+    def keys(self):
+        self._materialize()
+        return super().keys()
+
+    def values(self):
+        self._materialize()
+        return super().values()
+
+    def items(self):
+        self._materialize()
+        return super().items()
+
+    def copy(self) -> Dict[Any, Any]:
+        self._materialize()
+        return super().copy()
+
+    def clear(self) -> None:
+        self._shared.clear()
+        super().clear()
+
+    def setdefault(self, key, default=None):
+        if key in self:
+            return self[key]
+        self[key] = default
+        return default
+
+    def update(self, *args, **kwargs) -> None:
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+    def popitem(self):
+        self._materialize()
+        return super().popitem()
+
+
 def get_text_between(text: str, start: str, end: str) -> str:
     return text[text.index(start) + len(start): text.rindex(end)]
 
@@ -53,6 +53,12 @@ app.config["MAX_ROOM_TIMEOUT"] = 259200
 app.config["ROOM_AUTO_DELETE"] = 0
 # memory limit for generator processes in bytes
 app.config["GENERATOR_MEMORY_LIMIT"] = 4294967296
+# generator processes are replaced after running this many generations, 0 to disable
+app.config["GENERATOR_MAX_JOBS"] = 10
+# generator processes are replaced once their memory usage grew by this many bytes since they started, 0 to disable
+app.config["GENERATOR_MAX_MEMORY_GROWTH"] = 1073741824
+# generations using more than this many bytes of memory are aborted, 0 to disable
+app.config["GENERATOR_JOB_MEMORY_LIMIT"] = 0
 
 # waitress uses one thread for I/O, these are for processing of views that then get sent
 # archipelago.gg uses gunicorn + nginx; ignoring this option
@@ -12,6 +12,7 @@ from uuid import UUID
 from pony.orm import db_session, select, commit, PrimaryKey, desc
 
 from Utils import restricted_loads, utcnow
+from .generator_pool import GeneratorPool, default_preload
 from .locker import Locker, AlreadyRunningException
 
 _stop_event = Event()
@@ -52,7 +53,7 @@ def _mp_gen_game(
         setproctitle(f"Generator (idle)")
 
 
-def launch_generator(pool: multiprocessing.pool.Pool, generation: Generation, timeout: int|None) -> None:
+def launch_generator(pool: GeneratorPool, generation: Generation, timeout: int|None) -> None:
     try:
         meta = json.loads(generation.meta)
         options = restricted_loads(generation.options)
@@ -68,6 +69,7 @@ def launch_generator(pool: multiprocessing.pool.Pool, generation: Generation, ti
             },
             handle_generation_success,
             handle_generation_failure,
+            name=str(generation.id),
         )
     except Exception as e:
         generation.state = STATE_ERROR
@@ -99,6 +101,9 @@ def init_generator(config: dict[str, Any]) -> None:
     db.bind(**pony_config)
     db.generate_mapping()
 
+    from settings import get_settings
+    get_settings()  # load host.yaml once per process instead of in the first generation
+
 
 def cleanup(config: dict[str, Any]):
     """delete unowned or old user-content"""
@@ -153,8 +158,11 @@ def autogen(config: dict):
         try:
             with Locker("autogen"):
 
-                with multiprocessing.Pool(config["GENERATORS"], initializer=init_generator,
-                                          initargs=(config,), maxtasksperchild=10) as generator_pool:
+                with GeneratorPool(config["GENERATORS"], initializer=init_generator, initargs=(config,),
+                                   max_jobs=config["GENERATOR_MAX_JOBS"],
+                                   max_memory_growth=config["GENERATOR_MAX_MEMORY_GROWTH"],
+                                   job_memory_limit=config["GENERATOR_JOB_MEMORY_LIMIT"],
+                                   preload=default_preload) as generator_pool:
                     job_time = config["JOB_TIME"]
                     with db_session:
                         to_start = select(generation for generation in Generation if generation.state == STATE_STARTED)
@@ -7,7 +7,6 @@ import functools
 import itertools
 import logging
 import multiprocessing
-import pickle
 import random
 import socket
 import threading
@@ -24,12 +23,14 @@ import Utils
 
 from MultiServer import (
     Context, server, auto_shutdown, ServerCommandProcessor, ClientMessageProcessor, load_server_cert,
-    server_per_message_deflate_factory,
+    server_per_message_deflate_factory, SaveJournal,
 )
+from NetUtils import binary_encoding_tag
 from Utils import restricted_loads, cache_argsless
 
 from .locker import Locker
-from .models import Command, GameDataPackage, Room, db
+from .models import Command, GameDataPackage, Room, TrackerSnapshot, db
+from .tracker_snapshot import TrackerState
 
 
 class CustomClientMessageProcessor(ClientMessageProcessor):
@@ -66,6 +67,7 @@ class DBCommandProcessor(ServerCommandProcessor):
 
 class WebHostContext(Context):
     room_id: int
+    tracker_state: TrackerState | None = None
 
     def __init__(self, static_server_data: dict, logger: logging.Logger):
         # static server data is used during _load_game_data to load required data,
@@ -77,7 +79,7 @@ class WebHostContext(Context):
         del self.static_server_data
         self.main_loop = asyncio.get_running_loop()
         self.video = {}
-        self.tags = ["AP", "WebHost"]
+        self.tags = ["AP", "WebHost", binary_encoding_tag]
 
     def __del__(self):
         from Utils import format_SI_prefix
@@ -159,17 +161,30 @@ class WebHostContext(Context):
         self.saving = enabled
         if self.saving:
             with db_session:
-                savegame_data = Room.get(id=self.room_id).multisave
+                savegame_data = Room.get(id=self.room_id).get_multisave()
                 if savegame_data:
-                    self.set_save(restricted_loads(savegame_data))
+                    self.set_save(SaveJournal.load(savegame_data))
             self._start_async_saving(atexit_save=False)
         asyncio.create_task(self.listen_to_db_commands())
 
     @db_session
     def _save(self, exit_save: bool = False) -> bool:
         room = Room.get(id=self.room_id)
-        # Does not use Utils.restricted_dumps because we'd rather make a save than not make one
-        room.multisave = pickle.dumps(self.get_save())
+        with self.save_journal.lock:
+            save = self.get_save()
+            changed_hints = set(self.save_journal.changed_hints)
+            snapshot, data = self.save_journal.write(save)
+            room.write_multisave(snapshot, data)
+            if snapshot or self.tracker_state is None:
+                changed_hints = None  # encode the hints of all slots
+            if self.tracker_state is None:
+                self.tracker_state = TrackerState(self.locations)
+            self.tracker_state.update(save, changed_hints)
+            tracker_snapshot = self.tracker_state.dump()
+            if room.tracker_snapshot:
+                room.tracker_snapshot.data = tracker_snapshot
+            else:
+                TrackerSnapshot(room=room, data=tracker_snapshot)
         # saving only occurs on activity, so we can "abuse" this information to mark this as last_activity
         if not exit_save:  # we don't want to count a shutdown as activity, which would restart the server again
             room.last_activity = Utils.utcnow()
@@ -0,0 +1,304 @@
+"""Process pool for generations that keeps its processes warm.
+
+Processes are forked from a forkserver that has already imported the worlds, so a new process starts with the imported
+modules and the data package shared copy-on-write instead of importing them again. Each process runs jobs until it
+has run `max_jobs` of them, its memory grew by more than `max_memory_growth` or a job left threads running, which
+happens when a generation timed out. Platforms without forkserver use the default start method instead.
+"""
+from __future__ import annotations
+
+import collections
+import gc
+import logging
+import multiprocessing
+import multiprocessing.connection
+import os
+import threading
+import time
+import typing
+from typing import Any, Callable, NamedTuple
+
+from Utils import format_SI_prefix
+
+__all__ = ["GeneratorPool", "JobMetrics"]
+
+default_preload = ["worlds", "Main", "Generate", "WebHostLib.autolauncher"]
+
+
+class JobMetrics(NamedTuple):
+    """Resource usage of a single job of a GeneratorPool."""
+    job_id: int
+    name: str
+    pid: int
+    worker_jobs: int
+    """number of jobs the process ran, including this one"""
+    wall_time: float
+    cpu_time: float
+    rss_start: int
+    rss_end: int
+    rss_peak: int
+    """highest memory usage observed while the job ran, only sampled if the pool has a job memory limit"""
+    recycle_reason: str | None
+
+    def __str__(self) -> str:
+        return (f"job {self.job_id}{f' {self.name}' if self.name else ''} in process {self.pid} "
+                f"(job {self.worker_jobs} of the process): "
+                f"{self.wall_time:.2f}s, {self.cpu_time:.2f}s CPU, "
+                f"memory {format_SI_prefix(self.rss_start, 1024)}iB -> {format_SI_prefix(self.rss_end, 1024)}iB, "
+                f"peak {format_SI_prefix(self.rss_peak, 1024)}iB"
+                + (f", recycling: {self.recycle_reason}" if self.recycle_reason else ""))
+
+
+class _Job(NamedTuple):
+    job_id: int
+    name: str
+    func: Callable[..., Any]
+    args: tuple[Any, ...]
+    kwds: dict[str, Any]
+    callback: Callable[[Any], None] | None
+    error_callback: Callable[[BaseException], None] | None
+
+
+class _Worker:
+    process: multiprocessing.process.BaseProcess
+    conn: multiprocessing.connection.Connection
+    job: _Job | None = None
+    retiring: bool = False
+    jobs_done: int = 0
+
+    def __init__(self, process: multiprocessing.process.BaseProcess,
+                 conn: multiprocessing.connection.Connection) -> None:
+        self.process = process
+        self.conn = conn
+
+
+def _get_rss() -> int:
+    import psutil
+    return psutil.Process().memory_info().rss
+
+
+def _watch_memory(conn: multiprocessing.connection.Connection, send_lock: threading.Lock, job: _Job,
+                  limit: int, peak: list[int], done: threading.Event) -> None:
+    """Ends the process if the job uses more than limit bytes of memory, reporting the job as failed."""
+    while not done.wait(0.5):
+        rss = _get_rss()
+        peak[0] = max(peak[0], rss)
+        if rss > limit:
+            error = MemoryError(f"Generation exceeded the memory limit of {format_SI_prefix(limit, 1024)}iB.")
+            with send_lock:
+                if done.is_set():
+                    return  # the job finished in the meantime
+                conn.send((job.job_id, False, error, None))
+            os._exit(1)
+
+
+def _worker_main(conn: multiprocessing.connection.Connection, initializer: Callable[..., None] | None,
+                 initargs: tuple[Any, ...], max_jobs: int, max_memory_growth: int, job_memory_limit: int) -> None:
+    # nothing inherited from the forkserver is garbage, freezing it keeps the garbage collector from writing to it,
+    # which would copy the shared memory pages into this process
+    gc.freeze()
+    if initializer:
+        initializer(*initargs)
+    send_lock = threading.Lock()
+    base_rss = _get_rss()
+    worker_jobs = 0
+    while True:
+        try:
+            job: _Job | None = conn.recv()
+        except EOFError:
+            break
+        if job is None:
+            break
+        worker_jobs += 1
+        threads = threading.active_count()
+        rss_start = _get_rss()
+        peak = [rss_start]
+        done = threading.Event()
+        if job_memory_limit > 0:
+            threading.Thread(target=_watch_memory, args=(conn, send_lock, job, job_memory_limit, peak, done),
+                             name="MemoryWatch", daemon=True).start()
+            threads += 1
+        start_time = time.perf_counter()
+        start_cpu = time.process_time()
+        try:
+            success, value = True, job.func(*job.args, **job.kwds)
+        except Exception as e:
+            success, value = False, e
+        with send_lock:
+            done.set()
+        rss_end = _get_rss()
+        recycle_reason: str | None = None
+        if max_jobs and worker_jobs >= max_jobs:
+            recycle_reason = f"ran {worker_jobs} jobs"
+        elif max_memory_growth and rss_end - base_rss > max_memory_growth:
+            recycle_reason = f"memory grew by {rss_end - base_rss} bytes"
+        elif threading.active_count() > threads:
+            recycle_reason = "job left threads running"
+        metrics = JobMetrics(job.job_id, job.name, os.getpid(), worker_jobs, time.perf_counter() - start_time,
+                             time.process_time() - start_cpu, rss_start, rss_end, max(peak[0], rss_end),
+                             recycle_reason)
+        with send_lock:
+            try:
+                conn.send((job.job_id, success, value, metrics))
+            except Exception as e:  # result could not be pickled
+                conn.send((job.job_id, False, RuntimeError(f"Could not send result {value!r}: {e!r}"), metrics))
+        if recycle_reason:
+            break
+
+
+class GeneratorPool:
+    """Runs jobs in a fixed number of reused processes, with the interface of multiprocessing.pool.Pool.apply_async.
+
+    Callbacks are called from the pool's thread. Metrics of the latest jobs are kept in `metrics`.
+    Processes that end before running a job, like when the initializer fails, are replaced with an exponential backoff.
+    """
+    metrics: collections.deque[JobMetrics]
+    start_delay = 0.1
+    max_start_delay = 60.0
+
+    def __init__(self, processes: int, initializer: Callable[..., None] | None = None,
+                 initargs: tuple[Any, ...] = (), max_jobs: int = 10, max_memory_growth: int = 0,
+                 job_memory_limit: int = 0, preload: typing.Sequence[str] = (), metrics_size: int = 100) -> None:
+        if "forkserver" in multiprocessing.get_all_start_methods():
+            self.context = multiprocessing.get_context("forkserver")
+            # only has an effect if the forkserver is not running yet
+            self.context.set_forkserver_preload(list(preload))
+        else:
+            self.context = multiprocessing.get_context()
+        self.processes = processes
+        self.initializer = initializer
+        self.initargs = initargs
+        self.max_jobs = max_jobs
+        self.max_memory_growth = max_memory_growth
+        self.job_memory_limit = job_memory_limit
+        self.metrics = collections.deque(maxlen=metrics_size)
+        self.workers: list[_Worker] = []
+        self.jobs: collections.deque[_Job] = collections.deque()
+        self.jobs_lock = threading.Lock()
+        self.job_counter = 0
+        self.start_failures = 0
+        """number of processes in a row that ended before running a job"""
+        self.next_start = 0.0
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self._run, name="GeneratorPool", daemon=True)
+        self.thread.start()
+
+    def __enter__(self) -> GeneratorPool:
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.terminate()
+
+    def apply_async(self, func: Callable[..., Any], args: tuple[Any, ...] = (), kwds: dict[str, Any] | None = None,
+                    callback: Callable[[Any], None] | None = None,
+                    error_callback: Callable[[BaseException], None] | None = None, name: str = "") -> int:
+        """Queues a call of func, which is passed to callback or its exception to error_callback. Returns the job id."""
+        with self.jobs_lock:
+            self.job_counter += 1
+            job_id = self.job_counter
+            self.jobs.append(_Job(job_id, name, func, args, kwds or {}, callback, error_callback))
+        return job_id
+
+    def terminate(self) -> None:
+        """Stops the pool, killing jobs that are still running. Queued jobs are dropped."""
+        self.stop_event.set()
+        self.thread.join()
+        for worker in self.workers:
+            worker.process.terminate()
+        for worker in self.workers:
+            worker.process.join()
+            worker.conn.close()
+        self.workers.clear()
+
+    def _start_worker(self) -> None:
+        conn, child_conn = self.context.Pipe()
+        process = self.context.Process(target=_worker_main, name="Generator",
+                                       args=(child_conn, self.initializer, self.initargs, self.max_jobs,
+                                             self.max_memory_growth, self.job_memory_limit))
+        process.start()
+        child_conn.close()
+        self.workers.append(_Worker(process, conn))
+
+    def _run(self) -> None:
+        while not self.stop_event.is_set():
+            while sum(not worker.retiring for worker in self.workers) < self.processes \
+                    and time.monotonic() >= self.next_start:
+                self._start_worker()
+            with self.jobs_lock:
+                for worker in self.workers:
+                    if not self.jobs:
+                        break
+                    if worker.job is None and not worker.retiring:
+                        self._send(worker, self.jobs.popleft())
+
+            waitables: list[Any] = [worker.conn for worker in self.workers if worker.job]
+            waitables += [worker.process.sentinel for worker in self.workers]
+            for ready in multiprocessing.connection.wait(waitables, timeout=0.1):
+                for worker in self.workers:
+                    if ready is worker.conn:
+                        self._receive(worker)
+            for worker in list(self.workers):
+                if not worker.process.is_alive():
+                    self._remove_worker(worker)
+
+    def _send(self, worker: _Worker, job: _Job) -> None:
+        try:
+            # the callbacks stay in this process
+            worker.conn.send(job._replace(callback=None, error_callback=None))
+        except (BrokenPipeError, ConnectionResetError):
+            self.jobs.appendleft(job)  # the process ended, see _remove_worker
+            worker.retiring = True
+        except Exception as e:  # job could not be pickled
+            self._call(job.error_callback, e)
+        else:
+            worker.job = job
+
+    def _receive(self, worker: _Worker) -> None:
+        try:
+            job_id, success, value, metrics = worker.conn.recv()
+        except (EOFError, OSError):
+            return  # the process ended, see _remove_worker
+        job = worker.job
+        if not job or job.job_id != job_id:
+            return
+        worker.job = None
+        worker.jobs_done += 1
+        self.start_failures = 0
+        if metrics:
+            self.metrics.append(metrics)
+            logging.info(f"Generator {metrics}")
+            worker.retiring = metrics.recycle_reason is not None
+        else:  # the process exceeded the memory limit and ends
+            worker.retiring = True
+        self._call(job.callback if success else job.error_callback, value)
+
+    def _remove_worker(self, worker: _Worker) -> None:
+        if worker.job and worker.conn.poll():
+            self._receive(worker)
+        worker.process.join()
+        worker.conn.close()
+        self.workers.remove(worker)
+        if worker.job:
+            job, worker.job = worker.job, None
+            logging.error(f"Generator process {worker.process.pid} ended with code {worker.process.exitcode} "
+                          f"while running job {job.job_id} {job.name}")
+            self._call(job.error_callback,
+                       RuntimeError(f"Generator process ended with code {worker.process.exitcode}."))
+        elif not worker.jobs_done:
+            self.start_failures += 1
+            delay = min(self.start_delay * 2 ** self.start_failures, self.max_start_delay)
+            self.next_start = time.monotonic() + delay
+            logging.error(f"Generator process {worker.process.pid} ended with code {worker.process.exitcode} "
+                          f"before running a job ({self.start_failures} in a row), "
+                          f"starting the next one in {delay:.1f}s")
+        elif worker.process.exitcode:
+            logging.warning(f"Generator process {worker.process.pid} ended with code {worker.process.exitcode} "
+                            f"after running {worker.jobs_done} jobs")
+
+    @staticmethod
+    def _call(callback: Callable[[Any], None] | None, value: Any) -> None:
+        if callback:
+            try:
+                callback(value)
+            except Exception as e:
+                logging.exception(e)
@@ -33,6 +33,37 @@ class Room(db.Entity):
     tracker = Optional(UUID, index=True)
     # Port special value -1 means the server errored out. Another attempt can be made with a page refresh
     last_port = Optional(int, default=lambda: 0)
+    tracker_snapshot = Optional('TrackerSnapshot', cascade_delete=True)
+    save_records = Set('SaveRecord', cascade_delete=True)
+
+    def get_multisave(self) -> bytes | None:
+        """The save journal of the room, its snapshot in multisave followed by the records appended since."""
+        if not self.multisave:
+            return None
+        return self.multisave + b"".join(record.data for record in sorted(self.save_records, key=lambda r: r.id))
+
+    def write_multisave(self, snapshot: bool, data: bytes) -> None:
+        """Stores data as returned by SaveJournal.write. Only a snapshot replaces multisave, which drops the records
+        appended to it, other data is stored as a new record, so each save only writes what it adds."""
+        if snapshot:
+            self.multisave = data
+            for record in list(self.save_records):
+                record.delete()
+        else:
+            SaveRecord(room=self, data=data)
+
+
+class TrackerSnapshot(db.Entity):
+    """Compact state of a room for trackers, written alongside Room.multisave, see WebHostLib.tracker_snapshot"""
+    room = PrimaryKey(Room)
+    data = Required(buffer)
+
+
+class SaveRecord(db.Entity):
+    """Record of the save journal of a room that was appended to Room.multisave, see MultiServer.SaveJournal"""
+    id = PrimaryKey(int, auto=True)
+    room = Required(Room, index=True)
+    data = Required(buffer)
 
 
 class Seed(db.Entity):
@@ -1,5 +1,7 @@
 import datetime
 import collections
+import functools
+import threading
 from dataclasses import dataclass
 from typing import Any, Callable, Dict, List, Optional, Set, Tuple, NamedTuple, Counter
 from uuid import UUID
@@ -8,14 +10,18 @@ from email.utils import parsedate_to_datetime
 from flask import make_response, render_template, request, Request, Response
 from werkzeug.exceptions import abort
 
-from MultiServer import Context, get_saving_second
+from MultiServer import Context, SaveJournal, get_saving_second
 from NetUtils import ClientStatus, Hint, NetworkItem, NetworkSlot, SlotType
 from Utils import restricted_loads, KeyedDefaultDict, utcnow
 from . import app, cache
-from .models import GameDataPackage, Room
+from .models import GameDataPackage, Room, Seed
+from .tracker_snapshot import decode_checked_locations, decode_hints, load_tracker_snapshot
 
 # Multisave is currently updated, at most, every minute.
 TRACKER_CACHE_TIMEOUT_IN_SECONDS = 60
+# Decoded seeds and data packages kept per process, as they never change.
+SEED_DATA_CACHE_SIZE = 16
+GAME_DATA_CACHE_SIZE = 256
 
 _multiworld_trackers: Dict[str, Callable] = {}
 _player_trackers: Dict[str, Callable] = {}
@@ -40,45 +46,140 @@ def _cache_results(func: Callable) -> Callable:
     return method_wrapper
 
 
+class GameData(NamedTuple):
+    """Lookup tables of a game's data package, shared between all seeds using that data package."""
+    item_id_to_name: Dict[int, str]
+    location_id_to_name: Dict[int, str]
+    item_name_to_id: Dict[str, int]
+    location_name_to_id: Dict[str, int]
+
+
+@functools.lru_cache(maxsize=GAME_DATA_CACHE_SIZE)
+def get_game_data(checksum: str) -> GameData:
+    """Loads the data package with the given checksum and generates inverse lookup tables from it."""
+    game_package = restricted_loads(GameDataPackage.get(checksum=checksum).data)
+    return GameData(
+        KeyedDefaultDict(lambda code: f"Unknown Item (ID: {code})", {
+            id: name for name, id in game_package["item_name_to_id"].items()}),
+        KeyedDefaultDict(lambda code: f"Unknown Location (ID: {code})", {
+            id: name for name, id in game_package["location_name_to_id"].items()}),
+        game_package["item_name_to_id"],
+        game_package["location_name_to_id"],
+    )
+
+
+class SeedData:
+    """The part of the tracker data that only depends on the seed, shared between all requests for rooms of that seed.
+
+    Must not be modified, see get_seed_data.
+    """
+    multidata: Dict[str, Any]
+    item_id_to_name: Dict[str, Dict[int, str]]
+    location_id_to_name: Dict[str, Dict[int, str]]
+    item_name_to_id: Dict[str, Dict[str, int]]
+    location_name_to_id: Dict[str, Dict[str, int]]
+    player_locations_total: Dict[int, int]
+
+    def __init__(self, seed: Seed):
+        self.multidata = Context.decompress(seed.multidata)
+
+        self.item_name_to_id = {}
+        self.location_name_to_id = {}
+
+        # Generate inverse lookup tables from data package, useful for trackers.
+        self.item_id_to_name = KeyedDefaultDict(lambda game_name: {
+            game_name: KeyedDefaultDict(lambda code: f"Unknown Game {game_name} - Item (ID: {code})")
+        })
+        self.location_id_to_name = KeyedDefaultDict(lambda game_name: {
+            game_name: KeyedDefaultDict(lambda code: f"Unknown Game {game_name} - Location (ID: {code})")
+        })
+        for game, game_package in self.multidata["datapackage"].items():
+            game_data = get_game_data(game_package["checksum"])
+            self.item_id_to_name[game] = game_data.item_id_to_name
+            self.location_id_to_name[game] = game_data.location_id_to_name
+
+            # Normal lookup tables as well.
+            self.item_name_to_id[game] = game_data.item_name_to_id
+            self.location_name_to_id[game] = game_data.location_name_to_id
+
+        self.player_locations_total = {player: len(locations)
+                                       for player, locations in self.multidata["locations"].items()}
+        self._sorted_location_ids: Dict[int, List[int]] = {}
+
+    def get_sorted_location_ids(self, player: int) -> List[int]:
+        """The location ids of a player in the order used by the checked locations bitsets of tracker snapshots."""
+        location_ids = self._sorted_location_ids.get(player, None)
+        if location_ids is None:
+            locations = self.multidata["locations"]
+            location_ids = self._sorted_location_ids[player] = sorted(locations[player]) if player in locations else []
+        return location_ids
+
+    @functools.cached_property
+    def spheres(self) -> List[Dict[int, Set[int]]]:
+        spheres = self.multidata.get("spheres", None)
+        if spheres is None and hasattr(self.multidata["locations"], "get_spheres"):
+            # multidata format 4 stores spheres with the locations
+            spheres = self.multidata["locations"].get_spheres()
+        return spheres or []
+
+
+_seed_data_cache: "collections.OrderedDict[UUID, SeedData]" = collections.OrderedDict()
+_seed_data_cache_lock = threading.Lock()
+
+
+def get_seed_data(seed: Seed) -> SeedData:
+    """Returns the decoded data of seed, from the least recently used cache of the last SEED_DATA_CACHE_SIZE seeds."""
+    with _seed_data_cache_lock:
+        seed_data = _seed_data_cache.get(seed.id, None)
+        if seed_data:
+            _seed_data_cache.move_to_end(seed.id)
+            return seed_data
+    # decode outside the lock, concurrent misses for the same seed only do some work twice
+    seed_data = SeedData(seed)
+    with _seed_data_cache_lock:
+        _seed_data_cache[seed.id] = seed_data
+        while len(_seed_data_cache) > SEED_DATA_CACHE_SIZE:
+            _seed_data_cache.popitem(last=False)
+    return seed_data
+
+
 @dataclass
 class TrackerData:
     """A helper dataclass that is instantiated each time an HTTP request comes in for tracker data.
 
     Provides helper methods to lazily load necessary data that each tracker require and caches any results so any
     subsequent helper method calls do not need to recompute results during the lifetime of this instance.
+    Only the room state is decoded per instance, the data of the seed is shared, see get_seed_data. The room state is
+    read from the tracker snapshot of the room if there is one, the full multisave is only decoded when needed.
     """
     room: Room
     _multidata: Dict[str, Any]
-    _multisave: Dict[str, Any]
+    _snapshot: Optional[Dict[str, Any]]
     _tracker_cache: Dict[str, Any]
 
     def __init__(self, room: Room):
         """Initialize a new RoomMultidata object for the current room."""
         self.room = room
-        self._multidata = Context.decompress(room.seed.multidata)
-        self._multisave = restricted_loads(room.multisave) if room.multisave else {}
+        self._seed_data = get_seed_data(room.seed)
+        self._multidata = self._seed_data.multidata
+        self._snapshot = load_tracker_snapshot(room.tracker_snapshot.data) if room.tracker_snapshot else None
         self._tracker_cache = {}
 
-        self.item_name_to_id: Dict[str, Dict[str, int]] = {}
-        self.location_name_to_id: Dict[str, Dict[str, int]] = {}
+        self.item_name_to_id: Dict[str, Dict[str, int]] = self._seed_data.item_name_to_id
+        self.location_name_to_id: Dict[str, Dict[str, int]] = self._seed_data.location_name_to_id
+        self.item_id_to_name: Dict[str, Dict[int, str]] = self._seed_data.item_id_to_name
+        self.location_id_to_name: Dict[str, Dict[int, str]] = self._seed_data.location_id_to_name
 
-        # Generate inverse lookup tables from data package, useful for trackers.
-        self.item_id_to_name: Dict[str, Dict[int, str]] = KeyedDefaultDict(lambda game_name: {
-            game_name: KeyedDefaultDict(lambda code: f"Unknown Game {game_name} - Item (ID: {code})")
-        })
-        self.location_id_to_name: Dict[str, Dict[int, str]] = KeyedDefaultDict(lambda game_name: {
-            game_name: KeyedDefaultDict(lambda code: f"Unknown Game {game_name} - Location (ID: {code})")
-        })
-        for game, game_package in self._multidata["datapackage"].items():
-            game_package = restricted_loads(GameDataPackage.get(checksum=game_package["checksum"]).data)
-            self.item_id_to_name[game] = KeyedDefaultDict(lambda code: f"Unknown Item (ID: {code})", {
-                id: name for name, id in game_package["item_name_to_id"].items()})
-            self.location_id_to_name[game] = KeyedDefaultDict(lambda code: f"Unknown Location (ID: {code})", {
-                id: name for name, id in game_package["location_name_to_id"].items()})
+    @functools.cached_property
+    def _multisave(self) -> Dict[str, Any]:
+        multisave = self.room.get_multisave()
+        return SaveJournal.load(multisave) if multisave else {}
 
-            # Normal lookup tables as well.
-            self.item_name_to_id[game] = game_package["item_name_to_id"]
-            self.location_name_to_id[game] = game_package["location_name_to_id"]
+    def get_room_state(self, key: str, default: Any = None) -> Any:
+        """Retrieves a part of the room save that is also included in tracker snapshots, see copied_save_keys."""
+        if self._snapshot is not None:
+            return self._snapshot.get(key, default)
+        return self._multisave.get(key, default)
 
     def get_seed_name(self) -> str:
         """Retrieves the seed name."""
@@ -104,14 +205,30 @@ class TrackerData:
         """Retrieves all locations with their containing item's metadata for a given player."""
         return self._multidata["locations"][player]
 
+    def get_player_locations_total(self, player: int) -> int:
+        """Retrieves the number of locations of a given player."""
+        return self._seed_data.player_locations_total[player]
+
     def get_player_starting_inventory(self, player: int) -> List[int]:
         """Retrieves a list of all item codes a given slot starts with."""
         return self._multidata["precollected_items"][player]
 
+    @_cache_results
     def get_player_checked_locations(self, team: int, player: int) -> Set[int]:
         """Retrieves the set of all locations marked complete by this player."""
+        if self._snapshot is not None:
+            bits = self._snapshot["location_checks"].get((team, player), None)
+            if bits is None:
+                return set()
+            return decode_checked_locations(bits, self._seed_data.get_sorted_location_ids(player))
         return self._multisave.get("location_checks", {}).get((team, player), set())
 
+    def get_player_checked_locations_count(self, team: int, player: int) -> int:
+        """Retrieves the number of locations marked complete by this player."""
+        if self._snapshot is not None:
+            return self._snapshot["checked_counts"].get((team, player), 0)
+        return len(self.get_player_checked_locations(team, player))
+
     @_cache_results
     def get_player_missing_locations(self, team: int, player: int) -> Set[int]:
         """Retrieves the set of all locations not marked complete by this player."""
@@ -124,11 +241,13 @@ class TrackerData:
     @_cache_results
     def get_player_inventory_counts(self, team: int, player: int) -> collections.Counter:
         """Retrieves a dictionary of all items received by their id and their received count."""
-        received_items = self.get_player_received_items(team, player)
         starting_items = self.get_player_starting_inventory(player)
         inventory = collections.Counter()
-        for item in received_items:
-            inventory[item.item] += 1
+        if self._snapshot is not None:
+            inventory.update(self._snapshot["inventory"].get((team, player), {}))
+        else:
+            for item in self.get_player_received_items(team, player):
+                inventory[item.item] += 1
         for item in starting_items:
             inventory[item] += 1
 
@@ -137,6 +256,8 @@ class TrackerData:
     @_cache_results
     def get_player_hints(self, team: int, player: int) -> Set[Hint]:
         """Retrieves a set of all hints relevant for a particular player."""
+        if self._snapshot is not None:
+            return decode_hints(self._snapshot["hints"].get((team, player), None))
         return self._multisave.get("hints", {}).get((team, player), set())
 
     @_cache_results
@@ -148,11 +269,11 @@ class TrackerData:
 
     def get_player_client_status(self, team: int, player: int) -> ClientStatus:
         """Retrieves the ClientStatus of a particular player."""
-        return self._multisave.get("client_game_state", {}).get((team, player), ClientStatus.CLIENT_UNKNOWN)
+        return self.get_room_state("client_game_state", {}).get((team, player), ClientStatus.CLIENT_UNKNOWN)
 
     def get_player_alias(self, team: int, player: int) -> Optional[str]:
         """Returns the alias of a particular player, if any."""
-        return self._multisave.get("name_aliases", {}).get((team, player), None)
+        return self.get_room_state("name_aliases", {}).get((team, player), None)
 
     @_cache_results
     def get_team_completed_worlds_count(self) -> Dict[int, int]:
@@ -178,7 +299,7 @@ class TrackerData:
     def get_team_locations_total_count(self) -> Dict[int, int]:
         """Retrieves a dictionary of total player locations each team has."""
         return {
-            team: sum(len(self.get_player_locations(player)) for player in players)
+            team: sum(self.get_player_locations_total(player) for player in players)
             for team, players in self.get_all_players().items()
         }
 
@@ -186,7 +307,7 @@ class TrackerData:
     def get_team_locations_checked_count(self) -> Dict[int, int]:
         """Retrieves a dictionary of checked player locations each team has."""
         return {
-            team: sum(len(self.get_player_checked_locations(team, player)) for player in players)
+            team: sum(self.get_player_checked_locations_count(team, player) for player in players)
             for team, players in self.get_all_players().items()
         }
 
@@ -241,7 +362,7 @@ class TrackerData:
     def get_room_locations_complete(self) -> Dict[TeamPlayer, int]:
         """Retrieves a dictionary of all locations complete per player."""
         return {
-            (team, player): len(self.get_player_checked_locations(team, player))
+            (team, player): self.get_player_checked_locations_count(team, player)
             for team, players in self.get_all_players().items() for player in players
         }
 
@@ -274,7 +395,7 @@ class TrackerData:
         """
         last_activity: Dict[TeamPlayer, datetime.timedelta] = {}
         now = utcnow()
-        for (team, player), timestamp in self._multisave.get("client_activity_timers", []):
+        for (team, player), timestamp in self.get_room_state("client_activity_timers", []):
             from_timestamp = datetime.datetime.fromtimestamp(timestamp, datetime.timezone.utc).replace(tzinfo=None)
             last_activity[team, player] = now - from_timestamp
 
@@ -287,15 +408,14 @@ class TrackerData:
         Only supported platforms are Twitch and YouTube.
         """
         video_feeds = {}
-        for (team, player), video_data in self._multisave.get("video", []):
+        for (team, player), video_data in self.get_room_state("video", []):
             video_feeds[team, player] = video_data
 
         return video_feeds
 
-    @_cache_results
     def get_spheres(self) -> List[List[int]]:
         """ each sphere is { player: { location_id, ... } } """
-        return self._multidata.get("spheres", [])
+        return self._seed_data.spheres
 
 
 def _process_if_request_valid(incoming_request: Request, room: Optional[Room]) -> Optional[Response]:
@@ -0,0 +1,122 @@
+"""Compact room state for trackers, kept up to date by the room process on every save.
+
+The snapshot is stored in the TrackerSnapshot entity alongside Room.multisave, so that trackers can show the current
+state of a room without decoding the whole save, whose size grows with the history of the room.
+"""
+import pickle
+import zlib
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from NetUtils import Hint, LocationStore
+from Utils import restricted_loads
+
+TeamPlayer = Tuple[int, int]
+
+snapshot_version = 2
+# keys of the save that are small enough to be copied into every snapshot as is
+copied_save_keys = ("client_game_state", "name_aliases", "client_activity_timers", "client_connection_timers",
+                    "video")
+
+
+def encode_checked_locations(checked: Iterable[int], location_ids: List[int]) -> bytes:
+    """Encodes checked locations as a bitset over the sorted location ids of a slot."""
+    index = {location_id: position for position, location_id in enumerate(location_ids)}
+    bits = bytearray((len(location_ids) + 7) // 8)
+    for location_id in checked:
+        position = index.get(location_id, None)
+        if position is not None:
+            bits[position >> 3] |= 1 << (position & 7)
+    return bytes(bits)
+
+
+def decode_checked_locations(bits: bytes, location_ids: List[int]) -> Set[int]:
+    """Inverse of encode_checked_locations."""
+    return {location_id for position, location_id in enumerate(location_ids)
+            if bits[position >> 3] >> (position & 7) & 1}
+
+
+def decode_hints(data: Optional[bytes]) -> Set[Hint]:
+    """Decodes the hints of a slot as stored in the snapshot, which are pickled per slot, so that a tracker only has
+    to decode the hints of the slots it shows."""
+    return restricted_loads(data) if data else set()
+
+
+class TrackerState:
+    """Builds the tracker snapshot incrementally, only re-encoding the slots whose checks, items or hints changed."""
+    location_checks: Dict[TeamPlayer, bytes]
+    hints: Dict[TeamPlayer, bytes]
+    """ pickled hints of each slot, see decode_hints """
+    checked_counts: Dict[TeamPlayer, int]
+    inventory: Dict[TeamPlayer, Dict[int, int]]
+    """ received item id -> count, not including the starting inventory """
+    received_counts: Dict[TeamPlayer, int]
+    copied: Dict[str, Any]
+
+    def __init__(self, locations: LocationStore) -> None:
+        self.locations = locations
+        self.location_ids: Dict[int, List[int]] = {}
+        self.location_checks = {}
+        self.checked_counts = {}
+        self.inventory = {}
+        self.received_counts = {}
+        self.hints = {}
+        self.copied = {}
+
+    def get_location_ids(self, slot: int) -> List[int]:
+        location_ids = self.location_ids.get(slot, None)
+        if location_ids is None:
+            location_ids = self.location_ids[slot] = sorted(self.locations[slot]) if slot in self.locations else []
+        return location_ids
+
+    def update(self, save: dict, changed_hints: Optional[Iterable[TeamPlayer]] = None) -> None:
+        """Updates the state from a save, as returned by Context.get_save. Only the hints of the slots in
+        changed_hints are encoded again, all of them if it is None."""
+        for team_slot, checks in save["location_checks"].items():
+            # location checks only ever grow, so a changed count means changed checks
+            if len(checks) != self.checked_counts.get(team_slot, 0):
+                self.location_checks[team_slot] = encode_checked_locations(checks,
+                                                                           self.get_location_ids(team_slot[1]))
+                self.checked_counts[team_slot] = len(checks)
+        for (team, slot, remote_items), items in save["received_items"].items():
+            if not remote_items:
+                continue
+            known = self.received_counts.get((team, slot), 0)
+            if len(items) < known:  # the save was replaced, start over
+                known = 0
+                self.inventory.pop((team, slot), None)
+            if len(items) != known:
+                inventory = self.inventory.setdefault((team, slot), {})
+                for item in items[known:]:
+                    inventory[item.item] = inventory.get(item.item, 0) + 1
+                self.received_counts[team, slot] = len(items)
+        hints = save["hints"]
+        if changed_hints is None:
+            self.hints = {}
+            changed_hints = hints
+        for team_slot in changed_hints:
+            if hints.get(team_slot, None):
+                self.hints[team_slot] = pickle.dumps(hints[team_slot])
+            else:
+                self.hints.pop(team_slot, None)
+        self.copied = {key: save[key] for key in copied_save_keys if key in save}
+
+    def dump(self) -> bytes:
+        return zlib.compress(pickle.dumps({
+            "version": snapshot_version,
+            "location_checks": self.location_checks,
+            "checked_counts": self.checked_counts,
+            "inventory": self.inventory,
+            "received_counts": self.received_counts,
+            "hints": self.hints,
+            **self.copied,
+        }))
+
+
+def load_tracker_snapshot(data: Optional[bytes]) -> Optional[Dict[str, Any]]:
+    """Decodes a snapshot written by TrackerState.dump, returns None if there is none or it is of another version."""
+    if not data:
+        return None
+    snapshot = restricted_loads(zlib.decompress(data))
+    if snapshot.get("version", None) != snapshot_version:
+        return None
+    return snapshot
@@ -9,11 +9,15 @@ This is deliberately .pyx because using a non-compiled "pure python" may be slow
 
 # pip install cython cymem
 import cython
+import struct
+import sys
 import warnings
 from cpython cimport PyObject
-from typing import Any, Dict, Iterable, Iterator, Generator, Sequence, Tuple, TypeVar, Union, Set, List, TYPE_CHECKING
+from typing import Any, Dict, Iterable, Iterator, Generator, Optional, Sequence, Tuple, TypeVar, Union, Set, List, \
+    TYPE_CHECKING
 from cymem.cymem cimport Pool
-from libc.stdint cimport int64_t, uint32_t
+from libc.stdint cimport int32_t, int64_t, uint32_t
+from libc.string cimport memcpy
 from collections import defaultdict
 
 cdef extern from *:
@@ -27,6 +31,7 @@ cdef extern from *:
 ctypedef uint32_t ap_player_t  # on AMD64 this is faster (and smaller) than 64bit ints
 ctypedef uint32_t ap_flags_t
 ctypedef int64_t ap_id_t
+ctypedef int32_t ap_sphere_t
 
 cdef ap_player_t MAX_PLAYER_ID = 1000000  # limit the size of indexing array
 cdef size_t INVALID_SIZE = <size_t>(-1)  # this is all 0xff... adding 1 results in 0, but it's not negative
@@ -62,6 +67,7 @@ cdef struct LocationEntry:
     ap_player_t receiver
     ap_id_t item
     ap_flags_t flags
+    ap_sphere_t sphere  # -1 if unknown
 
 
 cdef struct IndexEntry:
@@ -96,6 +102,8 @@ cdef class LocationStore:
     cdef list _items  # ~64KB/1000 players, speed up items (56 per tuple + 8 per list entry)
     cdef list _proxies  # ~92KB/1000 players, speed up self[player] (56 per struct + 28 per len + 8 per list entry)
     cdef PyObject** _raw_proxies  # 8K/1000 players, faster access to _proxies, but does not keep a ref
+    cdef object _buffer  # keeps entries alive if they are wrapped from a buffer, see from_buffer
+    cdef readonly size_t sphere_count
 
     def get_size(self):
         from sys import getsizeof
@@ -108,7 +116,8 @@ cdef class LocationStore:
         size += sizeof(self._raw_proxies[0]) * self.sender_index_size
         return size
 
-    def __init__(self, locations_dict: Dict[int, Dict[int, Sequence[int]]]) -> None:
+    def __init__(self, locations_dict: Dict[int, Dict[int, Sequence[int]]],
+                 spheres: Optional[Sequence[Dict[int, Set[int]]]] = None) -> None:
         self._mem = Pool()
         cdef object key
         self._keys = []
@@ -168,11 +177,30 @@ cdef class LocationStore:
                 self.entries[i].receiver = data[1]
                 if len(data) > 2:
                     self.entries[i].flags = data[2]  # initialized to 0 during alloc
+                self.entries[i].sphere = -1
                 # Ignoring extra data. warn?
                 self.sender_index[sender].count += 1
                 i += 1
 
+        self._build_caches(max_sender, count)
+
+        # fill in spheres, ignoring locations that are not in the store
+        cdef LocationEntry* entry
+        cdef ap_sphere_t sphere_index
+        if spheres:
+            self.sphere_count = len(spheres)
+            for sphere_index, sphere in enumerate(spheres):
+                for sender, locations in sphere.items():
+                    if sender < 1 or sender >= self.sender_index_size:
+                        continue
+                    for location in locations:
+                        entry = (<PlayerLocationProxy>self._raw_proxies[sender])._get(location)
+                        if entry:
+                            entry.sphere = sphere_index
+
+    cdef _build_caches(self, size_t max_sender, size_t count):
         # build pyobject caches
+        cdef size_t i
         self._proxies.append(None)  # player 0
         assert self.sender_index[0].count == 0
         for i in range(1, max_sender + 1):
@@ -188,7 +216,68 @@ cdef class LocationStore:
 
         self.sender_index_size = max_sender + 1
         self.entry_count = count
-        self._len = sender_count
+        self._len = max_sender
+
+    @staticmethod
+    def from_buffer(buffer) -> LocationStore:
+        """
+        Loads the locations section of multidata format 4, see NetUtils.dump_multidata.
+        The entries are used from the buffer without copying them, if it is suitably aligned.
+        """
+        if sys.byteorder != "little" or sizeof(LocationEntry) != 32:
+            from NetUtils import _LocationStore
+            python_store = _LocationStore.from_buffer(buffer)
+            return LocationStore(python_store, python_store.get_spheres())
+
+        cdef const unsigned char[::1] view = buffer
+        player_count, count = struct.unpack_from("<QQ", view)
+        if not player_count:
+            raise ValueError(f"Rejecting game with 0 players")
+        if player_count > MAX_PLAYER_ID:
+            raise ValueError(f"Invalid player id {player_count} for location")
+        if <size_t>view.shape[0] < 16 + count * sizeof(LocationEntry):
+            raise ValueError("Truncated locations")
+        if not count:
+            warnings.warn("Game has no locations")
+
+        cdef LocationStore store = LocationStore.__new__(LocationStore)
+        store._mem = Pool()
+        store._keys = []
+        store._items = []
+        store._proxies = []
+        if count:
+            if <size_t>&view[16] % 8:
+                store.entries = <LocationEntry*>store._mem.alloc(count, sizeof(LocationEntry))
+                memcpy(store.entries, &view[16], count * sizeof(LocationEntry))
+            else:
+                store.entries = <LocationEntry*>&view[16]
+                store._buffer = buffer
+        store.sender_index = <IndexEntry*>store._mem.alloc(player_count + 1, sizeof(IndexEntry))
+        store._raw_proxies = <PyObject**>store._mem.alloc(player_count + 1, sizeof(PyObject*))
+
+        # validate entries and build index, this requires entries to be sorted by sender, then location
+        cdef size_t i
+        cdef LocationEntry* entry
+        cdef LocationEntry* previous = NULL
+        cdef ap_sphere_t max_sphere = -1
+        for i in range(count):
+            entry = store.entries + i
+            if entry.sender < 1 or entry.sender > player_count:
+                raise ValueError(f"Invalid player id {entry.sender} for location")
+            if entry.receiver < 1 or entry.receiver > MAX_PLAYER_ID:
+                raise ValueError(f"Invalid player id {entry.receiver} for item")
+            if previous and (entry.sender < previous.sender or
+                             (entry.sender == previous.sender and entry.location <= previous.location)):
+                raise ValueError("Locations not sorted")
+            if not store.sender_index[entry.sender].count:
+                store.sender_index[entry.sender].start = i
+            store.sender_index[entry.sender].count += 1
+            max_sphere = max(max_sphere, entry.sphere)
+            previous = entry
+
+        store._build_caches(player_count, count)
+        store.sphere_count = max_sphere + 1
+        return store
 
     # fake dict access
     def __len__(self) -> int:
@@ -258,6 +347,27 @@ cdef class LocationStore:
                         all_locations[sender].add(entry.location)
         return all_locations
 
+    def get_sphere(self, slot: int, location: int) -> int:
+        """Returns the sphere of a location, -1 if it is not in any sphere."""
+        cdef size_t sender = slot  # NOTE: this may raise TypeError
+        if sender < 1 or sender >= self.sender_index_size:
+            raise KeyError(slot)
+        cdef LocationEntry* entry = (<PlayerLocationProxy>self._raw_proxies[sender])._get(location)
+        if not entry:
+            raise KeyError(f"No location {location} for player {slot}")
+        return entry.sphere
+
+    def get_spheres(self) -> List[Dict[int, Set[int]]]:
+        """Returns the spheres as stored in multidata, each sphere is { player: { location_id, ... } }."""
+        spheres: List[Dict[int, Set[int]]] = [{} for _ in range(self.sphere_count)]
+        for entry in self.entries[:self.entry_count]:
+            if entry.sphere >= 0:
+                sphere = spheres[entry.sphere]
+                if entry.sender not in sphere:
+                    sphere[entry.sender] = set()
+                sphere[entry.sender].add(entry.location)
+        return spheres
+
     def get_checked(self, state: State, team: int, slot: int) -> List[int]:
         cdef ap_player_t sender = slot
         if sender < 0 or sender >= self.sender_index_size:
@@ -4,6 +4,7 @@ from typing import ClassVar, cast
 from typing_extensions import override
 
 from BaseClasses import CollectionState, Item, MultiWorld, Region
+from Utils import CopyOnAccessDict, CopyOnWriteDict
 from worlds.AutoWorld import LogicMixin, World
 
 from .rules import Rule
@@ -137,10 +138,8 @@ class CachedRuleBuilderLogicMixin(LogicMixin):
 
     def init_mixin(self, multiworld: "MultiWorld") -> None:
         players = multiworld.get_all_ids()
-        self.rule_builder_cache = {player: {} for player in players}
+        self.rule_builder_cache = CopyOnAccessDict((player, CopyOnWriteDict()) for player in players)
 
     def copy_mixin(self, new_state: "CachedRuleBuilderLogicMixin") -> "CachedRuleBuilderLogicMixin":
-        new_state.rule_builder_cache = {
-            player: player_results.copy() for player, player_results in self.rule_builder_cache.items()
-        }
+        new_state.rule_builder_cache = cast(CopyOnAccessDict, self.rule_builder_cache).share()
         return new_state
@@ -0,0 +1,151 @@
+import dataclasses
+import sys
+from collections.abc import Iterable, Set
+from typing import TYPE_CHECKING
+
+from BaseClasses import DEFAULT_COLLECTION_RULE, CollectionRule, Entrance, Location, Region
+
+from .rules import Rule
+
+if TYPE_CHECKING:
+    from BaseClasses import MultiWorld
+    from worlds.AutoWorld import World
+
+
+@dataclasses.dataclass
+class EntranceDependencies:
+    """An index of a world's entrances by the items and regions their rule builder access rules depend on,
+    used by `CollectionState` to only recheck the blocked entrances that could have been unblocked"""
+
+    item_entrances: dict[str, set[Entrance]] = dataclasses.field(default_factory=dict)
+    """A mapping of item name to the entrances whose rules depend on it"""
+
+    region_entrances: dict[Region, set[Entrance]] = dataclasses.field(default_factory=dict)
+    """A mapping of region to the entrances whose rules depend on reaching it"""
+
+    opaque_entrances: set[Entrance] = dataclasses.field(default_factory=set)
+    """Entrances whose dependencies are unknown, these have to be rechecked on every update"""
+
+    entrance_count: int = 0
+    """The number of entrances the world had when this index was built"""
+
+    @classmethod
+    def from_world(cls, world: "World") -> "EntranceDependencies":
+        """Build the index from the current access rules of all of the world's entrances"""
+        index = cls()
+        entrances = world.get_entrances()
+        for entrance in entrances:
+            index.entrance_count += 1
+            dependencies = get_dependencies(world, entrance)
+            if dependencies is None:
+                index.opaque_entrances.add(entrance)
+                continue
+            item_names, regions = dependencies
+            for item_name in item_names:
+                index.item_entrances.setdefault(item_name, set()).add(entrance)
+            for region in regions:
+                index.region_entrances.setdefault(region, set()).add(entrance)
+
+        # collecting an actual item has to recheck the entrances that depend on its logical item
+        item_mapping: dict[str, str] = getattr(world, "item_mapping", {})
+        for item_name, logical_name in item_mapping.items():
+            if logical_name in index.item_entrances:
+                index.item_entrances.setdefault(item_name, set()).update(index.item_entrances[logical_name])
+        return index
+
+    def get_affected(self, blocked: Set[Entrance], item_names: Iterable[str]) -> set[Entrance]:
+        """Returns the blocked entrances that have to be rechecked after the given items were collected"""
+        affected = self.opaque_entrances.intersection(blocked)
+        for item_name in item_names:
+            entrances = self.item_entrances.get(item_name)
+            if entrances:
+                affected.update(entrances.intersection(blocked))
+        return affected
+
+
+def get_dependencies(world: "World", spot: Location | Entrance) -> tuple[set[str], list[Region]] | None:
+    """Returns the item names and regions the access rule of a location or entrance depends on,
+    or None if they cannot be known"""
+    item_names: set[str] = set()
+    region_names: set[str] = set()
+    if not _gather_dependencies(world, spot.access_rule, item_names, region_names, set()):
+        return None
+    try:
+        return item_names, [world.get_region(region_name) for region_name in region_names]
+    except KeyError:
+        return None
+
+
+def get_relevant_items(multiworld: "MultiWorld") -> dict[int, set[str]] | None:
+    """Returns the names of each player's items that any access rule or completion condition depends on,
+    or None if they cannot be known because not all of the multiworld's logic is made of rule builder rules"""
+    from worlds.AutoWorld import World
+
+    if multiworld.groups:
+        return None
+    collect_functions = {World.collect}
+    # importing the cached world here would register its logic mixin after states were already created
+    cached_world = sys.modules.get(f"{__package__}.cached_world")
+    if cached_world:
+        collect_functions.add(cached_world.CachedRuleBuilderWorld.collect)
+    relevant_items: dict[int, set[str]] = {}
+    for player, world in multiworld.worlds.items():
+        world_type = type(world)
+        if not world.incremental_reachability or world_type.collect_item is not World.collect_item \
+                or world_type.collect not in collect_functions:
+            return None
+        item_names: set[str] = set()
+        region_names: set[str] = set()
+        if not _gather_dependencies(world, multiworld.completion_condition[player], item_names, region_names, set()):
+            return None
+        for region in multiworld.get_regions(player):
+            if type(region).can_reach is not Region.can_reach:
+                return None
+        spots: list[Location | Entrance] = [*world.get_locations(), *world.get_entrances()]
+        for spot in spots:
+            if type(spot).can_reach not in (Location.can_reach, Entrance.can_reach):
+                return None
+            dependencies = get_dependencies(world, spot)
+            if dependencies is None:
+                return None
+            item_names |= dependencies[0]
+
+        # collecting an actual item counts towards its logical item
+        item_mapping: dict[str, str] = getattr(world, "item_mapping", {})
+        item_names.update(item_name for item_name, logical_name in item_mapping.items() if logical_name in item_names)
+        relevant_items[player] = item_names
+    return relevant_items
+
+
+def _gather_dependencies(
+    world: "World",
+    rule: CollectionRule,
+    item_names: set[str],
+    region_names: set[str],
+    seen: set[Location | Entrance],
+) -> bool:
+    """Add the items and regions a rule depends on to the given sets, returns False if they cannot be known"""
+    if rule is DEFAULT_COLLECTION_RULE.__func__:
+        return True
+    if not isinstance(rule, Rule.Resolved) or rule.force_recalculate:
+        return False
+    item_names.update(rule.item_dependencies())
+    region_names.update(rule.region_dependencies())
+
+    # reaching a location or entrance also depends on everything their own rules depend on
+    spots: list[Location | Entrance] = []
+    try:
+        spots.extend(world.get_location(location_name) for location_name in rule.location_dependencies())
+        spots.extend(world.get_entrance(entrance_name) for entrance_name in rule.entrance_dependencies())
+    except KeyError:
+        return False
+    for spot in spots:
+        if spot in seen:
+            continue
+        seen.add(spot)
+        if spot.parent_region is None:
+            return False
+        region_names.add(spot.parent_region.name)
+        if not _gather_dependencies(world, spot.access_rule, item_names, region_names, seen):
+            return False
+    return True
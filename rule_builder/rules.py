@@ -1,10 +1,12 @@
 import dataclasses
+import operator
+from array import array
 from collections.abc import Callable, Iterable, Mapping
 from typing import TYPE_CHECKING, Any, ClassVar, Final, Generic, Never, Self, cast
 
 from typing_extensions import TypeVar, dataclass_transform, override
 
-from BaseClasses import CollectionState
+from BaseClasses import CollectionState, ItemCounts
 from NetUtils import JSONMessagePart
 
 from .field_resolvers import FieldResolver, FieldResolverRegister, resolve_field
@@ -32,6 +34,30 @@ def _create_hash_fn(resolved_rule_cls: "CustomRuleRegister") -> Callable[..., in
     return hash_impl
 
 
+def _get_item_indices(world: "World", item_names: Iterable[str]) -> tuple[int, ...] | None:
+    """Returns the indices of the given items in the world's indexed prog_items,
+    or None if the world doesn't use them or not all of the items are indexed"""
+    if not world.indexed_prog_items:
+        return None
+    item_index = world.get_item_index()
+    try:
+        return tuple(item_index[item_name] for item_name in item_names)
+    except KeyError:
+        return None
+
+
+def _create_counts_getter(item_indices: tuple[int, ...]) -> Callable[["array[int]"], tuple[int, ...]]:
+    """Returns a function that gathers the counts at the given indices out of an indexed prog_items array"""
+    if len(item_indices) == 1:
+        item_index = item_indices[0]
+
+        def get_count(counts: "array[int]") -> tuple[int, ...]:
+            return (counts[item_index],)
+
+        return get_count
+    return operator.itemgetter(*item_indices)
+
+
 @dataclass_transform(frozen_default=True, field_specifiers=(dataclasses.field, dataclasses.Field))
 class CustomRuleRegister(type):
     """A metaclass to contain world custom rules and automatically convert resolved rules to frozen dataclasses"""
@@ -846,9 +872,12 @@ class Has(Rule[TWorld], game="Archipelago"):
         count = resolve_field(self.count, world, int)
         if count <= 0:
             return True_().resolve(world)
+        item_name = resolve_field(self.item_name, world, str)
+        item_indices = _get_item_indices(world, (item_name,))
         return self.Resolved(
-            resolve_field(self.item_name, world, str),
+            item_name,
             count=count,
+            item_index=item_indices[0] if item_indices else None,
             player=world.player,
             caching_enabled=getattr(world, "rule_caching_enabled", False),
         )
@@ -862,10 +891,14 @@ class Has(Rule[TWorld], game="Archipelago"):
     class Resolved(Rule.Resolved):
         item_name: str
         count: int = 1
+        item_index: int | None = dataclasses.field(default=None, repr=False, kw_only=True)
+        """The index of the item in the indexed prog_items, if the world uses them"""
         skip_cache: ClassVar[bool] = True
 
         @override
         def _evaluate(self, state: CollectionState) -> bool:
+            if self.item_index is not None:
+                return cast(ItemCounts, state.prog_items[self.player]).indexed_counts[self.item_index] >= self.count
             # implementation based on state.has
             return state.prog_items[self.player][self.item_name] >= self.count
 
@@ -926,6 +959,7 @@ class HasAll(Rule[TWorld], game="Archipelago"):
             return Has(self.item_names[0]).resolve(world)
         return self.Resolved(
             self.item_names,
+            item_indices=_get_item_indices(world, self.item_names),
             player=world.player,
             caching_enabled=getattr(world, "rule_caching_enabled", False),
         )
@@ -946,9 +980,20 @@ class HasAll(Rule[TWorld], game="Archipelago"):
 
     class Resolved(Rule.Resolved):
         item_names: tuple[str, ...]
+        item_indices: tuple[int, ...] | None = dataclasses.field(default=None, repr=False, kw_only=True)
+        """The indices of the items in the indexed prog_items, if the world uses them"""
+        _get_counts: ClassVar[Callable[["array[int]"], tuple[int, ...]] | None] = None
+
+        @override
+        def __post_init__(self) -> None:
+            super().__post_init__()
+            if self.item_indices is not None:
+                object.__setattr__(self, "_get_counts", _create_counts_getter(self.item_indices))
 
         @override
         def _evaluate(self, state: CollectionState) -> bool:
+            if self._get_counts is not None:
+                return all(self._get_counts(cast(ItemCounts, state.prog_items[self.player]).indexed_counts))
             # implementation based on state.has_all
             player_prog_items = state.prog_items[self.player]
             for item in self.item_names:
@@ -1155,6 +1200,7 @@ class HasAllCounts(Rule[TWorld], game="Archipelago"):
         item_counts = tuple((name, resolve_field(count, world, int)) for name, count in self.item_counts.items())
         return self.Resolved(
             item_counts,
+            item_indices=_get_item_indices(world, self.item_counts),
             player=world.player,
             caching_enabled=getattr(world, "rule_caching_enabled", False),
         )
@@ -1184,9 +1230,24 @@ class HasAllCounts(Rule[TWorld], game="Archipelago"):
 
     class Resolved(Rule.Resolved):
         item_counts: tuple[tuple[str, int], ...]
+        item_indices: tuple[int, ...] | None = dataclasses.field(default=None, repr=False, kw_only=True)
+        """The indices of the items in the indexed prog_items, if the world uses them"""
+        _get_counts: ClassVar[Callable[["array[int]"], tuple[int, ...]] | None] = None
+
+        _required_counts: ClassVar[tuple[int, ...]] = ()
+
+        @override
+        def __post_init__(self) -> None:
+            super().__post_init__()
+            if self.item_indices is not None:
+                object.__setattr__(self, "_get_counts", _create_counts_getter(self.item_indices))
+                object.__setattr__(self, "_required_counts", tuple(count for _, count in self.item_counts))
 
         @override
         def _evaluate(self, state: CollectionState) -> bool:
+            if self._get_counts is not None:
+                counts = self._get_counts(cast(ItemCounts, state.prog_items[self.player]).indexed_counts)
+                return all(map(operator.ge, counts, self._required_counts))
             # implementation based on state.has_all_counts
             player_prog_items = state.prog_items[self.player]
             for item, count in self.item_counts:
@@ -1671,6 +1732,7 @@ class HasGroup(Rule[TWorld], game="Archipelago"):
             self.item_name_group,
             item_names,
             count=count,
+            item_indices=_get_item_indices(world, item_names),
             player=world.player,
             caching_enabled=getattr(world, "rule_caching_enabled", False),
         )
@@ -1685,9 +1747,21 @@ class HasGroup(Rule[TWorld], game="Archipelago"):
         item_name_group: str
         item_names: tuple[str, ...]
         count: int = 1
+        item_indices: tuple[int, ...] | None = dataclasses.field(default=None, repr=False, kw_only=True)
+        """The indices of the items in the indexed prog_items, if the world uses them"""
+        _get_counts: ClassVar[Callable[["array[int]"], tuple[int, ...]] | None] = None
+
+        @override
+        def __post_init__(self) -> None:
+            super().__post_init__()
+            if self.item_indices is not None:
+                object.__setattr__(self, "_get_counts", _create_counts_getter(self.item_indices))
 
         @override
         def _evaluate(self, state: CollectionState) -> bool:
+            if self._get_counts is not None:
+                counts = self._get_counts(cast(ItemCounts, state.prog_items[self.player]).indexed_counts)
+                return sum(counts) >= self.count
             # implementation based on state.has_group
             found = 0
             player_prog_items = state.prog_items[self.player]
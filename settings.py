@@ -691,6 +691,28 @@ class GeneratorOptions(Group):
         start_inventory -> Move remaining items to start_inventory, generate additional filler items to fill locations.
         """
 
+    class SweepThreads(int):
+        """
+        Number of threads to check the locations of different players with in parallel while sweeping,
+        and to test the progression balancing candidates of different players with in parallel
+        Only has an effect on free-threaded Python builds
+        0 or 1 -> check all locations in the generating thread
+        """
+
+    class SpoilerProcesses(int):
+        """
+        Number of processes to check which items are required for the spoiler playthrough with in parallel
+        Only has an effect on platforms that can fork processes
+        0 or 1 -> check all items in the generating process
+        """
+
+    class OutputProcesses(int):
+        """
+        Number of processes to generate the output files of worlds that support it with in parallel
+        Only has an effect on platforms that can fork processes
+        0 or 1 -> generate all output files in the generating process
+        """
+
     player_files_path: PlayerFilesPath = PlayerFilesPath("Players")
     players: Players = Players(0)
     allow_quantity: AllowQuantity | bool = False
@@ -700,6 +722,9 @@ class GeneratorOptions(Group):
     race: Race = Race(0)
     plando_options: PlandoOptions = PlandoOptions("bosses, connections, texts")
     panic_method: PanicMethod = PanicMethod("swap")
+    sweep_threads: SweepThreads = SweepThreads(0)
+    spoiler_processes: SpoilerProcesses = SpoilerProcesses(0)
+    output_processes: OutputProcesses = OutputProcesses(0)
     loglevel: str = "info"
     logtime: bool = False
 
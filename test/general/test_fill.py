@@ -1,12 +1,13 @@
 from typing import List, Iterable
+import threading
 import unittest
 
 from Options import Accessibility
 from test.general import generate_items, generate_locations, generate_test_multiworld
 from Fill import FillError, balance_multiworld_progression, fill_restrictive, \
     distribute_early_items, distribute_items_restrictive
-from BaseClasses import Entrance, LocationProgressType, MultiWorld, Region, Item, Location, \
-    ItemClassification
+from BaseClasses import CollectionState, Entrance, LocationProgressType, MultiWorld, Region, Item, Location, \
+    ItemClassification, shutdown_sweep_executors
 from worlds.generic.Rules import CollectionRule, add_item_rule, locality_rules, set_rule
 
 
@@ -448,6 +449,54 @@ class TestFillRestrictive(unittest.TestCase):
         self.assertTrue(multiworld.state.prog_items[item.player][item.name], "Sweep did not collect - Test flawed")
         self.assertEqual(multiworld.state.prog_items[item.player][item.name], 1, "Sweep collected multiple times")
 
+    def test_parallel_sweep(self):
+        """Test that sweeping with threads collects the same items as sweeping without them"""
+        multiworld = generate_test_multiworld(3)
+        players = [generate_player_data(multiworld, player, 2, 2) for player in range(1, 4)]
+        # each player's second location requires the first item of the next player, which is placed in the first
+        # location of the player after that, so the items have to be collected across several sweep iterations
+        for player, next_player, placing_player in zip(players, players[1:] + players[:1], players[2:] + players[:2]):
+            required_item = next_player.prog_items[0]
+            set_rule(player.locations[1], lambda state, item=required_item: state.has(item.name, item.player))
+            placing_player.locations[0].place_locked_item(next_player.prog_items[0])
+        players[0].locations[1].place_locked_item(players[0].prog_items[1])
+        players[1].locations[1].place_locked_item(players[1].prog_items[1])
+
+        serial_state = multiworld.state.copy()
+        serial_state.sweep_for_advancements()
+        multiworld.sweep_threads = 2
+        parallel_state = multiworld.state.copy()
+        parallel_state.sweep_for_advancements()
+
+        self.assertEqual(len(serial_state.advancements), 5)
+        self.assertEqual(serial_state.advancements, parallel_state.advancements)
+        self.assertEqual(serial_state.prog_items, parallel_state.prog_items)
+
+        shutdown_sweep_executors()
+        self.assertFalse([thread for thread in threading.enumerate() if thread.name.startswith("Sweep")],
+                         "sweep threads should be stopped before forking")
+
+    def test_access_checked_once_per_batch(self):
+        """Test that fill only checks the access rule of an unreachable location once for all items of a batch"""
+        multiworld = generate_test_multiworld(3)
+        players = [generate_player_data(multiworld, player, 2, 1) for player in range(1, 4)]
+        unreachable_location = players[0].locations[0]
+        access_checks = 0
+
+        def access_rule(state: CollectionState) -> bool:
+            nonlocal access_checks
+            access_checks += 1
+            return False
+
+        set_rule(unreachable_location, access_rule)
+        locations = [location for player in players for location in player.locations]
+        items = [item for player in players for item in player.prog_items]
+        fill_restrictive(multiworld, multiworld.state, locations, items)
+
+        self.assertEqual([], items)
+        self.assertIn(unreachable_location, locations)
+        self.assertEqual(access_checks, 1)
+
     def test_correct_item_instance_removed_from_pool(self):
         """Test that a placed item gets removed from the submitted pool"""
         multiworld = generate_test_multiworld()
@@ -828,6 +877,17 @@ class TestBalanceMultiworldProgression(unittest.TestCase):
         self.assertRegionContains(
             self.player1.regions[1], self.player2.prog_items[0])
 
+    def test_balances_progression_in_parallel(self) -> None:
+        """Tests that testing the candidates of each player in parallel moves the same progression items earlier"""
+        self.multiworld.worlds[self.player1.id].options.progression_balancing.value = 50
+        self.multiworld.worlds[self.player2.id].options.progression_balancing.value = 50
+        self.multiworld.sweep_threads = 2
+
+        balance_multiworld_progression(self.multiworld)
+
+        self.assertRegionContains(
+            self.player1.regions[1], self.player2.prog_items[0])
+
     def test_balances_progression_light(self) -> None:
         """Test that progression balancing still moves items earlier on minimum value"""
         self.multiworld.worlds[self.player1.id].options.progression_balancing.value = 1
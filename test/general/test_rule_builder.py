@@ -4,7 +4,8 @@ from typing import Any, ClassVar, cast
 
 from typing_extensions import override
 
-from BaseClasses import CollectionState, Item, ItemClassification, Location, MultiWorld, Region
+from BaseClasses import (CollectionState, Item, ItemClassification, ItemCounts, Location, MultiWorld, Region,
+                         SphereFrontier)
 from NetUtils import JSONMessagePart
 from Options import Choice, FreeText, Option, OptionSet, PerGameCommonOptions, Range, Toggle
 from rule_builder.cached_world import CachedRuleBuilderWorld
@@ -640,6 +641,124 @@ class TestCacheDisabled(RuleBuilderTestCase):
         self.assertTrue(location.can_reach(self.state))
 
 
+class TestIncrementalReachability(RuleBuilderTestCase):
+    multiworld: MultiWorld  # pyright: ignore[reportUninitializedInstanceVariable]
+    world: World  # pyright: ignore[reportUninitializedInstanceVariable]
+    state: CollectionState  # pyright: ignore[reportUninitializedInstanceVariable]
+    player: int = 1
+
+    @override
+    def setUp(self) -> None:
+        super().setUp()
+        self.world_cls.incremental_reachability = True
+        self.world_cls.explicit_indirect_conditions = False
+
+        self.multiworld = setup_solo_multiworld(self.world_cls, seed=0)
+        world = self.multiworld.worlds[1]
+        self.world = world
+        self.state = self.multiworld.state
+
+        regions = [Region(f"Region {i}", self.player, self.multiworld) for i in range(1, 6)]
+        self.multiworld.regions.extend(regions)
+        region1, region2, region3, region4, region5 = regions
+
+        world.create_entrance(region1, region2, Has("Item 1"))
+        world.create_entrance(region1, region3, CanReachRegion("Region 2") & Has("Item 2"))
+        region1.connect(region4, "Region 1 -> Region 4", lambda state: state.has("Item 3", self.player))
+        world.create_entrance(region1, region5, CanReachEntrance("Region 1 -> Region 2") & Has("Item 4"))
+
+    def test_index(self) -> None:
+        dependencies = self.world.get_entrance_dependencies()
+        self.assertEqual(dependencies.item_entrances["Item 1"], {
+            self.world.get_entrance("Region 1 -> Region 2"),
+            self.world.get_entrance("Region 1 -> Region 5"),
+        })
+        self.assertEqual(dependencies.region_entrances[self.world.get_region("Region 1")], {
+            self.world.get_entrance("Region 1 -> Region 5"),
+        })
+        self.assertEqual(dependencies.region_entrances[self.world.get_region("Region 2")], {
+            self.world.get_entrance("Region 1 -> Region 3"),
+        })
+        self.assertEqual(dependencies.opaque_entrances, {self.world.get_entrance("Region 1 -> Region 4")})
+
+    def test_index_rebuilt(self) -> None:
+        dependencies = self.world.get_entrance_dependencies()
+        self.assertIs(self.world.get_entrance_dependencies(), dependencies)
+
+        self.world.set_rule(self.world.get_entrance("Region 1 -> Region 4"), Has("Item 3"))
+        self.assertIsNot(self.world.get_entrance_dependencies(), dependencies)
+        self.assertFalse(self.world.get_entrance_dependencies().opaque_entrances)
+
+    def test_item_dependency(self) -> None:
+        self.assertFalse(self.state.can_reach_region("Region 2", self.player))
+        self.state.collect(self.world.create_item("Item 1"))
+        self.assertTrue(self.state.can_reach_region("Region 2", self.player))
+
+    def test_region_dependency(self) -> None:
+        self.state.collect(self.world.create_item("Item 2"))
+        self.assertFalse(self.state.can_reach_region("Region 3", self.player))
+
+        self.state.collect(self.world.create_item("Item 1"))  # only unblocks region 3 through region 2
+        self.assertTrue(self.state.can_reach_region("Region 3", self.player))
+
+    def test_entrance_dependency(self) -> None:
+        self.state.collect(self.world.create_item("Item 4"))
+        self.assertFalse(self.state.can_reach_region("Region 5", self.player))
+
+        self.state.collect(self.world.create_item("Item 1"))  # only needed for the entrance to region 2
+        self.assertTrue(self.state.can_reach_region("Region 5", self.player))
+
+    def test_opaque_rule(self) -> None:
+        self.assertFalse(self.state.can_reach_region("Region 4", self.player))
+        self.state.collect(self.world.create_item("Item 3"))
+        self.assertTrue(self.state.can_reach_region("Region 4", self.player))
+
+    def test_copy(self) -> None:
+        self.assertFalse(self.state.can_reach_region("Region 2", self.player))
+        self.state.collect(self.world.create_item("Item 1"))
+        state = self.state.copy()
+        self.assertTrue(state.can_reach_region("Region 2", self.player))
+
+    def test_remove(self) -> None:
+        item = self.world.create_item("Item 1")
+        self.state.collect(item)
+        self.assertTrue(self.state.can_reach_region("Region 2", self.player))
+        self.state.remove(item)
+        self.assertFalse(self.state.can_reach_region("Region 2", self.player))
+        self.state.collect(item)
+        self.assertTrue(self.state.can_reach_region("Region 2", self.player))
+
+    def test_sphere_frontier(self) -> None:
+        region1 = self.world.get_region("Region 1")
+        region2 = self.world.get_region("Region 2")
+        item_location = Location(self.player, "Item Location", None, region1)
+        self.world.set_rule(item_location, Has("Item 2"))
+        region_location = Location(self.player, "Region Location", None, region2)
+        opaque_location = Location(self.player, "Opaque Location", None, region1)
+        opaque_location.access_rule = lambda state: state.has("Item 3", self.player)
+        region1.locations += [item_location, opaque_location]
+        region2.locations.append(region_location)
+
+        frontier = SphereFrontier(self.multiworld, [item_location, region_location, opaque_location])
+        self.assertFalse(frontier.pop_reachable(self.state))
+
+        # the opaque location's dependencies aren't known, so it gets checked again anyway
+        item = self.world.create_item("Item 3")
+        self.state.collect(item)
+        self.assertEqual(frontier.pop_reachable(self.state), {opaque_location})
+
+        item = self.world.create_item("Item 1")
+        self.state.collect(item)
+        frontier.collected([item])
+        self.assertEqual(frontier.pop_reachable(self.state), {region_location})
+
+        item = self.world.create_item("Item 2")
+        self.state.collect(item)
+        frontier.collected([item])
+        self.assertEqual(frontier.pop_reachable(self.state), {item_location})
+        self.assertFalse(frontier.remaining)
+
+
 class TestRules(RuleBuilderTestCase):
     multiworld: MultiWorld  # pyright: ignore[reportUninitializedInstanceVariable]
     world: World  # pyright: ignore[reportUninitializedInstanceVariable]
@@ -842,6 +961,46 @@ class TestRules(RuleBuilderTestCase):
         self.assertEqual(self.multiworld.can_beat_game(self.state), True)
 
 
+class TestIndexedRules(TestRules):
+    """Runs the rule tests again with the item rules evaluated against indexed prog_items"""
+
+    @override
+    def _create_world_class(self) -> None:
+        super()._create_world_class()
+        self.world_cls.indexed_prog_items = True
+
+    def test_indexed(self) -> None:
+        self.assertIsInstance(self.state.prog_items[self.player], ItemCounts)
+        for rule in (Has("Item 1"), HasAll("Item 1", "Item 2"), HasAllCounts({"Item 1": 1, "Item 2": 2}),
+                     HasGroup("Group 1")):
+            with self.subTest(rule=str(rule)):
+                resolved_rule = rule.resolve(self.world)
+                if isinstance(resolved_rule, Has.Resolved):
+                    self.assertIsNotNone(resolved_rule.item_index)
+                else:
+                    self.assertIsNotNone(getattr(resolved_rule, "item_indices"))
+
+    def test_unindexed_item(self) -> None:
+        resolved_rule = HasAll("Item 1", "Event").resolve(self.world)
+        self.assertIsNone(getattr(resolved_rule, "item_indices"))
+        self.state.collect(self.world.create_item("Item 1"))
+        self.state.add_item("Event", self.player)
+        self.assertTrue(resolved_rule(self.state))
+
+    def test_counts_in_sync(self) -> None:
+        item_index = self.world.get_item_index()
+        prog_items = cast(ItemCounts, self.state.prog_items[self.player])
+        prog_items.update({"Item 1": 2, "Item 2": 1})
+        prog_items["Item 3"] += 3
+        del prog_items["Item 2"]
+        copy = cast(ItemCounts, self.state.copy().prog_items[self.player])
+        prog_items.clear()
+        self.assertEqual(0, sum(prog_items.indexed_counts))
+        self.assertIsInstance(copy, ItemCounts)
+        for item_name in ("Item 1", "Item 2", "Item 3"):
+            self.assertEqual(copy[item_name], copy.indexed_counts[item_index[item_name]])
+
+
 class TestSerialization(RuleBuilderTestCase):
     maxDiff: int | None = None
 
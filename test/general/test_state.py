@@ -1,5 +1,9 @@
+import multiprocessing
 import unittest
+from unittest import mock
 
+from BaseClasses import CollectionState, Location, SphereIndex, Spoiler
+from Fill import distribute_items_restrictive
 from worlds.AutoWorld import AutoWorldRegister, call_all
 from . import setup_solo_multiworld
 
@@ -28,3 +32,108 @@ class TestBase(unittest.TestCase):
                     with self.subTest("Step", step=step):
                         call_all(multiworld, step)
                         self.assertTrue(multiworld.get_all_state(allow_partial_entrances=True))
+
+    def test_copy_is_independent(self):
+        """Ensure changes to a copied state and its copy don't affect each other."""
+        multiworld = setup_solo_multiworld(AutoWorldRegister.world_types["A Link to the Past"])
+        state = multiworld.get_all_state()
+        copy = state.copy()
+        location = next(iter(multiworld.get_locations()))
+        copy.prog_items[1]["Test Item"] += 1
+        copy.advancements.add(location)
+        copy.reachable_regions[1].clear()
+        self.assertNotIn("Test Item", state.prog_items[1])
+        self.assertNotIn(location, state.advancements)
+        self.assertTrue(state.reachable_regions[1])
+
+        state.prog_items[1]["Other Item"] += 1
+        state.path.clear()
+        self.assertNotIn("Other Item", copy.prog_items[1])
+        self.assertTrue(copy.path)
+        self.assertEqual(state.locations_checked, copy.locations_checked)
+
+    def test_copy_is_independent_of_kept_references(self):
+        """Ensure containers referenced from before copying a state can still be changed without affecting the copy."""
+        multiworld = setup_solo_multiworld(AutoWorldRegister.world_types["A Link to the Past"])
+        state = multiworld.get_all_state()
+        location = next(iter(multiworld.get_locations()))
+        locations_checked = state.locations_checked
+        locations_checked.discard(location)
+        prog_items = state.prog_items[1]
+        copy = state.copy()
+        copy_of_copy = copy.copy()
+        locations_checked.add(location)
+        prog_items["Test Item"] += 1
+        self.assertIn(location, state.locations_checked)
+        self.assertNotIn(location, copy.locations_checked)
+        self.assertNotIn(location, copy_of_copy.locations_checked)
+        self.assertNotIn("Test Item", copy.prog_items[1])
+        self.assertNotIn("Test Item", copy_of_copy.prog_items[1])
+
+    def test_sphere_index(self):
+        """Ensure the sphere index produces the same spheres as computing them without it."""
+        multiworld = setup_solo_multiworld(AutoWorldRegister.world_types["A Link to the Past"], seed=0)
+        distribute_items_restrictive(multiworld)
+        spheres = list(multiworld.get_spheres())
+        sendable_spheres = list(multiworld.get_sendable_spheres())
+        fulfills_accessibility = multiworld.fulfills_accessibility()
+
+        multiworld.sphere_index = SphereIndex(multiworld)
+        self.assertEqual(spheres, list(multiworld.get_spheres()))
+        self.assertEqual(sendable_spheres, list(multiworld.get_sendable_spheres()))
+        self.assertEqual(fulfills_accessibility, multiworld.fulfills_accessibility())
+        for sphere, state in zip(multiworld.sphere_index.spheres, multiworld.sphere_index.states):
+            state = state.copy()
+            for location in sphere:
+                self.assertTrue(location.can_reach(state))
+
+    def test_playthrough_with_sphere_index(self):
+        """Ensure the playthrough is the same with the sphere index and is culled from states with only progress."""
+        multiworld = setup_solo_multiworld(AutoWorldRegister.world_types["A Link to the Past"], seed=0)
+        distribute_items_restrictive(multiworld)
+        multiworld.spoiler.create_playthrough()
+        playthrough = multiworld.spoiler.playthrough
+
+        multiworld.sphere_index = SphereIndex(multiworld)
+        state_caches: list[list[CollectionState | None]] = []
+        cull_spheres = Spoiler.cull_spheres
+
+        def record_state_cache(spoiler: Spoiler, collection_spheres: list[set[Location]],
+                               state_cache: list[CollectionState | None]) -> set[Location]:
+            state_caches.append(state_cache)
+            return cull_spheres(spoiler, collection_spheres, state_cache)
+
+        with mock.patch.object(Spoiler, "cull_spheres", record_state_cache):
+            multiworld.spoiler.create_playthrough()
+        self.assertEqual(playthrough, multiworld.spoiler.playthrough)
+        for state in state_caches[0]:
+            if state:
+                self.assertTrue(all(location.item.advancement for location in state.locations_checked))
+
+    def test_cull_spheres(self):
+        """Ensure culling the playthrough spheres keeps the same locations as checking them one at a time."""
+        multiworld = setup_solo_multiworld(AutoWorldRegister.world_types["A Link to the Past"], seed=0)
+        distribute_items_restrictive(multiworld)
+        sphere_index = SphereIndex(multiworld)
+        spheres = [{location for location in sphere if location.item.advancement} for sphere in sphere_index.spheres]
+        spheres = spheres[:spheres.index(set())] if set() in spheres else spheres
+        state_cache = [None, *sphere_index.states[1:len(spheres) + 1]]
+
+        expected_spheres = [set(sphere) for sphere in spheres]
+        required_locations = set().union(*expected_spheres)
+        for num, sphere in reversed(tuple(enumerate(expected_spheres))):
+            for location in list(sphere):
+                required_locations.remove(location)
+                if multiworld.can_beat_game(state_cache[num], required_locations):
+                    sphere.remove(location)
+                else:
+                    required_locations.add(location)
+
+        culled_spheres = [set(sphere) for sphere in spheres]
+        self.assertEqual(required_locations, multiworld.spoiler.cull_spheres(culled_spheres, state_cache))
+        self.assertEqual(expected_spheres, culled_spheres)
+        if "fork" in multiprocessing.get_all_start_methods():
+            multiworld.spoiler_processes = 2
+            culled_spheres = [set(sphere) for sphere in spheres]
+            self.assertEqual(required_locations, multiworld.spoiler.cull_spheres(culled_spheres, state_cache))
+            self.assertEqual(expected_spheres, culled_spheres)
@@ -0,0 +1,54 @@
+"""Verify that the binary encoding carries the same packets as JSON."""
+
+import unittest
+
+import msgpack
+
+from NetUtils import (HintStatus, NetworkItem, NetworkPlayer, NetworkSlot, SlotType, decode, decode_binary, encode,
+                      encode_binary, join_encoded)
+from Utils import Version
+
+
+class TestBinaryEncoding(unittest.TestCase):
+    msgs = [
+        {"cmd": "ReceivedItems", "index": 0, "items": [NetworkItem(1, 2, 3, 4), NetworkItem(5, 6, 7)]},
+        {"cmd": "RoomUpdate", "players": [NetworkPlayer(0, 1, "Alias", "Name")], "checked_locations": {1, 2},
+         "version": Version(1, 2, 3)},
+        {"cmd": "PrintJSON", "data": [{"text": "hint", "hint_status": HintStatus.HINT_FOUND}]},
+    ]
+
+    def test_round_trip(self) -> None:
+        decoded = decode_binary(encode_binary(self.msgs))
+        self.assertEqual(decoded, decode(encode(self.msgs)))
+        self.assertIsInstance(decoded[0]["items"][0], NetworkItem)
+        self.assertIsInstance(decoded[1]["players"][0], NetworkPlayer)
+        self.assertIsInstance(decoded[1]["version"], Version)
+        self.assertEqual(decoded[2]["data"][0]["hint_status"], HintStatus.HINT_FOUND)
+
+    def test_keys(self) -> None:
+        slot_info = {1: NetworkSlot("Name", "Game", SlotType.group, [2, 3])}
+        decoded = decode_binary(encode_binary([{"cmd": "Connected", "slot_info": slot_info}]))
+        self.assertEqual(decoded[0]["slot_info"], {1: NetworkSlot("Name", "Game", SlotType.group, [2, 3])})
+        self.assertIsInstance(decoded[0]["slot_info"][1], NetworkSlot)
+
+    def test_join(self) -> None:
+        # array headers of different sizes
+        for count in (1, 15, 16, 70000):
+            with self.subTest(count=count):
+                tail = [{"cmd": "Bounced"}] * count
+                self.assertEqual(decode_binary(join_encoded([encode_binary(self.msgs), encode_binary(tail)])),
+                                 decode_binary(encode_binary(self.msgs + tail)))
+                self.assertEqual(decode(join_encoded([encode(self.msgs), encode([]), encode(tail)])),
+                                 decode(encode(self.msgs + tail)))
+
+    def test_untrusted(self) -> None:
+        data = encode_binary(self.msgs)
+        self.assertEqual(decode_binary(data, untrusted=True), decode_binary(data))
+        for name, data in (("bin", encode_binary([{"cmd": "Say", "text": b"text"}])),
+                           ("bin in list", encode_binary([{"cmd": "Sync", "items": [b""]}])),
+                           ("ext type", msgpack.packb([{"cmd": "Sync", "data": msgpack.ExtType(99, b"")}])),
+                           ("int key", encode_binary([{"cmd": "Set", 1: 2}])),
+                           ("bin key", msgpack.packb([{"cmd": "Set", b"key": 2}]))):
+            with self.subTest(name):
+                with self.assertRaises(ValueError):
+                    decode_binary(data, untrusted=True)
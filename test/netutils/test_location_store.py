@@ -3,7 +3,7 @@ import os
 import typing
 import unittest
 import warnings
-from NetUtils import LocationStore, _LocationStore
+from NetUtils import LocationStore, _LocationStore, dump_multidata, load_multidata, multidata_header
 
 State = typing.Dict[typing.Tuple[int, int], typing.Set[int]]
 RawLocations = typing.Dict[int, typing.Dict[int, typing.Tuple[int, int, int]]]
@@ -44,6 +44,12 @@ one_state: State = {
     (0, 1): {12}
 }
 
+sample_spheres: typing.List[typing.Dict[int, typing.Set[int]]] = [
+    {1: {11, 13}, 2: {23}},
+    {2: {21, 22}, 4: {9}, 6: {1}},
+    {1: {12, 14}},
+]
+
 
 class Base:
     class TestLocationStore(unittest.TestCase):
@@ -165,6 +171,19 @@ class Base:
             with self.assertRaises(KeyError):
                 self.store.get_remaining(bad_state, 0, 9999)
 
+        def test_get_sphere(self) -> None:
+            self.assertEqual(self.store.get_sphere(1, 11), 0)
+            self.assertEqual(self.store.get_sphere(1, 12), 2)
+            self.assertEqual(self.store.get_sphere(2, 22), 1)
+            self.assertEqual(self.store.get_sphere(4, 9), 1)
+            self.assertEqual(self.store.get_sphere(3, 9), -1)
+
+        def test_get_sphere_exception(self) -> None:
+            with self.assertRaises(KeyError):
+                self.store.get_sphere(1, 14)
+            with self.assertRaises(KeyError):
+                self.store.get_sphere(6, 1)
+
         def test_location_set_intersection(self) -> None:
             locations = {10, 11, 12}
             locations.intersection_update(self.store[1])
@@ -223,6 +242,26 @@ class Base:
                 self.assertEqual(store.get_remaining(empty_state, 0, 1), [])
                 self.assertEqual(store.get_remaining(full_state, 0, 1), [])
 
+        def test_no_spheres(self) -> None:
+            store = self.type(sample_data)
+            self.assertEqual(store.get_sphere(1, 11), -1)
+            self.assertEqual(store.sphere_count, 0)
+            self.assertEqual(store.get_spheres(), [])
+
+        def test_from_buffer(self) -> None:
+            data = dump_multidata({"locations": sample_data, "spheres": sample_spheres, "precollected_items": {},
+                                   "slot_data": {}})
+            _, _, offset, size, *_ = multidata_header.unpack_from(data)
+            for buffer in (data[offset:offset + size], memoryview(data)[offset:offset + size],
+                           memoryview(b"\0" + data[offset:offset + size])[1:]):  # misaligned
+                store = self.type.from_buffer(buffer)
+                self.assertEqual({player: dict(store[player].items()) for player in store}, sample_data)
+                self.assertEqual(store.get_sphere(1, 12), 2)
+                self.assertEqual(store.get_sphere(3, 9), -1)
+                self.assertEqual(store.sphere_count, 3)
+                self.assertEqual(store.get_spheres(), [{1: {11, 13}, 2: {23}}, {2: {21, 22}, 4: {9}}, {1: {12}}])
+                self.assertEqual(store.get_remaining(one_state, 0, 1), [(1, 13), (2, 21)])
+
         def test_no_locations_for_1(self) -> None:
             store = self.type({
                 1: {},
@@ -245,7 +284,7 @@ class Base:
 class TestPurePythonLocationStore(Base.TestLocationStore):
     """Run base method tests for pure python implementation."""
     def setUp(self) -> None:
-        self.store = _LocationStore(sample_data)
+        self.store = _LocationStore(sample_data, sample_spheres)
         super().setUp()
 
 
@@ -256,12 +295,29 @@ class TestPurePythonLocationStoreConstructor(Base.TestLocationStoreConstructor):
         super().setUp()
 
 
+class TestMultiData(unittest.TestCase):
+    def test_round_trip(self) -> None:
+        slot_data = {1: {"option": 1}, 2: {}, 3: {"list": [1, 2]}, 4: {}, 5: {}}
+        multidata = {"locations": sample_data, "spheres": sample_spheres, "precollected_items": {1: [5, 6], 2: []},
+                     "slot_data": slot_data, "seed_name": "test"}
+        data = dump_multidata(multidata)
+        self.assertEqual(data[0], 4)
+        loaded = load_multidata(data)
+        self.assertEqual(loaded["seed_name"], "test")
+        self.assertNotIn("spheres", loaded)
+        self.assertEqual(loaded["locations"].get_spheres(), [{1: {11, 13}, 2: {23}}, {2: {21, 22}, 4: {9}}, {1: {12}}])
+        self.assertEqual(loaded["precollected_items"], {1: [5, 6], 2: []})
+        self.assertEqual(dict(loaded["slot_data"]), slot_data)
+        # re-encoding a loaded multidata gives the same data
+        self.assertEqual(dump_multidata(loaded), data)
+
+
 @unittest.skipIf(LocationStore is _LocationStore and not ci, "_speedups not available")
 class TestSpeedupsLocationStore(Base.TestLocationStore):
     """Run base method tests for cython implementation."""
     def setUp(self) -> None:
         self.assertFalse(LocationStore is _LocationStore, "Failed to load _speedups")
-        self.store = LocationStore(sample_data)
+        self.store = LocationStore(sample_data, sample_spheres)
         super().setUp()
 
 
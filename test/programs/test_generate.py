@@ -1,12 +1,18 @@
 # Tests for Generate.py (ArchipelagoGenerate.exe)
 
+import io
+import multiprocessing
 import unittest
 import os
 import os.path
 import sys
+import threading
+import zipfile
+import zlib
 
 from pathlib import Path
 from tempfile import TemporaryDirectory
+from unittest import mock
 
 import Generate
 import Main
@@ -93,6 +99,85 @@ class TestGenerateMain(unittest.TestCase):
 
         self.assertOutput(self.output_tempdir.name)
 
+    def test_output_archive(self):
+        sys.argv = [sys.argv[0], '--seed', '0', '--spoiler', '1',
+                    '--player_files_path', str(self.abs_input_dir),
+                    '--outputpath', self.output_tempdir.name]
+        Main.main(*Generate.main())
+
+        self.assertOutput(self.output_tempdir.name)
+        with zipfile.ZipFile(next(Path(self.output_tempdir.name).glob("*.zip"))) as zf:
+            self.assertIsNone(zf.testzip())
+            self.assertEqual(len(zf.namelist()), 2)
+
+        archive_path = os.path.join(self.output_tempdir.name, "archive.zip")
+        compressed = os.urandom(100000)
+        with TemporaryDirectory() as temp_dir, Main.OutputArchive(archive_path, temp_dir) as archive:
+            archive.add_data("compressed.bin", compressed)
+            archive.wait()
+            self.assertFalse(any(thread.name.startswith("OutputArchive") for thread in threading.enumerate()))
+            archive.add_data("text.txt", b"text" * 10000)
+            with open(os.path.join(temp_dir, "file.bin"), "wb") as f:
+                f.write(compressed)
+            with open(os.path.join(temp_dir, "file.txt"), "wb") as f:
+                f.write(b"file" * 100000)
+            archive.add_files(temp_dir, "file")
+        with zipfile.ZipFile(archive_path) as zf:
+            self.assertIsNone(zf.testzip())
+            self.assertEqual(zf.namelist(), ["compressed.bin", "file.bin", "file.txt", "text.txt"])
+            self.assertEqual(zf.getinfo("compressed.bin").compress_type, zipfile.ZIP_STORED)
+            self.assertEqual(zf.getinfo("text.txt").compress_type, zipfile.ZIP_DEFLATED)
+            self.assertEqual(zf.getinfo("file.bin").compress_type, zipfile.ZIP_STORED)
+            self.assertEqual(zf.getinfo("file.txt").compress_type, zipfile.ZIP_DEFLATED)
+            self.assertEqual(zf.read("compressed.bin"), compressed)
+            self.assertEqual(zf.read("text.txt"), b"text" * 10000)
+            self.assertEqual(zf.read("file.bin"), compressed)
+            self.assertEqual(zf.read("file.txt"), b"file" * 100000)
+
+    def test_append_deflated_member(self):
+        data = b"member" * 1000
+        compressor = zlib.compressobj(9, zlib.DEFLATED, -zlib.MAX_WBITS)
+        compressed = compressor.compress(data) + compressor.flush()
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, "w") as zf:
+            zf.writestr("first.txt", b"first")
+            Main._append_deflated_member(zf, zipfile.ZipInfo("member.txt"), compressed, zlib.crc32(data), len(data))
+            zf.writestr("last.txt", b"last")
+        with zipfile.ZipFile(buffer) as zf:
+            self.assertIsNone(zf.testzip())
+            self.assertEqual(zf.namelist(), ["first.txt", "member.txt", "last.txt"])
+            self.assertEqual(zf.getinfo("member.txt").compress_type, zipfile.ZIP_DEFLATED)
+            self.assertEqual(zf.read("member.txt"), data)
+            self.assertEqual(zf.read("last.txt"), b"last")
+
+    @unittest.skipUnless("fork" in multiprocessing.get_all_start_methods(), "output processes require forking")
+    def test_generate_output_processes(self):
+        from settings import get_settings
+        from worlds.AutoWorld import AutoWorldRegister
+
+        def generate_output(world, output_directory: str) -> None:
+            world.generated_in_process = True
+            with open(os.path.join(output_directory, f"{world.multiworld.get_out_file_name_base(world.player)}.txt"),
+                      "w") as f:
+                f.write(str(os.getpid()))
+
+        world_type = AutoWorldRegister.world_types["APQuest"]
+        settings = get_settings()
+        sys.argv = [sys.argv[0], '--seed', '0',
+                    '--player_files_path', str(self.abs_input_dir),
+                    '--outputpath', self.output_tempdir.name]
+        with mock.patch.object(world_type, "generate_output", generate_output, create=True), \
+                mock.patch.object(world_type, "generate_output_in_process", True), \
+                mock.patch.object(settings.generator, "output_processes", 2):
+            multiworld = Main.main(*Generate.main())
+
+        self.assertOutput(self.output_tempdir.name)
+        self.assertFalse(getattr(multiworld.worlds[1], "generated_in_process", False))
+        with zipfile.ZipFile(next(Path(self.output_tempdir.name).glob("*.zip"))) as zf:
+            output_files = [name for name in zf.namelist() if name.endswith(".txt") and "_Spoiler" not in name]
+            self.assertEqual(len(output_files), 1)
+            self.assertNotEqual(zf.read(output_files[0]).decode(), str(os.getpid()))
+
 
 class TestGenerateWeights(TestGenerateMain):
     """Tests Generate.py using a weighted file to generate for multiple players."""
@@ -108,6 +193,8 @@ class TestGenerateWeights(TestGenerateMain):
     # don't need to run these tests
     test_generate_absolute = None
     test_generate_relative = None
+    test_generate_output_processes = None
+    test_output_archive = None
 
     def test_generate_yaml(self):
         from settings import get_settings
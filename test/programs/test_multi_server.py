@@ -1,5 +1,14 @@
+import asyncio
+import os
+import tempfile
 import unittest
-from MultiServer import Context, ServerCommandProcessor
+from typing import Any, cast
+
+from typing_extensions import override
+
+from MultiServer import (Client, Context, SaveJournal, ServerCommandProcessor, process_client_cmd, send_items_to,
+                         send_new_items)
+from NetUtils import Hint, HintStatus, NetworkItem, decode, decode_binary
 
 
 class TestResolvePlayerName(unittest.TestCase):
@@ -38,3 +47,331 @@ class TestResolvePlayerName(unittest.TestCase):
         assert p.resolve_player("ABC") == (1, 2, "abc"), "case insensitive resolves when 1 match"
         assert p.resolve_player("abcd") == (1, 3, "abCD"), "case insensitive resolves when 1 match"
         assert not p.resolve_player("aB"), "partial name shouldn't resolve to player"
+
+
+class TestDataPackage(unittest.TestCase):
+    def test_data_package_msg(self) -> None:
+        ctx = Context("", 0, "", "", 0, 0, False)
+        games = ["Archipelago", "A Link to the Past"]
+        expected = ctx.dumper([{"cmd": "DataPackage",
+                                "data": {"games": {game: ctx.gamespackage[game] for game in games}}}])
+        self.assertEqual(ctx.get_data_package_msg(games), expected)
+        self.assertIn(ctx.gamespackage["A Link to the Past"].get("checksum"), ctx.encoded_game_packages)
+        # served from the cache the second time
+        self.assertEqual(ctx.get_data_package_msg(games), expected)
+        self.assertEqual(ctx.get_data_package_msg([]), ctx.dumper([{"cmd": "DataPackage", "data": {"games": {}}}]))
+
+        binary_msg = ctx.get_data_package_msg(games, True)
+        assert isinstance(binary_msg, bytes)
+        self.assertEqual(decode_binary(binary_msg), decode(expected))
+        self.assertEqual(ctx.get_data_package_msg(games, True), binary_msg)
+
+
+class TestSaveJournal(unittest.TestCase):
+    def test_journal(self) -> None:
+        ctx = Context("", 0, "", "", 0, 0, False)
+        with tempfile.TemporaryDirectory() as directory:
+            save_filename = ctx.save_filename = os.path.join(directory, "test.apsave")
+
+            def saved() -> dict[str, Any]:
+                self.assertTrue(ctx._save())  # pyright: ignore[reportPrivateUsage]
+                with open(save_filename, "rb") as f:
+                    return SaveJournal.load(f.read())
+
+            ctx.received_items[0, 1, True] = [NetworkItem(1, 2, 2, 0)]
+            ctx.location_checks[0, 2].add(2)
+            ctx.stored_data["key"] = 1
+            self.assertEqual(saved(), ctx.get_save())
+            snapshot_size = os.path.getsize(ctx.save_filename)
+
+            ctx.received_items[0, 1, True].append(NetworkItem(3, 2, 2, 0))
+            ctx.save_journal.mark_received_items((0, 1, True))
+            ctx.received_items[0, 2, True] = [NetworkItem(4, 1, 1, 0)]
+            ctx.save_journal.mark_received_items((0, 2, True))
+            ctx.location_checks[0, 1].add(4)
+            ctx.save_journal.mark_location_checks((0, 1))
+            ctx.hints[0, 1].add(Hint(1, 2, 2, 1, False))
+            ctx.save_journal.mark_hints((0, 1))
+            ctx.stored_data["other"] = [1]
+            ctx.save_journal.mark_stored_data("other")
+            ctx.hints_used[0, 1] += 1
+            self.assertEqual(saved(), ctx.get_save())
+            self.assertGreater(os.path.getsize(ctx.save_filename), snapshot_size, "record should be appended")
+
+            ctx.stored_data["key"] = 2
+            ctx.save_journal.mark_stored_data("key")
+            ctx.hints[0, 1] = {Hint(1, 2, 2, 1, True)}
+            ctx.save_journal.mark_hints((0, 1))
+            self.assertEqual(saved(), ctx.get_save())
+
+            # unchanged entries are not written again
+            changes = ctx.save_journal._get_changes(ctx.get_save())  # pyright: ignore[reportPrivateUsage]
+            self.assertEqual(changes["hints"], {})
+
+            # an interrupted append loses only that record
+            with open(ctx.save_filename, "rb") as f:
+                data = f.read()
+            self.assertEqual(SaveJournal.load(data + data[-10:]), ctx.get_save())
+
+            # outgrowing the snapshot compacts the journal
+            for item in range(100):
+                ctx.received_items[0, 1, True].append(NetworkItem(item, 2, 2, 0))
+                ctx.save_journal.mark_received_items((0, 1, True))
+                saved()
+            self.assertEqual(saved(), ctx.get_save())
+            self.assertLess(os.path.getsize(ctx.save_filename), 3 * ctx.save_journal.snapshot_size)
+
+
+class TestHintIndex(unittest.TestCase):
+    def test_recheck_location_hints(self) -> None:
+        ctx = Context("", 0, "", "", 0, 0, False)
+        hint = Hint(2, 1, 10, 5, False)
+        other_hint = Hint(1, 1, 11, 6, False)
+        ctx.hints[0, 1] = {hint, other_hint}
+        ctx.hints[0, 2] = {hint}
+        ctx.index_hints(0, 1)
+        ctx.index_hints(0, 2)
+        self.assertEqual(ctx.get_hint(0, 1, 10), hint)
+        self.assertIsNone(ctx.get_hint(0, 2, 10), "hints are indexed for their finding player only")
+
+        ctx.location_checks[0, 1].add(10)
+        changed: set[tuple[int, int]] = set()
+        ctx.recheck_location_hints(0, 1, [10, 12], changed)
+        found_hint = Hint(2, 1, 10, 5, True, status=HintStatus.HINT_FOUND)
+        self.assertEqual(changed, {(0, 1), (0, 2)})
+        self.assertEqual(ctx.hints[0, 1], {found_hint, other_hint})
+        self.assertEqual(ctx.hints[0, 2], {found_hint})
+        self.assertEqual(ctx.get_hint(0, 1, 10), found_hint)
+        self.assertEqual(ctx.get_hint(0, 1, 11), other_hint)
+
+
+class FakeSocket:
+    open = True
+    sent: list[str | bytes]
+
+    def __init__(self) -> None:
+        self.sent = []
+
+    async def send(self, msg: str | bytes) -> None:
+        self.sent.append(msg)
+
+
+def sent(client: Client) -> list[str | bytes]:
+    """Frames sent to a client connected through a FakeSocket."""
+    return cast(FakeSocket, client.socket).sent
+
+
+def received(client: Client) -> list[list[dict[str, Any]]]:
+    """Decoded message lists sent to a client connected through a FakeSocket."""
+    return [decode(frame) if isinstance(frame, str) else decode_binary(frame) for frame in sent(client)]
+
+
+class TestSendNewItems(unittest.IsolatedAsyncioTestCase):
+    async def test_send_new_items(self) -> None:
+        ctx = Context("", 0, "", "", 0, 0, False)
+        local_client = Client(cast(Any, FakeSocket()), ctx)
+        remote_client = Client(cast(Any, FakeSocket()), ctx)
+        remote_client.remote_items = True
+        other_client = Client(cast(Any, FakeSocket()), ctx)
+        ctx.clients = {0: {1: [local_client, remote_client], 2: [other_client]}}
+
+        send_items_to(ctx, 0, 1, NetworkItem(1, 1, 1, 0), NetworkItem(2, 1, 2, 0))
+        self.assertEqual(ctx.new_received_items, {(0, 1, False), (0, 1, True)})
+        send_new_items(ctx)
+        self.assertFalse(ctx.new_received_items)
+        await asyncio.sleep(0)
+        self.assertEqual(local_client.send_index, 1)
+        self.assertEqual(remote_client.send_index, 2)
+        self.assertEqual(len(sent(local_client)), 1)
+        self.assertEqual(len(sent(remote_client)), 1)
+        self.assertFalse(sent(other_client))
+
+        # an own item only grows the list of remote_items clients
+        send_items_to(ctx, 0, 1, NetworkItem(3, 1, 1, 0))
+        self.assertEqual(ctx.new_received_items, {(0, 1, True)})
+        send_new_items(ctx)
+        await asyncio.sleep(0)
+        self.assertEqual(len(sent(local_client)), 1)
+        self.assertEqual(len(sent(remote_client)), 2)
+        self.assertEqual(remote_client.send_index, 3)
+
+
+class SlowSocket(FakeSocket):
+    def __init__(self) -> None:
+        super().__init__()
+        self.drained = asyncio.Event()
+
+    @override
+    async def send(self, msg: str | bytes) -> None:
+        self.sent.append(msg)
+        await self.drained.wait()
+
+
+class TestOutboundQueue(unittest.IsolatedAsyncioTestCase):
+    async def test_coalesce(self) -> None:
+        ctx = Context("", 0, "", "", 0, 0, False)
+        client = Client(cast(Any, FakeSocket()), ctx)
+        ctx.queue_msgs(client, [{"cmd": "PrintJSON", "data": [{"text": "a"}]}])
+        ctx.broadcast([client], [{"cmd": "RoomUpdate", "hint_points": 1, "checked_locations": [3]}])
+        ctx.broadcast([client], [{"cmd": "PrintJSON", "data": [{"text": "b"}]}])
+        ctx.broadcast([client], [{"cmd": "RoomUpdate", "hint_points": 2, "checked_locations": [2, 1]}])
+        await ctx.send_msgs(client, [])
+        await asyncio.sleep(0)
+        self.assertEqual(len(sent(client)), 1)
+        msgs = received(client)[0]
+        self.assertEqual([msg["cmd"] for msg in msgs], ["PrintJSON", "RoomUpdate", "PrintJSON"])
+        self.assertEqual(msgs[1]["hint_points"], 2)
+        self.assertEqual(msgs[1]["checked_locations"], [1, 2, 3])
+        self.assertIsNone(client.outbound_sender)
+
+    async def test_frame_size(self) -> None:
+        ctx = Context("", 0, "", "", 0, 0, False)
+        ctx.outbound_frame_size = 150
+        client = Client(cast(Any, FakeSocket()), ctx)
+        for text in ("a" * 50, "b" * 50, "c"):
+            ctx.queue_msgs(client, [{"cmd": "PrintJSON", "data": [{"text": text}]}])
+        await asyncio.sleep(0)
+        self.assertEqual([[msg["data"][0]["text"][0] for msg in msgs] for msgs in received(client)],
+                         [["a"], ["b", "c"]])
+
+    async def test_binary_encoding(self) -> None:
+        ctx = Context("", 0, "", "", 0, 0, False)
+        client = Client(cast(Any, FakeSocket()), ctx)
+        client.binary_encoding = True
+        ctx.queue_msgs(client, [{"cmd": "ReceivedItems", "index": 0, "items": [NetworkItem(1, 2, 3)]}])
+        ctx.broadcast([client], [{"cmd": "RoomUpdate", "hint_points": 1}])
+        await ctx.send_encoded_msgs(client, '[{"cmd":"DataPackage","data":{"games":{}}}]')
+        ctx.broadcast([client], [{"cmd": "PrintJSON", "data": [{"text": "a"}]}])
+        await asyncio.sleep(0)
+        self.assertEqual([type(frame) for frame in sent(client)], [bytes, str, bytes])
+        frames = received(client)
+        self.assertEqual([msg["cmd"] for msg in frames[0]], ["ReceivedItems", "RoomUpdate"])
+        self.assertEqual(frames[0][0]["items"], [NetworkItem(1, 2, 3)])
+        self.assertEqual(frames[1][0]["cmd"], "DataPackage")
+        self.assertEqual([msg["cmd"] for msg in frames[2]], ["PrintJSON"])
+
+    async def test_binary_replies(self) -> None:
+        ctx = Context("", 0, "", "", 0, 0, False)
+        ctx.slots_by_game = {"Game A": {1}}
+        client, binary_client = Client(cast(Any, FakeSocket()), ctx), Client(cast(Any, FakeSocket()), ctx)
+        binary_client.binary_encoding = True
+        for endpoint in (client, binary_client):
+            endpoint.auth, endpoint.team, endpoint.slot = True, 0, 1
+        ctx.clients = {0: {1: [client, binary_client]}}
+        await process_client_cmd(ctx, client, {"cmd": "Bounce", "games": ["Game A"], "data": {"a": 1}})
+        await process_client_cmd(ctx, binary_client, {"cmd": "GetDataPackage", "games": ["Archipelago"]})
+        await asyncio.sleep(0)
+        self.assertEqual([type(frame) for frame in sent(client)], [str])
+        self.assertEqual([type(frame) for frame in sent(binary_client)], [bytes])
+        self.assertEqual([msg["cmd"] for msg in received(binary_client)[0]], ["Bounced", "DataPackage"])
+        self.assertEqual(received(binary_client)[0][0], received(client)[0][0])
+
+    async def test_slow_consumer(self) -> None:
+        ctx = Context("", 0, "", "", 0, 0, False)
+        socket = SlowSocket()
+        client = Client(cast(Any, socket), ctx)
+        ctx.queue_msgs(client, [{"cmd": "PrintJSON", "data": [{"text": "a"}]}])
+        await asyncio.sleep(0)
+        self.assertEqual(len(sent(client)), 1)
+        # the first frame is still being sent, so everything else is queued up for the next one
+        for text in ("b", "c"):
+            ctx.queue_msgs(client, [{"cmd": "PrintJSON", "data": [{"text": text}]}])
+            await asyncio.sleep(0)
+        self.assertEqual(len(sent(client)), 1)
+        socket.drained.set()
+        await asyncio.sleep(0)
+        self.assertEqual(len(sent(client)), 2)
+        self.assertEqual([msg["data"][0]["text"] for msg in received(client)[1]], ["b", "c"])
+
+        # past the limit, queued text is dropped in favor of other messages
+        socket.drained.clear()
+        ctx.outbound_queue_limit = 100
+        ctx.queue_msgs(client, [{"cmd": "PrintJSON", "data": [{"text": "d"}]}])
+        await asyncio.sleep(0)
+        ctx.queue_msgs(client, [{"cmd": "PrintJSON", "data": [{"text": "e" * 50}]}])
+        ctx.queue_msgs(client, [{"cmd": "ReceivedItems", "index": 0, "items": []}])
+        ctx.queue_msgs(client, [{"cmd": "PrintJSON", "data": [{"text": "f" * 50}]}])
+        self.assertEqual([payload for payload, is_text in client.outbound if is_text], [])
+        socket.drained.set()
+        await asyncio.sleep(0)
+        self.assertEqual([msg["cmd"] for msg in received(client)[-1]], ["ReceivedItems"])
+
+
+class TestDatastore(unittest.IsolatedAsyncioTestCase):
+    async def test_set(self) -> None:
+        ctx = Context("", 0, "", "", 0, 0, False)
+        full_client, delta_client = Client(cast(Any, FakeSocket()), ctx), Client(cast(Any, FakeSocket()), ctx)
+        for client in (full_client, delta_client):
+            client.auth, client.team, client.slot = True, 0, 1
+        await process_client_cmd(ctx, full_client, {"cmd": "SetNotify", "keys": ["tracker"]})
+        await process_client_cmd(ctx, delta_client, {"cmd": "SetNotify", "keys": ["tracker"], "delta": True})
+
+        default: list[int] = []
+        await process_client_cmd(ctx, full_client, {"cmd": "Set", "key": "tracker", "default": default,
+                                                    "operations": [{"operation": "update", "value": [1, 2]}]})
+        await process_client_cmd(ctx, full_client, {"cmd": "Set", "key": "tracker", "default": default,
+                                                    "operations": [{"operation": "add", "value": [3]},
+                                                                   {"operation": "remove", "value": 1}]})
+        await asyncio.sleep(0)
+        self.assertEqual(default, [], "default should not be modified in place")
+        self.assertEqual(ctx.stored_data["tracker"], [2, 3])
+        full = received(full_client)[0]
+        self.assertEqual([(reply["original_value"], reply["value"]) for reply in full],
+                         [([], [1, 2]), ([1, 2], [2, 3])])
+        created, changed = received(delta_client)[0]
+        self.assertTrue(created["delta"] and changed["delta"])
+        self.assertEqual(created["value"], [1, 2], "a new key is sent whole")
+        self.assertNotIn("value", changed)
+        self.assertNotIn("original_value", changed)
+        self.assertEqual(changed["operations"], [{"operation": "add", "value": [3]},
+                                                 {"operation": "remove", "value": 1}])
+
+    async def test_failed_set(self) -> None:
+        ctx = Context("", 0, "", "", 0, 0, False)
+        client = Client(cast(Any, FakeSocket()), ctx)
+        client.auth, client.team, client.slot = True, 0, 1
+        ctx.stored_data["tracker"] = [1]
+        with self.assertRaises(TypeError):
+            await process_client_cmd(ctx, client, {"cmd": "Set", "key": "tracker", "want_reply": True,
+                                                   "operations": [{"operation": "add", "value": [2]},
+                                                                  {"operation": "mul", "value": "a"}]})
+        self.assertEqual(ctx.stored_data["tracker"], [1], "a failed Set should not change the value")
+        self.assertFalse(ctx.save_journal.changed_stored_data)
+
+    def test_sizes(self) -> None:
+        journal = SaveJournal()
+        size = journal.get_stored_data_size("key", list(range(100)))
+        self.assertGreater(size, 100)
+        self.assertEqual(journal.get_stored_data_size("key", None), size, "size should only be measured once")
+        journal.mark_stored_data("key")
+        self.assertLess(journal.get_stored_data_size("key", []), size)
+
+
+class TestBounceTargets(unittest.TestCase):
+    def test_bounce_targets(self) -> None:
+        ctx = Context("", 0, "", "", 0, 0, False)
+        ctx.slots_by_game = {"Game A": {1, 2}, "Game B": {3}}
+        clients: dict[tuple[int, int], Client] = {}
+        for team, slot, tags in ((0, 1, ["DeathLink"]), (0, 2, []), (0, 3, ["DeathLink", "Tracker"]),
+                                 (1, 1, ["DeathLink"])):
+            client = clients[team, slot] = Client(cast(Any, FakeSocket()), ctx)
+            client.team, client.slot, client.tags = team, slot, tags
+            ctx.clients.setdefault(team, {}).setdefault(slot, []).append(client)
+            ctx.add_client_tags(client)
+
+        self.assertEqual(ctx.get_bounce_targets(0, set(), {"DeathLink"}, set()), {clients[0, 1], clients[0, 3]})
+        self.assertEqual(ctx.get_bounce_targets(0, {"Game A"}, set(), set()), {clients[0, 1], clients[0, 2]})
+        self.assertEqual(ctx.get_bounce_targets(0, {"Game C"}, {"Tracker"}, {2, 9}), {clients[0, 2], clients[0, 3]})
+        self.assertEqual(ctx.get_bounce_targets(1, {"Game B"}, {"DeathLink"}, set()), {clients[1, 1]})
+
+        # tags changed, as in ConnectUpdate
+        client = clients[0, 3]
+        old_tags = client.tags
+        client.tags = ["Tracker"]
+        ctx.remove_client_tags(client, old_tags)
+        ctx.add_client_tags(client)
+        self.assertEqual(ctx.get_bounce_targets(0, set(), {"DeathLink"}, set()), {clients[0, 1]})
+        self.assertEqual(ctx.get_bounce_targets(0, set(), {"Tracker"}, set()), {client})
+
+        ctx.remove_client_tags(client, client.tags)
+        self.assertNotIn("Tracker", ctx.clients_by_tag[0])
@@ -0,0 +1,62 @@
+# Tests for CopyOnAccessDict in Utils.py
+
+import pickle
+import unittest
+
+from Utils import CopyOnAccessDict, CopyOnWriteCounter, CopyOnWriteDict, CopyOnWriteSet
+
+
+class TestCopyOnAccessDict(unittest.TestCase):
+    def test_share_is_independent(self) -> None:
+        for container_type in (set, CopyOnWriteSet):
+            with self.subTest(container_type=container_type.__name__):
+                original = CopyOnAccessDict({1: container_type("a"), 2: container_type("b")})
+                shared = original.share()
+                shared[1].add("c")
+                original[2].add("d")
+                self.assertEqual({1: {"a"}, 2: {"b", "d"}}, original)
+                self.assertEqual({1: {"a", "c"}, 2: {"b"}}, shared)
+
+    def test_original_keeps_container(self) -> None:
+        original = CopyOnAccessDict({1: CopyOnWriteSet("a")})
+        container = original[1]
+        shared = original.share()
+        self.assertIs(container, original[1])
+        self.assertIsNot(container, shared[1])
+
+    def test_kept_reference_is_independent(self) -> None:
+        """Containers referenced from before share() can be modified without affecting the copies."""
+        containers = (CopyOnWriteSet("a"), CopyOnWriteDict(a=1), CopyOnWriteCounter("a"))
+        for container in containers:
+            with self.subTest(container_type=type(container).__name__):
+                expected = container.copy()
+                original = CopyOnAccessDict({1: container})
+                shared = original.share()
+                shared_again = shared.share()
+                container.clear()
+                self.assertEqual(expected, shared[1])
+                self.assertEqual(expected, shared_again[1])
+                self.assertFalse(original[1])
+
+    def test_dict_operations(self) -> None:
+        original = CopyOnAccessDict({1: CopyOnWriteSet("a"), 2: CopyOnWriteSet("b")})
+        shared = original.share()
+        self.assertEqual(2, len(shared))
+        self.assertIn(1, shared)
+        self.assertNotIn(3, shared)
+        self.assertEqual([1, 2], list(shared))
+        self.assertEqual({"a"}, shared.get(1))
+        self.assertIsNone(shared.get(3))
+        self.assertEqual({"b"}, shared.pop(2))
+        shared[1] = {"c"}
+        self.assertEqual({1: {"c"}}, dict(shared))
+        del original[1]
+        self.assertEqual({2: {"b"}}, original)
+
+    def test_pickle(self) -> None:
+        original = CopyOnAccessDict({1: CopyOnWriteSet("a")})
+        shared = original.share()
+        for unpickled in (pickle.loads(pickle.dumps(original)), pickle.loads(pickle.dumps(shared))):
+            self.assertIsInstance(unpickled, CopyOnAccessDict)
+            self.assertIsInstance(unpickled[1], CopyOnWriteSet)
+            self.assertEqual({1: {"a"}}, unpickled)
@@ -0,0 +1,58 @@
+import operator
+import os
+import threading
+import time
+import unittest
+from typing import Any
+
+from WebHostLib.generator_pool import GeneratorPool
+
+
+class TestGeneratorPool(unittest.TestCase):
+    def run_jobs(self, pool: GeneratorPool, *jobs: tuple[Any, tuple[Any, ...]]) -> list[Any]:
+        """Runs the jobs one after another, returns their results or exceptions."""
+        results: list[Any] = []
+        for func, args in jobs:
+            done = threading.Event()
+
+            def on_done(value: Any) -> None:
+                results.append(value)
+                done.set()
+
+            pool.apply_async(func, args, callback=on_done, error_callback=on_done, name=func.__name__)
+            self.assertTrue(done.wait(60), "Job did not finish")
+        return results
+
+    def test_reuse(self) -> None:
+        """Verify that processes are reused until they ran max_jobs jobs and that errors are passed on."""
+        with GeneratorPool(1, max_jobs=2) as pool:
+            pid1, error, pid2 = self.run_jobs(pool, (os.getpid, ()), (operator.truediv, (1, 0)), (os.getpid, ()))
+            self.assertNotEqual(pid1, os.getpid())
+            self.assertIsInstance(error, ZeroDivisionError)
+            self.assertNotEqual(pid1, pid2)
+            self.assertEqual(pid2, self.run_jobs(pool, (os.getpid, ()))[0])
+            metrics = list(pool.metrics)
+        self.assertEqual([job_metrics.worker_jobs for job_metrics in metrics], [1, 2, 1, 2])
+        self.assertEqual([job_metrics.pid for job_metrics in metrics], [pid1, pid1, pid2, pid2])
+        self.assertEqual(metrics[1].recycle_reason, "ran 2 jobs")
+        self.assertIsNone(metrics[0].recycle_reason)
+
+    def test_job_memory_limit(self) -> None:
+        """Verify that a job exceeding the memory limit fails and the process gets replaced."""
+        with GeneratorPool(1, max_jobs=0, job_memory_limit=1) as pool:
+            error, pid = self.run_jobs(pool, (time.sleep, (2,)), (os.getpid, ()))
+            self.assertEqual(len(pool.metrics), 1)
+        self.assertIsInstance(error, MemoryError)
+        self.assertIsInstance(pid, int)
+
+    def test_start_failures(self) -> None:
+        """Verify that processes ending before running a job are logged and replaced with a backoff."""
+        with self.assertLogs(level="ERROR") as logs:
+            with GeneratorPool(1, initializer=os._exit, initargs=(3,)) as pool:
+                time.sleep(2)
+                start_failures = pool.start_failures
+        self.assertIn("ended with code 3 before running a job", logs.output[0])
+        # without a backoff, the process would be replaced about every 0.1 seconds
+        self.assertGreaterEqual(start_failures, 1)
+        self.assertLessEqual(start_failures, 5)
+        self.assertEqual(len(logs.output), start_failures)
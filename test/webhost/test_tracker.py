@@ -103,3 +103,66 @@ class TestTracker(TestBase):
                 self.assertEqual(response.status_code, 200)
             with self.client.open(url_for("api.tracker_slot_data", tracker=self.tracker_uuid)) as response:
                 self.assertEqual(response.status_code, 200)
+
+    def test_seed_data_cache(self) -> None:
+        """Verify that the decoded seed is shared between TrackerData instances of the same seed."""
+        from pony.orm import db_session
+        from WebHostLib.models import Room
+        from WebHostLib.tracker import TrackerData
+
+        with db_session:
+            room: Room = Room.get(id=self.room_id)
+            tracker_data = TrackerData(room)
+            self.assertIs(TrackerData(room)._multidata, tracker_data._multidata)
+            self.assertEqual(tracker_data.get_player_locations_total(1), len(tracker_data.get_player_locations(1)))
+            for game, item_name_to_id in tracker_data.item_name_to_id.items():
+                for item_name, item_id in item_name_to_id.items():
+                    self.assertEqual(tracker_data.item_id_to_name[game][item_id], item_name)
+
+    def test_tracker_snapshot(self) -> None:
+        """Verify that trackers show the same state whether read from the tracker snapshot or the multisave."""
+        from pony.orm import db_session
+        from MultiServer import Context as MultiServerContext, SaveJournal
+        from NetUtils import ClientStatus, Hint, NetworkItem
+        from WebHostLib.models import Room, TrackerSnapshot
+        from WebHostLib.tracker import TrackerData
+        from WebHostLib.tracker_snapshot import (TrackerState, decode_checked_locations, encode_checked_locations,
+                                                 load_tracker_snapshot)
+
+        location_ids = [1, 5, 6, 20, 100, 101, 102, 103, 104]
+        bits = encode_checked_locations({5, 104, 200}, location_ids)
+        self.assertEqual(len(bits), 2)
+        self.assertEqual(decode_checked_locations(bits, location_ids), {5, 104})
+
+        ctx = MultiServerContext("", 0, "", "", 0, 0, False)
+        ctx._load(MultiServerContext.decompress(self.data), {}, True)
+        state = TrackerState(ctx.locations)
+        journal = SaveJournal()
+        with db_session:
+            room: Room = Room.get(id=self.room_id)
+            for item in (1, 2, 1):
+                ctx.received_items.setdefault((0, 1, True), []).append(NetworkItem(item, 0, 0, 0))
+                journal.mark_received_items((0, 1, True))
+                ctx.client_game_state[0, 1] = ClientStatus.CLIENT_PLAYING
+                ctx.hints[0, 1].add(Hint(1, 1, item, item, False))
+                journal.mark_hints((0, 1))
+                changed_hints = set(journal.changed_hints)
+                save = ctx.get_save()
+                state.update(save, changed_hints)
+                room.write_multisave(*journal.write(save))
+            self.assertEqual(len(room.save_records), 2, "saves after the snapshot should be stored as records")
+            expected = TrackerData(room)
+            self.assertEqual(expected._multisave["received_items"], save["received_items"])
+            TrackerSnapshot(room=room, data=state.dump())
+            tracker_data = TrackerData(room)
+            self.assertIsNotNone(tracker_data._snapshot)
+            self.assertEqual(tracker_data.get_player_inventory_counts(0, 1)[1], 2)
+            self.assertEqual(tracker_data.get_player_inventory_counts(0, 1), expected.get_player_inventory_counts(0, 1))
+            self.assertEqual(tracker_data.get_room_locations_complete(), expected.get_room_locations_complete())
+            self.assertEqual(tracker_data.get_player_client_status(0, 1), ClientStatus.CLIENT_PLAYING)
+            self.assertEqual(len(tracker_data.get_player_hints(0, 1)), 2)
+            self.assertEqual(tracker_data.get_team_hints(), expected.get_team_hints())
+            self.assertEqual(set(state.hints), {(0, 1)}, "only slots with hints should be stored")
+            self.assertNotIn("_multisave", tracker_data.__dict__)
+
+        self.assertIsNone(load_tracker_snapshot(None))
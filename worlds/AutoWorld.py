@@ -12,6 +12,7 @@ from typing import (Any, ClassVar, Dict, FrozenSet, List, Optional, Self, Set, T
 
 from Options import item_and_loc_options, ItemsAccessibility, OptionGroup, PerGameCommonOptions
 from BaseClasses import CollectionState, Entrance
+from rule_builder.reachability import EntranceDependencies
 from rule_builder.rules import CustomRuleRegister, Rule
 from Utils import Version
 
@@ -326,6 +327,24 @@ class World(metaclass=AutoWorldRegister):
     If False, everything is rechecked at every step, which is slower computationally, 
     but may be desirable in complex/dynamic worlds."""
 
+    incremental_reachability: bool = False
+    """If True, blocked entrances are only rechecked when an item or region their rule builder rule depends on changes,
+    instead of rechecking every blocked entrance whenever an item is collected. The same goes for the unreached locations
+    when computing spheres, see `BaseClasses.SphereFrontier`.
+    Entrances with access rules that are not rule builder rules are still rechecked every time.
+    Entrance rules have to be assigned through `set_rule` or `create_entrance` for their dependencies to be tracked,
+    and items collected under a different logical name have to be listed in `item_mapping`."""
+
+    indexed_prog_items: bool = False
+    """If True, this world's `CollectionState.prog_items` also keep the counts of its items in an integer array,
+    which rule builder item rules are evaluated against instead of looking up item names.
+    Counts have to be integers. See `get_item_index` for which item names get indexed."""
+
+    generate_output_in_process: ClassVar[bool] = False
+    """If True, `generate_output` may be called in a forked process, see `settings.GeneratorOptions.OutputProcesses`.
+    Only set this if generate_output does nothing but write files to the output directory, as any changes it makes to
+    the world or multiworld are lost, and if it does not depend on anything done in `stage_generate_output`."""
+
     multiworld: "MultiWorld"
     """autoset on creation. The MultiWorld object for the currently generating multiworld."""
     player: int
@@ -353,6 +372,10 @@ class World(metaclass=AutoWorldRegister):
     """If loaded from a .apworld, this is the Path to it."""
     __file__: ClassVar[str]
     """path it was loaded from"""
+    _entrance_dependencies: Optional[EntranceDependencies] = None
+    """lazily built index of entrance rule dependencies, see incremental_reachability"""
+    _item_index: Optional[Dict[str, int]] = None
+    """lazily built index of item names, see indexed_prog_items"""
     world_version: ClassVar[Version] = Version(0, 0, 0)
     """Optional world version loaded from archipelago.json"""
     manifest: ClassVar[dict[str, Any]] = {}
@@ -649,6 +672,8 @@ class World(metaclass=AutoWorldRegister):
             self.register_rule_dependencies(rule)
             if isinstance(spot, Entrance):
                 self._register_rule_indirects(rule, spot)
+        if isinstance(spot, Entrance):
+            self._entrance_dependencies = None
         spot.access_rule = rule
 
     def set_completion_rule(self, rule: CollectionRule | Rule[Any]) -> None:
@@ -683,6 +708,29 @@ class World(metaclass=AutoWorldRegister):
         """Hook for registering dependencies when a rule is assigned for this world"""
         pass
 
+    def get_entrance_dependencies(self) -> EntranceDependencies:
+        """Returns the index of this world's entrances by their rule dependencies, rebuilding it if it is outdated"""
+        entrance_count = len(self.multiworld.regions.entrance_cache[self.player])
+        if self._entrance_dependencies is None or self._entrance_dependencies.entrance_count != entrance_count:
+            self._entrance_dependencies = EntranceDependencies.from_world(self)
+        return self._entrance_dependencies
+
+    def get_item_index(self) -> Dict[str, int]:
+        """
+        Returns the array index of each item name kept in the integer array of indexed_prog_items.
+        The index is built on first use and never changes afterwards. It covers all of the world's item names,
+        the logical names of `item_mapping` and the names of this player's items placed at that point, such as events.
+        Other item names still work, but rules checking them don't use the array.
+        """
+        if self._item_index is None:
+            item_names = set(self.item_names)
+            item_names.update(getattr(self, "item_mapping", {}).values())
+            for location in self.multiworld.get_locations():
+                if location.item is not None and location.item.player == self.player:
+                    item_names.add(location.item.name)
+            self._item_index = {item_name: index for index, item_name in enumerate(sorted(item_names))}
+        return self._item_index
+
     def _register_rule_indirects(self, resolved_rule: Rule.Resolved, entrance: Entrance) -> None:
         if self.explicit_indirect_conditions:
             for indirect_region in resolved_rule.region_dependencies().keys():
@@ -67,6 +67,7 @@ class MLSSWorld(World):
     item_name_to_id = {name: data.code for name, data in item_table.items()}
     location_name_to_id = {loc_data.name: loc_data.id for loc_data in all_locations}
     required_client_version = (0, 5, 0)
+    generate_output_in_process = True
 
     disabled_locations: Set[str]
 